@@ -0,0 +1,111 @@
+"""
+Reproducible benchmark suite for the API and the repositories.
+
+Seeds SQLite with generated places and opinions, then measures every endpoint through
+the ASGI app in-process and micro-benchmarks the models, response serialization and compression,
+the cached statements, ORM hydration against Core row mapping and the repository methods.
+The import time of the app is profiled in fresh interpreters, as it bounds how fast a new process starts.
+Results are written as JSON so runs on different commits can be compared.
+
+Usage:
+    python -m benchmarks run --places 1000 --opinions 20000 --database file
+    python -m benchmarks compare baseline.json current.json
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+from benchmarks.api import api_benchmarks
+from benchmarks.harness import compare, create_seeded_engine, save_results
+from benchmarks.micro import (
+    SERIALIZATION_ROWS,
+    compression_benchmarks,
+    model_benchmarks,
+    repository_benchmarks,
+    row_mapping_benchmarks,
+    serialization_benchmarks,
+    statement_benchmarks,
+)
+from benchmarks.startup import startup_benchmarks
+
+
+async def run(args) -> dict:
+    results = {
+        "config": {
+            "places": args.places,
+            "opinions": args.opinions,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "iterations": args.iterations,
+            "rows": args.rows,
+            "database": args.database,
+            "startup_runs": args.startup_runs,
+        },
+        "startup": startup_benchmarks(args.startup_runs),
+        "models": model_benchmarks(args.iterations * 10),
+        "serialization": serialization_benchmarks(max(1, args.iterations // 20), args.rows),
+        "compression": compression_benchmarks(max(1, args.iterations // 20), args.rows),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "benchmark.db" if args.database == "file" else None
+        engine = await create_seeded_engine(args.places, args.opinions, path)
+        results["statements"] = await statement_benchmarks(engine, args.places, args.iterations)
+        results["row_mapping"] = await row_mapping_benchmarks(engine, max(1, args.iterations // 20), args.rows)
+        results["repositories"] = await repository_benchmarks(engine, args.places, args.opinions, args.iterations)
+        await engine.dispose()
+
+        engine = await create_seeded_engine(args.places, args.opinions, path)
+        results["api"] = await api_benchmarks(engine, args.places, args.opinions, args.requests, args.concurrency)
+        await engine.dispose()
+    return results
+
+
+def print_results(results: dict):
+    for group, benchmarks in results.items():
+        if group == "config":
+            continue
+        print(f"\n{group}")
+        for name, stats in benchmarks.items():
+            print(
+                f"  {name:<32} {stats['ops_per_sec']:>10.0f} ops/s "
+                f"p50 {stats['p50_us']:>9.0f} us  p99 {stats['p99_us']:>9.0f} us"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--places", type=int, default=1000)
+    run_parser.add_argument("--opinions", type=int, default=20000)
+    run_parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    run_parser.add_argument("--concurrency", type=int, default=1, help="requests in flight per endpoint")
+    run_parser.add_argument("--iterations", type=int, default=200, help="calls per repository method")
+    run_parser.add_argument("--rows", type=int, default=SERIALIZATION_ROWS, help="opinions per page read or serialized")
+    run_parser.add_argument("--database", choices=["memory", "file"], default="file")
+    run_parser.add_argument("--startup-runs", type=int, default=5, help="fresh interpreters importing the app")
+    run_parser.add_argument("--output", type=Path, help="result file, defaults to benchmarks/results/")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--metric", default="p50_us")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        baseline, current = (json.loads(path.read_text()) for path in (args.baseline, args.current))
+        for name, old, new, change in compare(baseline, current, args.metric):
+            print(f"{name:<45} {old:>12.1f} {new:>12.1f} {change:>+8.1%}")
+        return
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    print(f"\nsaved to {save_results(results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""End-to-end latency and throughput of every API endpoint, served in-process through ASGI."""
+
+import asyncio
+import time
+
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from benchmarks.harness import summarize
+from benchmarks.micro import OPINION_DATA, PLACE_DATA
+from fastapi_project.app import app
+from fastapi_project.db.create_db import get_db, get_read_db, get_read_session_factory, get_session_factory
+from fastapi_project.repositories.cache import default_cache
+
+
+def endpoints(places: int, opinions: int) -> list[tuple[str, str, callable]]:
+    """
+    The benchmarked requests, as (name, method, request kwargs factory) tuples.
+
+    Write requests target rows that are still present when they run: deletes use the
+    IDs of the rows created by the preceding create benchmarks.
+    """
+    return [
+        ("GET /places/", "GET", lambda i: {"path": "/places/"}),
+        ("GET /places/{id}", "GET", lambda i: {"path": f"/places/{i % places + 1}"}),
+        ("GET /places/{id}/opinions", "GET", lambda i: {"path": f"/places/{i % places + 1}/opinions"}),
+        ("GET /places/{id}/stats", "GET", lambda i: {"path": f"/places/{i % places + 1}/stats"}),
+        ("GET /places/export", "GET", lambda i: {"path": "/places/export"}),
+        ("POST /places/", "POST", lambda i: {"path": "/places/", "json": PLACE_DATA}),
+        ("PUT /places/{id}", "PUT", lambda i: {"path": f"/places/{places + i + 1}", "json": {"name": "x"}}),
+        ("DELETE /places/{id}", "DELETE", lambda i: {"path": f"/places/{places + i + 1}"}),
+        ("GET /opinions/", "GET", lambda i: {"path": "/opinions/"}),
+        ("GET /opinions/{id}", "GET", lambda i: {"path": f"/opinions/{i % opinions + 1}"}),
+        ("GET /opinions/export", "GET", lambda i: {"path": "/opinions/export"}),
+        ("POST /opinions/", "POST", lambda i: {"path": "/opinions/", "json": OPINION_DATA}),
+        ("PUT /opinions/{id}", "PUT", lambda i: {"path": f"/opinions/{opinions + i + 1}", "json": {"vote": 2}}),
+        ("DELETE /opinions/{id}", "DELETE", lambda i: {"path": f"/opinions/{opinions + i + 1}"}),
+        ("POST /opinions/bulk", "POST", lambda i: {"path": "/opinions/bulk", "json": [OPINION_DATA] * 100}),
+    ]
+
+
+async def api_benchmarks(engine: AsyncEngine, places: int, opinions: int, requests: int, concurrency: int) -> dict:
+    """
+    Sends `requests` requests to every endpoint with `concurrency` requests in flight.
+
+    Returns:
+        dict: Throughput and latency percentiles per endpoint.
+    """
+    session_local = async_sessionmaker(bind=engine, autoflush=False)
+
+    async def _get_db():
+        async with session_local() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_local
+    app.dependency_overrides[get_read_db] = _get_db
+    app.dependency_overrides[get_read_session_factory] = lambda: session_local
+    results = {}
+    try:
+        async with TestClient(app) as client:
+            for name, method, request in endpoints(places, opinions):
+                await default_cache.clear()
+                samples = []
+                counter = iter(range(requests))
+
+                async def worker():
+                    for i in counter:
+                        kwargs = request(i)
+                        start = time.perf_counter()
+                        response = await client.open(kwargs.pop("path"), method=method, **kwargs)
+                        samples.append(time.perf_counter() - start)
+                        if response.status_code >= 400:
+                            raise RuntimeError(f"{name} returned {response.status_code}: {response.text}")
+
+                start = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                results[name] = summarize(samples, time.perf_counter() - start)
+    finally:
+        app.dependency_overrides = {}
+    return results
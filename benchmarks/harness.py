@@ -0,0 +1,181 @@
+"""Timing, seeding and result storage shared by the benchmarks."""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import StaticPool, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from fastapi_project.core.sqlalchemy_core import Base, DBOpinion, DBPlace, DBPlaceRatingStats
+from fastapi_project.db.create_db import configure_engine
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float], wall_seconds: Optional[float] = None) -> dict:
+    """
+    Summarizes per-call latencies.
+
+    Args:
+        samples (list[float]): Latency of every call in seconds.
+        wall_seconds (Optional[float]): Total elapsed time, defaults to the sum of the samples.
+
+    Returns:
+        dict: Call count, throughput and latency percentiles in microseconds.
+    """
+    wall_seconds = sum(samples) if wall_seconds is None else wall_seconds
+    return {
+        "calls": len(samples),
+        "ops_per_sec": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": percentile(samples, 0.50) * 1e6,
+        "p99_us": percentile(samples, 0.99) * 1e6,
+        "max_us": max(samples) * 1e6,
+    }
+
+
+def bench(fn: Callable[[], object], iterations: int, warmup: int = 10) -> dict:
+    """Times a synchronous callable."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def bench_async(fn: Callable[[int], Awaitable[object]], iterations: int, warmup: int = 5) -> dict:
+    """Times a coroutine function, called with the iteration number."""
+    for i in range(warmup):
+        await fn(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await fn(warmup + i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def create_seeded_engine(places: int, opinions: int, path: Optional[Path] = None) -> AsyncEngine:
+    """
+    Creates a SQLite database with generated places and opinions.
+
+    Args:
+        places (int): The number of places.
+        opinions (int): The number of opinions, spread evenly over the places.
+        path (Optional[Path]): The database file, in-memory when None.
+
+    Returns:
+        AsyncEngine: The engine of the seeded database.
+    """
+    if path is None:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    else:
+        path.unlink(missing_ok=True)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    configure_engine(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_local = async_sessionmaker(bind=engine, autoflush=False)
+    async with session_local() as session:
+        await session.execute(
+            insert(DBPlace),
+            [
+                {
+                    "name": f"Place {i}",
+                    "description": f"Description of place {i}",
+                    "country": f"Country {i % 20}",
+                    "city": f"City {i % 200}",
+                    "address": f"{i} Main St",
+                }
+                for i in range(1, places + 1)
+            ],
+        )
+        await session.execute(insert(DBPlaceRatingStats), [{"place_id": i} for i in range(1, places + 1)])
+        await session.execute(
+            insert(DBOpinion),
+            [
+                {
+                    "username": f"user_{i}",
+                    "opinion": "A review long enough to resemble what real users write about a place.",
+                    "vote": i % 5 + 1,
+                    "date_of_visit": date(2024, i % 12 + 1, i % 28 + 1),
+                    "place_id": i % places + 1,
+                }
+                for i in range(opinions)
+            ],
+        )
+        await session.commit()
+    return engine
+
+
+def git_revision() -> Optional[str]:
+    """Returns the current commit hash, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: dict, output: Optional[Path] = None) -> Path:
+    """
+    Writes benchmark results with the environment they were measured in.
+
+    Args:
+        results (dict): The benchmark results.
+        output (Optional[Path]): The output file, defaults to a timestamped file in benchmarks/results.
+
+    Returns:
+        Path: The written file.
+    """
+    revision = git_revision()
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{(revision or 'unknown')[:8]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output.write_text(json.dumps(document, indent=2, sort_keys=True))
+    return output
+
+
+def compare(baseline: dict, current: dict, metric: str = "p50_us") -> list[tuple[str, float, float, float]]:
+    """
+    Compares one metric of every benchmark present in both result documents.
+
+    Returns:
+        list: (benchmark, baseline, current, relative change) tuples.
+    """
+    rows = []
+    for group, benchmarks in current["results"].items():
+        if not isinstance(benchmarks, dict):
+            continue
+        for name, stats in benchmarks.items():
+            old = baseline["results"].get(group, {}).get(name)
+            if isinstance(stats, dict) and isinstance(old, dict) and metric in stats and metric in old:
+                change = (stats[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+                rows.append((f"{group}.{name}", old[metric], stats[metric], change))
+    return rows
@@ -0,0 +1,219 @@
+"""Micro-benchmarks of model validation, statement execution and of every repository method."""
+
+import functools
+import json
+import random
+from datetime import date
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from benchmarks.harness import bench, bench_async
+from fastapi_project.core.compression import ENCODERS, available_encoders
+from fastapi_project.core.pagination import Page
+from fastapi_project.core.pydantic_core import CreateOpinion, CreatePlace, Opinion, Place, UpdateOpinion, UpdatePlace
+from fastapi_project.core.serialization import type_adapter
+from fastapi_project.core.sqlalchemy_core import DBOpinion, DBPlace
+from fastapi_project.repositories import OpinionRepository, PlaceRepository
+from fastapi_project.repositories.cache import NullCache
+from fastapi_project.repositories.repositories import GET_PLACE, OPINION_COLUMNS, opinion_from_row, place_from_row
+
+OPINION_DATA = {
+    "username": "benchmark",
+    "opinion": "A review long enough to resemble what real users write about a place.",
+    "vote": 4,
+    "date_of_visit": "2024-05-01",
+    "place_id": 1,
+}
+PLACE_DATA = {
+    "name": "Benchmark place",
+    "description": "A place created by the benchmarks.",
+    "country": "Country 1",
+    "city": "City 1",
+    "address": "1 Main St",
+}
+
+
+SERIALIZATION_ROWS = 10000
+
+
+def serialization_benchmarks(iterations: int, rows: int = SERIALIZATION_ROWS) -> dict:
+    """
+    Times serializing a page of `rows` opinions to JSON bytes.
+
+    Compares FastAPI's default path, which validates the return value against the response model,
+    converts it with jsonable_encoder and encodes it with json.dumps, to the cached TypeAdapter used by the routers.
+    """
+    page = Page[Opinion](items=[Opinion(id=i, **OPINION_DATA) for i in range(rows)], limit=rows)
+    field = create_response_field(name="response", type_=Page[Opinion])
+
+    def fastapi_default():
+        value, _ = field.validate(page, {}, loc=("response",))
+        return json.dumps(jsonable_encoder(field.serialize(value, mode="json"))).encode()
+
+    adapter = type_adapter(Page[Opinion])
+    return {
+        f"fastapi_default_{rows}": bench(fastapi_default, iterations),
+        f"jsonable_encoder_{rows}": bench(lambda: json.dumps(jsonable_encoder(page)).encode(), iterations),
+        f"type_adapter_dump_json_{rows}": bench(lambda: adapter.dump_json(page), iterations),
+    }
+
+
+COMPRESSION_WORDS = (
+    "great food friendly staff view quiet busy clean cosy expensive cheap tasty slow service parking "
+    "terrace music coffee breakfast dinner family kids dog worth visit again crowded lovely noisy fresh"
+).split()
+
+COMPRESSION_LEVELS = {"zstd": (1, 3, 9), "br": (1, 4, 9), "gzip": (1, 6, 9)}
+
+
+def _compress_stream(encoder, lines: list[bytes]) -> bytes:
+    stream = encoder.stream()
+    return b"".join(stream.compress(line) for line in lines) + stream.finish()
+
+
+def compression_benchmarks(iterations: int, rows: int = SERIALIZATION_ROWS) -> dict:
+    """
+    Times compressing a page of `rows` opinions with every available encoding at a few levels.
+
+    The opinions are drawn from a seeded word list, so the ratio resembles real reviews rather than
+    one repeated sentence. Besides the timings every result reports the compressed size and ratio,
+    and a streamed variant compresses the page row by row, flushing each row as the exports do.
+    """
+    rng = random.Random(0)
+    page = Page[Opinion](
+        items=[
+            Opinion(
+                **{
+                    **OPINION_DATA,
+                    "id": i,
+                    "username": f"user_{rng.randrange(rows)}",
+                    "opinion": " ".join(rng.choices(COMPRESSION_WORDS, k=rng.randint(5, 40))),
+                    "vote": rng.randint(1, 5),
+                }
+            )
+            for i in range(rows)
+        ],
+        limit=rows,
+    )
+    body = type_adapter(Page[Opinion]).dump_json(page)
+    lines = [opinion.model_dump_json().encode() + b"\n" for opinion in page.items]
+    results = {}
+
+    def run(label, fn, size):
+        compressed = fn()
+        stats = bench(fn, iterations, warmup=1)
+        results[f"{label}_{rows}"] = {**stats, "bytes": len(compressed), "ratio": size / len(compressed)}
+
+    for name, encoder in available_encoders(tuple(ENCODERS)).items():
+        for level in COMPRESSION_LEVELS[name]:
+            run(f"{name}_{level}", functools.partial(ENCODERS[name](level).compress, body), len(body))
+        run(f"{name}_streamed", functools.partial(_compress_stream, encoder, lines), sum(map(len, lines)))
+    return results
+
+
+def model_benchmarks(iterations: int) -> dict:
+    """Times validation and construction of the pydantic models."""
+    db_opinion = DBOpinion(id=1, **{**OPINION_DATA, "date_of_visit": date(2024, 5, 1)})
+    opinion = Opinion(id=1, **OPINION_DATA)
+    return {
+        "create_opinion_validate": bench(lambda: CreateOpinion(**OPINION_DATA), iterations),
+        "opinion_from_orm_dict": bench(lambda: Opinion(**db_opinion.__dict__), iterations),
+        "opinion_dump_json": bench(opinion.model_dump_json, iterations),
+    }
+
+
+async def repository_benchmarks(engine: AsyncEngine, places: int, opinions: int, iterations: int) -> dict:
+    """
+    Times every repository method against a seeded database.
+
+    The read cache is disabled so every call reaches the database.
+    """
+    session_local = async_sessionmaker(bind=engine, autoflush=False)
+    opinion_repository = OpinionRepository(cache=NullCache())
+    place_repository = PlaceRepository(cache=NullCache())
+    create_opinion = CreateOpinion(**OPINION_DATA)
+    create_place = CreatePlace(**PLACE_DATA)
+    results = {}
+
+    async with session_local() as db:
+
+        async def run(name, fn, calls=iterations):
+            results[name] = await bench_async(fn, calls)
+
+        await run("get_opinions_page", lambda i: opinion_repository.get_opinions_page(db, limit=50))
+        await run("get_opinion", lambda i: opinion_repository.get_opinion(i % opinions + 1, db))
+        await run("create_opinion", lambda i: opinion_repository.create_opinion(create_opinion, db))
+        await run(
+            "update_opinion", lambda i: opinion_repository.update_opinion(i % opinions + 1, UpdateOpinion(vote=3), db)
+        )
+        created = (await db.scalars(select(DBOpinion.id).order_by(DBOpinion.id.desc()).limit(iterations + 5))).all()
+        await run("delete_opinion", lambda i: opinion_repository.delete_opinion(created[i], db))
+
+        await run("get_places_page", lambda i: place_repository.get_places_page(db, limit=50))
+        await run("get_place", lambda i: place_repository.get_place(i % places + 1, db))
+        await run("get_place_stats", lambda i: place_repository.get_place_stats(i % places + 1, db))
+        await run("get_opinions_for_place", lambda i: place_repository.get_opinions_for_place(i % places + 1, db))
+        new_places = []
+
+        async def create(i):
+            new_places.append((await place_repository.create_place(create_place, db)).id)
+
+        await run("create_place", create)
+        await run("update_place", lambda i: place_repository.update_place(new_places[i], UpdatePlace(name="x"), db))
+        await run("delete_place", lambda i: place_repository.delete_place(new_places[i], db))
+    return results
+
+
+async def statement_benchmarks(engine: AsyncEngine, places: int, iterations: int) -> dict:
+    """
+    Times a place lookup with a statement rebuilt on every call against the cached one.
+
+    The rebuilt statement selects the ORM entity, as the repositories used to, so SQLAlchemy computes
+    its cache key and hydrates an instance per call. The cached statement binds the ID as a parameter
+    and selects table columns.
+    """
+    session_local = async_sessionmaker(bind=engine, autoflush=False)
+    results = {}
+
+    async with session_local() as db:
+
+        async def rebuilt(i):
+            place = (await db.scalars(select(DBPlace).filter(DBPlace.id == i % places + 1))).first()
+            db.expunge(place)
+            return Place(**place.__dict__)
+
+        async def cached(i):
+            return place_from_row((await db.execute(GET_PLACE, {"id": i % places + 1})).first())
+
+        results["get_place_rebuilt_orm"] = await bench_async(rebuilt, iterations)
+        results["get_place_cached_core"] = await bench_async(cached, iterations)
+    return results
+
+
+async def row_mapping_benchmarks(engine: AsyncEngine, iterations: int, rows: int = SERIALIZATION_ROWS) -> dict:
+    """
+    Times reading `rows` opinions into models with ORM hydration against Core row mapping.
+
+    ORM hydration builds and tracks a DBOpinion per row before the model is built from its attributes,
+    Core row mapping builds the model straight from the selected columns, as the list read path does.
+    """
+    session_local = async_sessionmaker(bind=engine, autoflush=False)
+
+    async with session_local() as db:
+
+        async def orm_hydration(i):
+            opinions = (await db.scalars(select(DBOpinion).limit(rows))).all()
+            result = [Opinion(**opinion.__dict__) for opinion in opinions]
+            db.expunge_all()
+            return result
+
+        async def core_mapping(i):
+            return [opinion_from_row(row) for row in (await db.execute(select(*OPINION_COLUMNS).limit(rows))).all()]
+
+        return {
+            f"orm_hydration_{rows}": await bench_async(orm_hydration, iterations),
+            f"core_mapping_{rows}": await bench_async(core_mapping, iterations),
+        }
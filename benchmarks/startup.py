@@ -0,0 +1,43 @@
+"""Cold start cost of the app, profiled with `python -X importtime` in fresh interpreters."""
+
+import subprocess
+import sys
+
+from benchmarks.harness import summarize
+
+APP_MODULE = "fastapi_project.app"
+
+
+def import_profile(module: str = APP_MODULE) -> dict[str, int]:
+    """
+    Imports a module in a fresh interpreter and returns what every imported module cost.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        dict[str, int]: Maps every imported module to its cumulative import time in microseconds,
+            itself and the modules it imported first.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def startup_benchmarks(runs: int, module: str = APP_MODULE) -> dict:
+    """
+    Times importing the app in `runs` fresh interpreters.
+
+    Returns:
+        dict: Import time percentiles of the app.
+    """
+    samples = [import_profile(module)[module] / 1e6 for _ in range(runs)]
+    return {f"import {module}": summarize(samples)}
@@ -1,10 +1,9 @@
-import uvicorn
-
-from .app import app
+from .server import run
 
 if __name__ == "__main__":
     """
     This is the main entry point of the FastAPI project.
-    It runs the FastAPI application using uvicorn server.
+    It runs a single uvicorn process, or gunicorn with uvicorn workers when
+    WEB_CONCURRENCY or SERVER_WORKERS asks for more than one worker.
     """
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    run()
@@ -1,15 +1,75 @@
 """FastAPI app module."""
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+from fastapi_project.core.compression import CompressionMiddleware
+from fastapi_project.core.metrics import MetricsMiddleware, render_metrics
+from fastapi_project.db.create_db import dispose_engine, get_engine, get_session_factory
+from fastapi_project.db.pool import pool_stats
+from fastapi_project.db.replicas import mark_write
+from fastapi_project.db.settings import settings
+from fastapi_project.repositories.cache import default_cache
+from fastapi_project.repositories.coalesce import default_single_flight
+from fastapi_project.repositories.ingest import default_write_behind
+from fastapi_project.repositories.leaderboard import default_leaderboard
 from fastapi_project.routers.opinions import router as opinions
 from fastapi_project.routers.places import router as places
+from fastapi_project.warmup import warm_up
+
+
+def _session_factory():
+    # Tests and benchmarks swap the database through the dependency overrides.
+    return app.dependency_overrides.get(get_session_factory, get_session_factory)()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates the database engine of the process and warms it up before the first request, then runs
+    the opinion write-behind queue and the leaderboard refresher, when enabled. On shutdown the queue
+    is drained and the pool closed.
+    """
+    get_engine()
+    connections = settings.pool_size if settings.warmup_connections is None else settings.warmup_connections
+    await warm_up(_session_factory(), connections)
+    if default_write_behind.enabled:
+        await default_write_behind.start(_session_factory())
+    if default_leaderboard.enabled:
+        await default_leaderboard.start(_session_factory())
+    yield
+    await default_leaderboard.stop()
+    await default_write_behind.stop()
+    await dispose_engine()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(places)
 app.include_router(opinions)
 
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """
+    Pins the reads of a client to the primary for a short while after each of its successful writes,
+    so it sees its own changes even if the read replicas lag behind.
+    """
+    response = await call_next(request)
+    if settings.read_urls and request.method not in READ_METHODS and response.status_code < 400:
+        mark_write(response, settings.read_your_writes_seconds)
+    return response
+
+
+# Inside the metrics, so the compression of the body is timed with the request.
+app.add_middleware(CompressionMiddleware)
+# Added last so it wraps everything else and times the whole request.
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/", summary="Endpoint for health check.")
 def health_check():
@@ -23,3 +83,53 @@ def health_check():
         dict: A dictionary with the status "ok".
     """
     return {"status": "ok"}
+
+
+@app.get("/cache/stats", summary="Endpoint for cache statistics.")
+def cache_stats():
+    """
+    Summary: Endpoint for cache statistics.
+
+    Description: Returns the hit, miss, invalidation and eviction counters
+    of the repository read-through cache.
+
+    Returns:
+        dict: A dictionary with the cache counters.
+    """
+    return default_cache.stats.as_dict()
+
+
+@app.get("/pool/stats", summary="Endpoint for connection pool statistics.")
+def connection_pool_stats():
+    """
+    Summary: Endpoint for connection pool statistics.
+
+    Description: Returns the state of the database connection pool together with
+    checkout latency and wait queue counters, used to size the pool.
+
+    Returns:
+        dict: A dictionary with the pool statistics.
+    """
+    return pool_stats(get_engine().pool)
+
+
+@app.get("/metrics", summary="Endpoint for Prometheus metrics.", response_class=PlainTextResponse)
+def metrics():
+    """
+    Summary: Endpoint for Prometheus metrics.
+
+    Description: Returns the per-route latency, query count and database time histograms
+    of this process, together with the cache, connection pool, opinion queue and read coalescing counters.
+
+    Returns:
+        str: The metrics in the Prometheus text exposition format.
+    """
+    gauges = {f"cache_{name}": value for name, value in default_cache.stats.as_dict().items()}
+    for name, value in pool_stats(get_engine().pool).items():
+        if isinstance(value, (int, float)):
+            gauges[f"db_pool_{name}"] = value
+    gauges["opinion_ingest_queue_size"] = default_write_behind.qsize()
+    for name, value in default_single_flight.stats.as_dict().items():
+        gauges[f"single_flight_{name}"] = value
+    gauges["single_flight_in_flight"] = default_single_flight.in_flight()
+    return PlainTextResponse(render_metrics(gauges), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,221 @@
+import os
+from typing import Any, Generic, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+
+from fastapi_project.core.pydantic_core import UpdateOpinion, UpdatePlace, VoteNotInRangeError
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "5000"))
+LOOKUP_MAX_IDS = int(os.getenv("LOOKUP_MAX_IDS", "1000"))
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+
+class BulkItemError(BaseModel):
+    """
+    Represents an item of a bulk request that could not be processed.
+
+    Attributes:
+        index (int): The position of the item in the request.
+        id (Optional[int]): The ID the item refers to, if any.
+        detail (str): The reason the item was rejected.
+    """
+
+    index: int
+    id: Optional[int] = None
+    detail: str
+
+
+class BulkResult(BaseModel, Generic[T]):
+    """
+    Represents the outcome of a bulk request.
+
+    Attributes:
+        items (list): The processed items, in request order.
+        errors (list[BulkItemError]): The rejected items.
+    """
+
+    items: list[T] = []
+    errors: list[BulkItemError] = []
+
+
+class LookupResult(BaseModel, Generic[T]):
+    """
+    Represents the outcome of a lookup by IDs.
+
+    Attributes:
+        items (list): The item of every requested ID, in request order, None for IDs that were not found.
+        missing (list[int]): The requested IDs that were not found.
+    """
+
+    items: list[Optional[T]] = []
+    missing: list[int] = []
+
+
+class BulkUpdateOpinion(UpdateOpinion):
+    """
+    Represents the data required to update one opinion of a bulk update.
+    """
+
+    id: int
+
+
+class BulkUpdatePlace(UpdatePlace):
+    """
+    Represents the data required to update one place of a bulk update.
+    """
+
+    id: int
+
+
+def validate_items(raw_items: list[Any], model: type[M]) -> tuple[list[int], list[M], list[BulkItemError]]:
+    """
+    Validates every item of a bulk request on its own, so one invalid item does not reject the others.
+
+    Args:
+        raw_items (list): The decoded request items.
+        model (type): The model every item is validated against.
+
+    Returns:
+        tuple: The request positions of the valid items, the valid items and the errors of the invalid ones.
+    """
+    positions, items, errors = [], [], []
+    for index, raw in enumerate(raw_items):
+        try:
+            items.append(model.model_validate(raw))
+            positions.append(index)
+        except ValidationError as exc:
+            errors.append(BulkItemError(index=index, detail=str(exc.errors(include_url=False))))
+        except VoteNotInRangeError as exc:
+            errors.append(BulkItemError(index=index, detail=exc.message))
+    return positions, items, errors
+
+
+def merge_results(positions: list[int], result: BulkResult, errors: list[BulkItemError]) -> BulkResult:
+    """
+    Maps the error positions reported by a repository back to request positions and adds validation errors.
+
+    Args:
+        positions (list[int]): The request positions of the items passed to the repository.
+        result (BulkResult): The repository result, with error indexes relative to the items it received.
+        errors (list[BulkItemError]): The validation errors of the request.
+
+    Returns:
+        BulkResult: The result with every error indexed by request position.
+    """
+    remapped = [error.model_copy(update={"index": positions[error.index]}) for error in result.errors]
+    return BulkResult(items=result.items, errors=sorted(errors + remapped, key=lambda error: error.index))
+
+
+def deletion_result(ids: list[int], deleted_ids: set[int], detail: str) -> BulkResult[int]:
+    """
+    Reports the outcome of a bulk deletion, every requested ID once.
+
+    Args:
+        ids (list[int]): The requested IDs, in request order.
+        deleted_ids (set[int]): The IDs that were deleted.
+        detail (str): The error of an ID that was not found.
+
+    Returns:
+        BulkResult[int]: The deleted IDs, and an error at the first request position of every unknown ID.
+    """
+    first_index = {}
+    for index, item_id in enumerate(ids):
+        first_index.setdefault(item_id, index)
+    return BulkResult[int](
+        items=[item_id for item_id in first_index if item_id in deleted_ids],
+        errors=[
+            BulkItemError(index=index, id=item_id, detail=detail)
+            for item_id, index in first_index.items()
+            if item_id not in deleted_ids
+        ],
+    )
+
+
+def parse_ids(value: str) -> list[int]:
+    """
+    Parses a comma separated list of IDs, as passed in a query string.
+
+    Args:
+        value (str): The IDs, e.g. "1,2,3".
+
+    Returns:
+        list[int]: The IDs, in the given order.
+
+    Raises:
+        ValueError: If an ID is not an integer.
+    """
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def check_lookup_size(ids: list[int]):
+    """
+    Rejects a lookup of more than LOOKUP_MAX_IDS IDs.
+
+    Args:
+        ids (list[int]): The requested IDs.
+
+    Raises:
+        HTTPException: 413 if there are too many IDs.
+    """
+    if len(ids) > LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {LOOKUP_MAX_IDS} IDs are allowed per lookup",
+        )
+
+
+def parse_lookup_ids(ids: str) -> list[int]:
+    """
+    Parses the IDs of a lookup passed in a query string.
+
+    Args:
+        ids (str): The comma separated IDs.
+
+    Returns:
+        list[int]: The IDs, in the given order.
+
+    Raises:
+        HTTPException: 400 if an ID is not an integer, 413 if there are too many IDs.
+    """
+    try:
+        parsed = parse_ids(ids)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="IDs must be comma separated integers")
+    check_lookup_size(parsed)
+    return parsed
+
+
+def check_bulk_size(items: list):
+    """
+    Rejects a bulk request of more than BULK_MAX_ITEMS items.
+
+    Args:
+        items (list): The items of the request.
+
+    Raises:
+        HTTPException: 413 if there are too many items.
+    """
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ITEMS} items are allowed per bulk request",
+        )
+
+
+def order_lookup(ids: list[int], found: dict[int, T]) -> LookupResult[T]:
+    """
+    Arranges the items found by a lookup in the order of the requested IDs.
+
+    Args:
+        ids (list[int]): The requested IDs, duplicates are answered at every position.
+        found (dict): Maps the ID of every item found to the item.
+
+    Returns:
+        LookupResult: The items in request order, with None and a `missing` entry for IDs not found.
+    """
+    items = [found.get(item_id) for item_id in ids]
+    missing = list(dict.fromkeys(item_id for item_id in ids if item_id not in found))
+    return LookupResult(items=items, missing=missing)
@@ -0,0 +1,339 @@
+"""Response compression negotiated from Accept-Encoding: zstd, brotli and gzip."""
+
+import asyncio
+import os
+import zlib
+from functools import lru_cache
+from typing import Optional, Protocol
+
+__all__ = [
+    "CompressionMiddleware",
+    "Encoder",
+    "available_encoders",
+    "negotiate_encoding",
+]
+
+# Server preference, the first encoding the client accepts wins.
+COMPRESSION_ENCODINGS = tuple(
+    encoding.strip() for encoding in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if encoding.strip()
+)
+# Smaller bodies are sent as they are, compressing them saves less than it costs.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Bodies at least this large are compressed in a worker thread rather than blocking the event loop.
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", "262144"))
+COMPRESSION_LEVELS = {
+    "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
+    "br": int(os.getenv("COMPRESSION_BR_LEVEL", "4")),
+    "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+}
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+
+class StreamCompressor(Protocol):
+    """Compresses a body sent in several chunks, every chunk is flushed so the client can decode it at once."""
+
+    def compress(self, chunk: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class Encoder(Protocol):
+    """Interface of a content coding."""
+
+    name: str
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def stream(self) -> StreamCompressor: ...
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int) -> None:
+        self.level = level
+
+    def _compressobj(self):
+        # wbits 31 writes the gzip container rather than a raw zlib stream.
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = self._compressobj()
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self) -> StreamCompressor:
+        return _ZlibStream(self._compressobj())
+
+
+class _ZlibStream:
+    def __init__(self, compressor) -> None:
+        self.compressor = compressor
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, level: int) -> None:
+        import brotli
+
+        self.brotli = brotli
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return self.brotli.compress(data, quality=self.level)
+
+    def stream(self) -> StreamCompressor:
+        return _BrotliStream(self.brotli.Compressor(quality=self.level))
+
+
+class _BrotliStream:
+    def __init__(self, compressor) -> None:
+        self.compressor = compressor
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level: int) -> None:
+        import zstandard
+
+        self.zstandard = zstandard
+        self.level = level
+
+    def _compressor(self):
+        # A compressor is not thread safe and only runs one stream at a time, every body gets its own.
+        return self.zstandard.ZstdCompressor(level=self.level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor().compress(data)
+
+    def stream(self) -> StreamCompressor:
+        return _ZstdStream(self._compressor().compressobj(), self.zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+class _ZstdStream:
+    def __init__(self, compressor, flush_block: int) -> None:
+        self.compressor = compressor
+        self.flush_block = flush_block
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.compressor.compress(chunk) + self.compressor.flush(self.flush_block)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+ENCODERS = {"zstd": ZstdEncoder, "br": BrotliEncoder, "gzip": GzipEncoder}
+
+
+@lru_cache(maxsize=None)
+def available_encoders(encodings: tuple[str, ...] = COMPRESSION_ENCODINGS) -> dict[str, Encoder]:
+    """
+    Builds the encoders of the given encodings, in preference order.
+
+    Brotli and zstd need the optional `brotli` and `zstandard` packages, encodings whose package is
+    not installed are left out. The packages are imported on first use, not with the app.
+
+    Args:
+        encodings (tuple[str, ...]): The encoding names, most preferred first.
+
+    Returns:
+        dict[str, Encoder]: Maps every usable encoding to its encoder.
+
+    Raises:
+        ValueError: If an encoding is not supported at all.
+    """
+    encoders = {}
+    for name in encodings:
+        if name not in ENCODERS:
+            raise ValueError(f"Unknown compression encoding {name!r}, expected one of {', '.join(ENCODERS)}")
+        try:
+            encoders[name] = ENCODERS[name](COMPRESSION_LEVELS[name])
+        except ImportError:
+            continue
+    return encoders
+
+
+def negotiate_encoding(accept_encoding: str, encodings) -> Optional[str]:
+    """
+    Picks the content coding of a response.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding header of the request.
+        encodings: The encodings the server supports, most preferred first.
+
+    Returns:
+        Optional[str]: The most preferred supported encoding the client accepts, None for no compression.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _header(headers: list, name: bytes) -> Optional[bytes]:
+    return next((value for key, value in headers if key.lower() == name), None)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies with the best encoding the client accepts.
+
+    Complete bodies smaller than `min_size` are left as they are. Streaming responses, such as the
+    exports, are compressed chunk by chunk, every chunk flushed so the client decodes rows as they arrive.
+    Strong ETags are weakened on compressed responses, as the compressed bytes differ from the identity
+    representation; If-None-Match compares entity tags weakly, so revalidation keeps working.
+
+    Args:
+        app: The ASGI app to wrap.
+        min_size (int): The smallest complete body that is compressed, in bytes.
+        encodings (tuple[str, ...]): The encodings offered, most preferred first.
+    """
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE, encodings: tuple[str, ...] = COMPRESSION_ENCODINGS):
+        self.app = app
+        self.min_size = min_size
+        self.encodings = encodings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _header(scope["headers"], b"accept-encoding")
+        encoders = available_encoders(self.encodings)
+        encoding = negotiate_encoding(accept_encoding.decode("latin-1"), encoders) if accept_encoding else None
+        response = _CompressedResponse(send, encoders.get(encoding), self.min_size)
+        await self.app(scope, receive, response.send_message)
+
+
+class _CompressedResponse:
+    """
+    Compresses the response of a single request.
+
+    The start of the response is held back until `min_size` bytes of body arrived or the body ended,
+    as apps and middlewares may send even small bodies in several chunks. Without an encoder, or for
+    smaller bodies, the body is sent as it is, still with `Vary: Accept-Encoding` so caches keep the
+    representations apart.
+    """
+
+    def __init__(self, send, encoder: Optional[Encoder], min_size: int) -> None:
+        self.send = send
+        self.encoder = encoder
+        self.min_size = min_size
+        self.start: Optional[dict] = None
+        self.started = False
+        self.buffer = b""
+        self.stream: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def send_message(self, message):
+        if message["type"] == "http.response.start":
+            await self._hold_start(message)
+        elif message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+        elif self.stream is not None:
+            await self._send_chunk(message.get("body", b""), message.get("more_body", False))
+        elif self.encoder is None:
+            await self._send_start(compressed=False)
+            await self.send(message)
+        else:
+            await self._buffer(message.get("body", b""), message.get("more_body", False))
+
+    async def _hold_start(self, message):
+        headers = message.get("headers", [])
+        content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+        self.passthrough = (
+            message["status"] < 200
+            or message["status"] in (204, 304)
+            or _header(headers, b"content-encoding") is not None
+            or not content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+        if self.passthrough:
+            await self.send(message)
+            return
+        self.start = message
+        length = _header(headers, b"content-length")
+        if length is not None and length.isdigit() and int(length) < self.min_size:
+            self.encoder = None
+
+    async def _send_start(self, compressed: bool, length: Optional[int] = None):
+        if not self.started:
+            self.started = True
+            await self.send({**self.start, "headers": self._headers(compressed, length)})
+
+    async def _buffer(self, body: bytes, more_body: bool):
+        self.buffer += body
+        if more_body and len(self.buffer) < self.min_size:
+            return
+        body, self.buffer = self.buffer, b""
+        if more_body:
+            self.stream = self.encoder.stream()
+            await self._send_start(compressed=True)
+            await self._send_chunk(body, more_body)
+        elif len(body) < self.min_size:
+            await self._send_start(compressed=False)
+            await self.send({"type": "http.response.body", "body": body})
+        else:
+            # The complete body, its compressed length is known.
+            if len(body) >= COMPRESSION_THREAD_MIN_SIZE:
+                compressed = await asyncio.to_thread(self.encoder.compress, body)
+            else:
+                compressed = self.encoder.compress(body)
+            await self._send_start(compressed=True, length=len(compressed))
+            await self.send({"type": "http.response.body", "body": compressed})
+
+    async def _send_chunk(self, body: bytes, more_body: bool):
+        chunk = self.stream.compress(body) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _headers(self, compressed: bool, length: Optional[int]) -> list:
+        """Returns the response headers, adjusted for a compressed body of the given length, None when streamed."""
+        headers, vary = [], None
+        for key, value in self.start.get("headers", []):
+            name = key.lower()
+            if name == b"vary":
+                vary = value
+                continue
+            if compressed and name == b"content-length":
+                continue
+            if compressed and name == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            headers.append((key, value))
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+            vary += b", Accept-Encoding"
+        headers.append((b"vary", vary))
+        if compressed:
+            headers.append((b"content-encoding", self.encoder.name.encode("latin-1")))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode("latin-1")))
+        return headers
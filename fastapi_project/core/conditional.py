@@ -0,0 +1,123 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+
+
+class Version(NamedTuple):
+    """
+    Represents the state of a resource or collection, as far as caching clients are concerned.
+
+    Attributes:
+        tag (str): Changes whenever the representation changes.
+        updated_at (Optional[datetime]): The UTC time of the last write, None when it cannot be told,
+            as for collections rows can be deleted from.
+    """
+
+    tag: str
+    updated_at: Optional[datetime] = None
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Builds a strong entity tag from the values the representation depends on.
+
+    Args:
+        *parts: The resource name, its version tag and anything else changing the body, such as query parameters.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    raw = "\x1f".join(str(part) for part in parts).encode()
+    return f'"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    """Formats a naive UTC datetime as an HTTP date."""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Checks an If-None-Match header against an entity tag, using the weak comparison the header requires.
+
+    Args:
+        if_none_match (str): The header value, `*` or a comma separated list of entity tags.
+        etag (str): The current entity tag.
+
+    Returns:
+        bool: True if the client already holds the current representation.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: str, updated_at: datetime) -> bool:
+    """Checks an If-Modified-Since header against a naive UTC datetime, ignoring unparsable dates."""
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return updated_at.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def set_validators(response: Response, etag: str, updated_at: Optional[datetime] = None) -> None:
+    """Adds the ETag and, when known, the Last-Modified header to a response."""
+    response.headers["ETag"] = etag
+    if updated_at is not None:
+        response.headers["Last-Modified"] = http_date(updated_at)
+
+
+def not_modified(request: Request, etag: str, updated_at: Optional[datetime] = None) -> Optional[Response]:
+    """
+    Answers a conditional GET without building the body.
+
+    If-None-Match takes precedence, If-Modified-Since is only used when it is absent.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The current entity tag.
+        updated_at (Optional[datetime]): The UTC time of the last write, if known.
+
+    Returns:
+        Optional[Response]: A 304 response carrying the validators, or None if the body has to be sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = if_modified_since is not None and updated_at is not None
+        fresh = fresh and not_modified_since(if_modified_since, updated_at)
+    if not fresh:
+        return None
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, updated_at)
+    return response
+
+
+def tag_response(request: Request, response: Response) -> Response:
+    """
+    Tags a response with a strong entity tag hashed from its body, and answers a matching If-None-Match with 304.
+
+    Used for listings, whose body depends on many rows: hashing the page costs no query, where an aggregate
+    version of the collection would scan the table, and the tag is exact for every filter and ordering.
+    The page is still read and serialized, a 304 only spares sending it.
+
+    Args:
+        request (Request): The incoming request.
+        response (Response): The complete response.
+
+    Returns:
+        Response: A 304 response if the client holds the body, the tagged response otherwise.
+    """
+    etag = f'"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    set_validators(response, etag)
+    return response
@@ -0,0 +1,53 @@
+import os
+from enum import Enum
+from typing import AsyncIterator, Iterable
+
+from pydantic import BaseModel
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+MAX_EXPORT_BATCH_SIZE = int(os.getenv("MAX_EXPORT_BATCH_SIZE", "10000"))
+
+
+class ExportFormat(str, Enum):
+    """
+    Represents the supported export formats.
+
+    Attributes:
+        ndjson: One JSON document per line.
+        json: A single JSON array.
+    """
+
+    ndjson = "ndjson"
+    json = "json"
+
+    @property
+    def media_type(self) -> str:
+        """The media type of the exported body."""
+        return "application/x-ndjson" if self is ExportFormat.ndjson else "application/json"
+
+
+async def serialize_batches(batches: AsyncIterator[Iterable[BaseModel]], fmt: ExportFormat) -> AsyncIterator[bytes]:
+    """
+    Serializes batches of models into body chunks as they arrive.
+
+    Args:
+        batches (AsyncIterator): Batches of models to serialize.
+        fmt (ExportFormat): The export format.
+
+    Yields:
+        bytes: One body chunk per batch.
+    """
+    if fmt is ExportFormat.ndjson:
+        async for batch in batches:
+            chunk = b"".join(model.model_dump_json().encode() + b"\n" for model in batch)
+            if chunk:
+                yield chunk
+        return
+
+    separator = b"["
+    async for batch in batches:
+        chunk = b",".join(model.model_dump_json().encode() for model in batch)
+        if chunk:
+            yield separator + chunk
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
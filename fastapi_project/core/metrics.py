@@ -0,0 +1,192 @@
+"""
+Per-process request and database metrics, exposed in the Prometheus text format.
+
+Every worker process keeps its own registry, Prometheus scrapes and aggregates them per instance.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Label value of requests no route matched, so unknown paths cannot grow the label set.
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass
+class RequestTiming:
+    """
+    Database work done while serving the current request.
+
+    Attributes:
+        queries (int): The number of statements executed.
+        db_seconds (float): The time spent executing them.
+    """
+
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_timing", default=None)
+
+
+class Histogram:
+    """
+    Prometheus style histogram with one series per label set.
+
+    Args:
+        name (str): The metric name.
+        help (str): The metric description.
+        labels (Sequence[str]): The label names.
+        buckets (Sequence[float]): The upper bounds of the buckets, +Inf is added.
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        """Records one observation for the given label values."""
+        series = self._series.get(label_values)
+        if series is None:
+            # Per bucket counts, then the sum of all observations.
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        """Returns the number of observations for the given label values."""
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to the start of its response.",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    "http_request_db_queries",
+    "Database statements executed per request.",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing database statements per request.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+HISTOGRAMS = (request_duration, request_queries, request_db_duration)
+
+
+def record_query(seconds: float):
+    """Adds one executed statement to the timing of the current request, if any."""
+    timing = current_timing.get()
+    if timing is not None:
+        timing.queries += 1
+        timing.db_seconds += seconds
+
+
+def render_metrics(gauges: Optional[dict[str, float]] = None) -> str:
+    """
+    Returns every metric in the Prometheus text exposition format.
+
+    Args:
+        gauges (Optional[dict[str, float]]): Point in time values rendered after the histograms.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, value in (gauges or {}).items():
+        lines.extend((f"# TYPE {name} gauge", f"{name} {value}"))
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(total_seconds: float, timing: RequestTiming) -> str:
+    """Formats the Server-Timing header of a request."""
+    return (
+        f"app;dur={total_seconds * 1000:.2f}, " f'db;dur={timing.db_seconds * 1000:.2f};desc="{timing.queries} queries"'
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and database work of every HTTP request.
+
+    The per-route histograms are labelled with the route template rather than the path, and every
+    response gets a Server-Timing header with the time spent in the app and in the database.
+    The timing stops when the response starts, the body of a streaming response is not included.
+
+    Args:
+        app: The ASGI app to wrap.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        start = time.perf_counter()
+        started = False
+
+        async def send_with_timing(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                elapsed = time.perf_counter() - start
+                header = server_timing(elapsed, timing).encode("latin-1")
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header)]
+                self._record(scope, message["status"], elapsed, timing)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            if not started:
+                self._record(scope, 500, time.perf_counter() - start, timing)
+            raise
+        finally:
+            current_timing.reset(token)
+
+    @staticmethod
+    def _record(scope, status: int, elapsed: float, timing: RequestTiming):
+        route = scope.get("route")
+        route_path = getattr(route, "path", UNMATCHED_ROUTE)
+        method = scope["method"]
+        request_duration.observe(elapsed, method, route_path, str(status))
+        request_queries.observe(timing.queries, method, route_path)
+        request_db_duration.observe(timing.db_seconds, method, route_path)
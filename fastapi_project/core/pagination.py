@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+import os
+from typing import Any, Callable, Generic, Optional, Sequence, TypeVar
+
+from pydantic import BaseModel
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(Exception):
+    """Exception raised when a pagination cursor cannot be decoded."""
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class Page(BaseModel, Generic[T]):
+    """
+    Represents a single page of a keyset-paginated collection.
+
+    Attributes:
+        items (list): The items on this page.
+        next_cursor (Optional[str]): Opaque cursor of the next page, None on the last page.
+        limit (int): The maximum number of items requested for this page.
+    """
+
+    items: list[T]
+    next_cursor: Optional[str] = None
+    limit: int
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """
+    Encodes a keyset position into an opaque cursor.
+
+    Args:
+        key (Sequence): The sort key values of the last item on a page.
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    raw = json.dumps(list(key), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 1) -> list:
+    """
+    Decodes an opaque cursor back into a keyset position.
+
+    Args:
+        cursor (str): The cursor produced by encode_cursor.
+        size (int): The expected number of key values.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+
+    Returns:
+        list: The sort key values stored in the cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+    if not isinstance(key, list) or len(key) != size:
+        raise InvalidCursorError("Invalid cursor")
+    return key
+
+
+def build_page(rows: Sequence[T], limit: int, key: Callable[[T], Sequence[Any]]) -> Page[T]:
+    """
+    Builds a page from rows fetched with `LIMIT limit + 1`.
+
+    Args:
+        rows (Sequence): The fetched rows, at most one more than limit.
+        limit (int): The requested page size.
+        key (Callable): Returns the keyset position of a row.
+
+    Returns:
+        Page: The page with next_cursor set when more rows are available.
+    """
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > limit else None
+    return Page(items=items, next_cursor=next_cursor, limit=limit)
@@ -1,7 +1,8 @@
 from datetime import date
+from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, field_serializer, field_validator
+from pydantic import BaseModel, field_validator
 
 
 class VoteNotInRangeError(Exception):
@@ -48,28 +49,6 @@ class CreateOpinion(BaseModel):
             raise VoteNotInRangeError(value, "Vote must be in range 1-5")
         return value
 
-    @field_serializer("date_of_visit")
-    @classmethod
-    def serialize_date_of_visit(cls, value):
-        """
-        Serializes the date_of_visit field.
-
-        Args:
-            value: The value of the date_of_visit field.
-
-        Returns:
-            The serialized value of the date_of_visit field.
-
-        Serializes the date_of_visit value to a string in the format "YYYY-MM-DD".
-        """
-        if value is None:
-            return value
-
-        if isinstance(value, str):
-            return value
-
-        return value.strftime("%Y-%m-%d")
-
 
 class UpdateOpinion(CreateOpinion):
     """
@@ -109,8 +88,8 @@ class CreatePlace(BaseModel):
     name: str
     description: str
     country: str
-    city: Optional[str] = None
-    address: Optional[str] = None
+    city: str
+    address: str
 
 
 class UpdatePlace(CreatePlace):
@@ -131,3 +110,89 @@ class Place(CreatePlace):
     """
 
     id: int
+
+
+class PlaceStats(BaseModel):
+    """
+    Represents the rating statistics of a place.
+
+    Attributes:
+        place_id (int): The ID of the place.
+        count (int): The number of opinions about the place.
+        mean (Optional[float]): The average vote, None when there are no opinions.
+        histogram (dict[int, int]): The number of opinions for every vote from 1 to 5.
+    """
+
+    place_id: int
+    count: int
+    mean: Optional[float] = None
+    histogram: dict[int, int]
+
+
+class ExpandedPlace(Place):
+    """
+    Represents a place with related data embedded, as requested with `expand`.
+
+    Attributes:
+        opinions (Optional[list[Opinion]]): The most recent opinions about the place, None unless expanded.
+        stats (Optional[PlaceStats]): The rating statistics of the place, None unless expanded.
+    """
+
+    opinions: Optional[list[Opinion]] = None
+    stats: Optional[PlaceStats] = None
+
+
+class RankedPlace(Place):
+    """
+    Represents a place on the leaderboard.
+
+    Attributes:
+        count (int): The number of opinions about the place.
+        mean (float): The average vote.
+        score (float): The Bayesian average vote the leaderboard is ordered by.
+    """
+
+    count: int
+    mean: float
+    score: float
+
+
+class OpinionSort(str, Enum):
+    """
+    Represents the orderings of the opinions of a place.
+
+    Attributes:
+        recent: By date of visit, most recent first, opinions without a date last.
+        vote: By vote, highest first.
+    """
+
+    recent = "recent"
+    vote = "vote"
+
+
+class PlaceExpand(str, Enum):
+    """
+    Represents the related data that can be embedded in place responses.
+
+    Attributes:
+        opinions: The most recent opinions about the place.
+        stats: The rating statistics of the place.
+    """
+
+    opinions = "opinions"
+    stats = "stats"
+
+
+class PlaceSort(str, Enum):
+    """
+    Represents the orderings of the place listing.
+
+    Attributes:
+        id: By ID, ascending.
+        name: By name, ascending.
+        rating: By mean vote, best rated first.
+    """
+
+    id = "id"
+    name = "name"
+    rating = "rating"
@@ -0,0 +1,158 @@
+"""
+Full-text indexes of the searchable tables.
+
+SQLite gets an external-content FTS5 table per indexed table, PostgreSQL a generated tsvector column
+with a GIN index. Both are maintained by the database within the statement writing the row, so every
+write path, bulk statements and cascading deletes included, keeps the index in sync.
+"""
+
+from dataclasses import dataclass
+
+from sqlalchemy import column, event, func, literal_column, select, table
+
+# Text search configuration of the PostgreSQL index, the SQLite tokenizer stems the same way.
+SEARCH_CONFIG = "english"
+SQLITE_TOKENIZER = "porter unicode61 remove_diacritics 2"
+SEARCH_COLUMN = "search"
+# PostgreSQL weight classes, in decreasing order of importance.
+WEIGHT_CLASSES = "ABCD"
+
+
+@dataclass(frozen=True)
+class FullTextIndex:
+    """
+    Represents the full-text index of a table.
+
+    Attributes:
+        table (str): The indexed table, with an integer `id` primary key.
+        columns (tuple[str, ...]): The indexed text columns, in decreasing order of importance.
+        weights (tuple[float, ...]): The bm25 weight of every column on SQLite.
+    """
+
+    table: str
+    columns: tuple[str, ...]
+    weights: tuple[float, ...]
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.table}_fts"
+
+    def sqlite_create(self) -> list[str]:
+        """Returns the statements creating the FTS5 table and the triggers keeping it in sync."""
+        columns = ", ".join(self.columns)
+        new = ", ".join(f"new.{name}" for name in self.columns)
+        old = ", ".join(f"old.{name}" for name in self.columns)
+        insert_new = f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.id, {new});"
+        delete_old = (
+            f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+        )
+        return [
+            f"CREATE VIRTUAL TABLE {self.fts_table} USING fts5({columns}, content='{self.table}', "
+            f"content_rowid='id', tokenize='{SQLITE_TOKENIZER}')",
+            f"CREATE TRIGGER {self.fts_table}_insert AFTER INSERT ON {self.table} BEGIN {insert_new} END",
+            f"CREATE TRIGGER {self.fts_table}_delete AFTER DELETE ON {self.table} BEGIN {delete_old} END",
+            f"CREATE TRIGGER {self.fts_table}_update AFTER UPDATE OF {columns} ON {self.table} "
+            f"BEGIN {delete_old} {insert_new} END",
+        ]
+
+    def sqlite_drop(self) -> list[str]:
+        """Returns the statements dropping the triggers and the FTS5 table."""
+        triggers = [f"DROP TRIGGER IF EXISTS {self.fts_table}_{action}" for action in ("insert", "delete", "update")]
+        return [*triggers, f"DROP TABLE IF EXISTS {self.fts_table}"]
+
+    def postgresql_create(self) -> list[str]:
+        """Returns the statements adding the generated tsvector column and its GIN index."""
+        document = " || ".join(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({name}, '')), '{weight}')"
+            for name, weight in zip(self.columns, WEIGHT_CLASSES)
+        )
+        return [
+            f"ALTER TABLE {self.table} ADD COLUMN {SEARCH_COLUMN} tsvector GENERATED ALWAYS AS ({document}) STORED",
+            f"CREATE INDEX ix_{self.table}_{SEARCH_COLUMN} ON {self.table} USING gin ({SEARCH_COLUMN})",
+        ]
+
+    def postgresql_drop(self) -> list[str]:
+        """Returns the statements dropping the tsvector column, which drops its index too."""
+        return [f"ALTER TABLE {self.table} DROP COLUMN IF EXISTS {SEARCH_COLUMN}"]
+
+
+PLACES_INDEX = FullTextIndex("places", ("name", "description"), (4.0, 1.0))
+OPINIONS_INDEX = FullTextIndex("opinions", ("opinion",), (1.0,))
+FULL_TEXT_INDEXES = (PLACES_INDEX, OPINIONS_INDEX)
+
+
+def attach(indexed_table, index: FullTextIndex):
+    """
+    Creates the full-text index along with the table, so `metadata.create_all` builds it too.
+
+    Args:
+        indexed_table (Table): The indexed table.
+        index (FullTextIndex): Its full-text index.
+    """
+
+    def create(target, connection, **kw):
+        statements = {"sqlite": index.sqlite_create, "postgresql": index.postgresql_create}.get(connection.dialect.name)
+        for statement in statements() if statements else ():
+            connection.exec_driver_sql(statement)
+
+    def drop(target, connection, **kw):
+        if connection.dialect.name == "sqlite":
+            for statement in index.sqlite_drop():
+                connection.exec_driver_sql(statement)
+
+    event.listen(indexed_table, "after_create", create)
+    event.listen(indexed_table, "before_drop", drop)
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Alembic filter hiding the full-text index objects, which are not part of the metadata, from autogenerate."""
+    fts_tables = tuple(index.fts_table for index in FULL_TEXT_INDEXES)
+    if type_ == "table" and name.startswith(fts_tables):
+        return False
+    if type_ == "column" and name == SEARCH_COLUMN and reflected:
+        return False
+    if type_ == "index" and name.startswith(tuple(f"ix_{index.table}_{SEARCH_COLUMN}" for index in FULL_TEXT_INDEXES)):
+        return False
+    return True
+
+
+def match_query(q: str) -> str:
+    """
+    Turns free text into an FTS5 query matching rows that contain every term.
+
+    Every term is quoted, so operators and unbalanced quotes in user input are searched for as text
+    instead of raising syntax errors.
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def ranked_matches(dialect: str, index: FullTextIndex, model, columns, q: str):
+    """
+    Builds the query of the rows matching a search, with a `score` column, higher is more relevant.
+
+    Args:
+        dialect (str): The name of the database dialect.
+        index (FullTextIndex): The full-text index of the model's table.
+        model: The mapped class of the table.
+        columns: The columns to select.
+        q (str): The search text, every term must match.
+
+    Returns:
+        Select: The query of the matching rows and their scores.
+    """
+    if dialect == "postgresql":
+        tsquery = func.plainto_tsquery(SEARCH_CONFIG, q)
+        document = literal_column(f"{index.table}.{SEARCH_COLUMN}")
+        score = func.ts_rank(document, tsquery)
+        return select(*columns, score.label("score")).where(document.op("@@")(tsquery))
+
+    fts_table = table(index.fts_table, column("rowid"))
+    fts_name = literal_column(index.fts_table)
+    # bm25 is lower for better matches.
+    score = -func.bm25(fts_name, *index.weights)
+    return (
+        select(*columns, score.label("score"))
+        .select_from(model)
+        .join(fts_table, fts_table.c.rowid == model.id)
+        .where(fts_name.op("MATCH")(match_query(q)))
+    )
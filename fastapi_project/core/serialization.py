@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(annotation: Any) -> TypeAdapter:
+    """
+    Returns the cached TypeAdapter of a type, so its pydantic-core serializer is only built once.
+
+    Args:
+        annotation: A hashable type such as `list[Opinion]` or `Page[Place]`.
+
+    Returns:
+        TypeAdapter: The adapter of the type.
+    """
+    return TypeAdapter(annotation)
+
+
+def json_response(
+    content: Any,
+    annotation: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    Serializes content straight to JSON bytes with pydantic-core.
+
+    Returning the response from a route skips FastAPI's validation of the return value and its
+    `jsonable_encoder` pass, the route's `response_model` is then only used for the OpenAPI schema.
+
+    Args:
+        content: The value to serialize, already an instance of the annotated type.
+        annotation: The type of the content.
+        status_code (int): The response status code.
+        headers (Optional[Mapping[str, str]]): Additional response headers.
+
+    Returns:
+        Response: The JSON response.
+    """
+    body = type_adapter(annotation).dump_json(content)
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -1,14 +1,21 @@
-from datetime import date
+from datetime import date, datetime, timezone
 from typing import Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from fastapi_project.core.search import OPINIONS_INDEX, PLACES_INDEX, attach
+
 
 class Base(DeclarativeBase):
     pass
 
 
+def utcnow() -> datetime:
+    """Returns the current UTC time as the naive datetime stored in updated_at columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class DBOpinion(Base):
     """
     Represents an opinion in the database.
@@ -20,6 +27,8 @@ class DBOpinion(Base):
         vote (int): The vote associated with the opinion.
         date_of_visit (date, optional): The date of the visit associated with the opinion.
         place_id (int): The ID of the place associated with the opinion.
+        version (int): Incremented by the repositories on every update.
+        updated_at (datetime): The UTC time of the last write.
         place (DBPlace): The place associated with the opinion.
 
     Methods:
@@ -27,13 +36,20 @@ class DBOpinion(Base):
     """
 
     __tablename__ = "opinions"
+    __table_args__ = (
+        # Read backwards it serves the recent ordering on SQLite, which sorts nulls first in ascending order.
+        Index("ix_opinions_place_id_date_of_visit_id", "place_id", "date_of_visit", "id").ddl_if(dialect="sqlite"),
+        Index("ix_opinions_place_id_vote_id", "place_id", "vote", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     username: Mapped[str]
     opinion: Mapped[Optional[str]]
     vote: Mapped[int]
     date_of_visit: Mapped[Optional[date]]
-    place_id: Mapped[int] = mapped_column(ForeignKey("places.id"))
+    place_id: Mapped[int] = mapped_column(ForeignKey("places.id", ondelete="CASCADE"))
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(default=utcnow)
 
     place = relationship("DBPlace", back_populates="opinions")
 
@@ -55,10 +71,18 @@ class DBPlace(Base):
         country (str): The country where the place is located.
         city (str): The city where the place is located.
         address (str): The address of the place.
+        version (int): Incremented by the repositories on every update.
+        updated_at (datetime): The UTC time of the last write.
         opinions (list): The opinions associated with the place.
     """
 
     __tablename__ = "places"
+    __table_args__ = (
+        Index("ix_places_country_city_name", "country", "city", "name"),
+        Index("ix_places_city_name", "city", "name"),
+        Index("ix_places_name", "name", postgresql_ops={"name": "text_pattern_ops"}),
+        Index("ix_places_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str]
@@ -66,11 +90,103 @@ class DBPlace(Base):
     country: Mapped[str]
     city: Mapped[str]
     address: Mapped[str]
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(default=utcnow)
 
-    opinions = relationship("DBOpinion", back_populates="place", cascade="all, delete")
+    opinions = relationship("DBOpinion", back_populates="place", cascade="all, delete", passive_deletes=True)
+    rating_stats = relationship("DBPlaceRatingStats", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    ranking = relationship("DBPlaceRanking", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return (
             f"<DBPlace(name={self.name}, description={self.description}, "
             f"country={self.country}, city={self.city}, address={self.address})>"
         )
+
+
+class DBPlaceRatingStats(Base):
+    """
+    Represents the denormalized rating statistics of a place.
+
+    The row is kept up to date by the opinion repository in the same transaction
+    as every opinion write, so reading the statistics never scans the opinions.
+
+    Attributes:
+        place_id (int): The ID of the place the statistics belong to.
+        count (int): The number of opinions about the place.
+        total (int): The sum of all votes about the place.
+        votes_1 - votes_5 (int): The number of opinions with the given vote.
+        rating (float): The mean vote, 0 when there are no opinions; kept as a column so it can be indexed.
+        updated_at (datetime): The UTC time of the last change, the leaderboard refresh starts from it.
+    """
+
+    __tablename__ = "place_rating_stats"
+    __table_args__ = (Index("ix_place_rating_stats_updated_at", "updated_at"),)
+
+    place_id: Mapped[int] = mapped_column(ForeignKey("places.id", ondelete="CASCADE"), primary_key=True)
+    count: Mapped[int] = mapped_column(default=0, server_default="0")
+    total: Mapped[int] = mapped_column(default=0, server_default="0")
+    votes_1: Mapped[int] = mapped_column(default=0, server_default="0")
+    votes_2: Mapped[int] = mapped_column(default=0, server_default="0")
+    votes_3: Mapped[int] = mapped_column(default=0, server_default="0")
+    votes_4: Mapped[int] = mapped_column(default=0, server_default="0")
+    votes_5: Mapped[int] = mapped_column(default=0, server_default="0")
+    rating: Mapped[float] = mapped_column(default=0.0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(default=utcnow)
+
+    def __repr__(self):
+        return f"<DBPlaceRatingStats(place_id={self.place_id}, count={self.count}, total={self.total})>"
+
+
+class DBPlaceRanking(Base):
+    """
+    Represents the leaderboard entry of a place.
+
+    The rows are precomputed from the rating statistics by the leaderboard refresher, only places
+    with opinions are ranked. The location is copied from the place so rankings filter on their own index.
+
+    Attributes:
+        place_id (int): The ID of the ranked place.
+        country (str): The country of the place.
+        city (str): The city of the place.
+        count (int): The number of opinions about the place.
+        mean (float): The mean vote.
+        score (float): The Bayesian average of the votes, the mean pulled towards the mean of all votes
+            the fewer opinions the place has.
+        ranked_at (datetime): The UTC time the place was last ranked. Refreshes only rank the changed places
+            again, the oldest of these dates the last full rebuild.
+    """
+
+    __tablename__ = "place_rankings"
+    __table_args__ = (
+        Index("ix_place_rankings_score", "score", "place_id"),
+        Index("ix_place_rankings_country_score", "country", "score", "place_id"),
+        Index("ix_place_rankings_country_city_score", "country", "city", "score", "place_id"),
+        Index("ix_place_rankings_ranked_at", "ranked_at"),
+    )
+
+    place_id: Mapped[int] = mapped_column(ForeignKey("places.id", ondelete="CASCADE"), primary_key=True)
+    country: Mapped[str]
+    city: Mapped[str]
+    count: Mapped[int]
+    mean: Mapped[float]
+    score: Mapped[float]
+    ranked_at: Mapped[datetime]
+
+    def __repr__(self):
+        return f"<DBPlaceRanking(place_id={self.place_id}, score={self.score})>"
+
+
+# PostgreSQL sorts nulls last in ascending order, an ascending index read backwards would yield
+# DESC NULLS FIRST, so the recent ordering of the opinions of a place gets an index in its own order.
+Index(
+    "ix_opinions_place_id_recent",
+    DBOpinion.place_id,
+    DBOpinion.date_of_visit.desc().nulls_last(),
+    DBOpinion.id.desc(),
+).ddl_if(dialect="postgresql")
+# Serves the places listing by rating, best first and ties by place ID, in index order.
+Index("ix_place_rating_stats_rating_place_id", DBPlaceRatingStats.rating.desc(), DBPlaceRatingStats.place_id)
+
+attach(DBPlace.__table__, PLACES_INDEX)
+attach(DBOpinion.__table__, OPINIONS_INDEX)
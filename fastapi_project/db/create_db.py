@@ -1,10 +1,149 @@
 import os
+import time
+from functools import partial
+from typing import Optional
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///dev.db")
-engine = create_async_engine(DATABASE_URL)
-session_local = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from fastapi_project.core.metrics import record_query
+from fastapi_project.db.pool import InstrumentedAsyncAdaptedQueuePool
+from fastapi_project.db.replicas import READ_SESSION_KEY, REPLICA_SESSION_KEY, ReadRouter, wrote_recently
+from fastapi_project.db.settings import DatabaseSettings, settings
+
+DATABASE_URL = settings.url
+
+
+def _set_sqlite_pragmas(pragmas: dict, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - conn.info["query_start"].pop())
+
+
+def _handle_error(exception_context):
+    if exception_context.connection is not None and exception_context.connection.info.get("query_start"):
+        record_query(time.perf_counter() - exception_context.connection.info["query_start"].pop())
+
+
+def configure_engine(engine: AsyncEngine, db_settings: DatabaseSettings = settings) -> AsyncEngine:
+    """
+    Apply connection level settings the schema relies on.
+
+    SQLite does not enforce foreign keys, and therefore ON DELETE CASCADE, unless enabled per connection.
+    The other pragmas come from the settings, WAL mode in particular lets reads run during a write.
+    Every statement is timed and counted towards the metrics of the request that executed it.
+
+    Args:
+        engine (AsyncEngine): The engine to configure.
+        db_settings (DatabaseSettings): The settings providing the pragmas.
+
+    Returns:
+        The configured engine.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", partial(_set_sqlite_pragmas, db_settings.sqlite_pragmas()))
+    return engine
+
+
+def create_engine(db_settings: DatabaseSettings = settings) -> AsyncEngine:
+    """
+    Create the application engine from the settings.
+
+    Pooled engines use a queue pool instrumented with checkout latency and wait queue metrics.
+
+    Args:
+        db_settings (DatabaseSettings): The database settings.
+
+    Returns:
+        The configured engine.
+    """
+    kwargs = db_settings.engine_kwargs()
+    if not db_settings.is_memory:
+        kwargs["poolclass"] = InstrumentedAsyncAdaptedQueuePool
+    return configure_engine(create_async_engine(db_settings.url, **kwargs), db_settings)
+
+
+def create_read_router(db_settings: DatabaseSettings = settings) -> ReadRouter:
+    """
+    Create the engines of the read replicas from the settings.
+
+    Args:
+        db_settings (DatabaseSettings): The database settings, every replica shares the pool settings of the primary.
+
+    Returns:
+        The router picking a replica for every read session.
+    """
+    engines = [create_engine(db_settings.model_copy(update={"url": url})) for url in db_settings.replica_urls]
+    return ReadRouter(engines, db_settings.read_strategy)
+
+
+# The engines are created on first use, normally by the app lifespan, rather than at import time:
+# importing the app stays cheap and never loads a database driver or opens a pool.
+engine: Optional[AsyncEngine] = None
+read_router = ReadRouter()
+session_local = async_sessionmaker(autocommit=False, autoflush=False)
+_engine_pid: Optional[int] = None
+
+
+def init_engine(db_settings: DatabaseSettings = settings) -> AsyncEngine:
+    """
+    Create the engines of the current process and bind the session factory to the primary.
+
+    Forked workers may inherit the engine of the process the app was preloaded in, and pooled
+    connections must never be used from two processes. An inherited pool is dropped without
+    closing its connections, as they still belong to the parent.
+
+    Args:
+        db_settings (DatabaseSettings): The database settings.
+
+    Returns:
+        The new primary engine.
+    """
+    global engine, read_router, _engine_pid
+    if engine is not None:
+        for inherited in (engine, *read_router.engines):
+            inherited.sync_engine.dispose(close=False)
+    engine = create_engine(db_settings)
+    read_router = create_read_router(db_settings)
+    session_local.configure(bind=engine)
+    _engine_pid = os.getpid()
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Get the engine of the current process, creating it first if there is none yet or the process was forked since.
+
+    Returns:
+        The engine.
+    """
+    if _engine_pid != os.getpid():
+        init_engine()
+    return engine
+
+
+async def dispose_engine():
+    """Close the pooled connections of the current process, the engines are created again on next use."""
+    global engine, read_router, _engine_pid
+    if engine is not None and _engine_pid == os.getpid():
+        for current in (engine, *read_router.engines):
+            await current.dispose()
+    engine = None
+    read_router = ReadRouter()
+    _engine_pid = None
 
 
 async def get_db():
@@ -14,8 +153,64 @@ async def get_db():
     Returns:
         Database session object.
     """
+    get_engine()
     database = session_local()
     try:
         yield database
     finally:
         await database.close()
+
+
+def get_session_factory():
+    """
+    Get the database session factory.
+
+    Used by endpoints that outlive the request scope, such as streaming responses,
+    which have to open and close their own session while the body is being sent.
+
+    Returns:
+        Session factory callable.
+    """
+    get_engine()
+    return session_local
+
+
+def _read_session_factory(request: Request):
+    get_engine()
+    replica = None if wrote_recently(request) else read_router.pick()
+    if replica is None:
+        return partial(session_local, info={READ_SESSION_KEY: True})
+    return partial(session_local, bind=replica, info={READ_SESSION_KEY: True, REPLICA_SESSION_KEY: True})
+
+
+async def get_read_db(request: Request):
+    """
+    Get a database session for reads only.
+
+    The session is bound to a read replica when DATABASE_READ_URLS is set, unless the client
+    wrote within the read-your-writes window, in which case it reads from the primary.
+
+    Args:
+        request (Request): The incoming request, carrying the read-your-writes cookie.
+
+    Returns:
+        Database session object.
+    """
+    database = _read_session_factory(request)()
+    try:
+        yield database
+    finally:
+        await database.close()
+
+
+def get_read_session_factory(request: Request):
+    """
+    Get the session factory for reads that outlive the request scope, such as streaming responses.
+
+    Args:
+        request (Request): The incoming request, carrying the read-your-writes cookie.
+
+    Returns:
+        Session factory callable, bound to the replica picked for the request.
+    """
+    return _read_session_factory(request)
@@ -5,8 +5,8 @@ from datetime import date
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from fastapi_project.app import app
 from fastapi_project.core.sqlalchemy_core import Base, DBOpinion, DBPlace
+from fastapi_project.repositories.repositories import backfill_rating_stats
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///dev.db")
 ENGINE: AsyncEngine = create_async_engine(DATABASE_URL, echo=True)
@@ -80,6 +80,7 @@ async def example_data(session: AsyncSession):
         session.add(new_opinion)
 
     await session.commit()
+    await backfill_rating_stats(session)
 
 
 async def create_all():
@@ -0,0 +1,81 @@
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+@dataclass
+class PoolMetrics:
+    """
+    Counters describing how long requests wait for a pooled connection.
+
+    Attributes:
+        checkouts (int): Connections handed out by the pool.
+        timeouts (int): Checkouts that gave up after pool_timeout.
+        waiting (int): Checkouts currently waiting for a connection.
+        max_waiting (int): The highest number of concurrently waiting checkouts seen.
+        wait_seconds_total (float): Time spent in checkout, including opening new connections.
+        wait_seconds_max (float): The longest single checkout.
+    """
+
+    checkouts: int = 0
+    timeouts: int = 0
+    waiting: int = 0
+    max_waiting: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def as_dict(self) -> dict:
+        result = asdict(self)
+        result["wait_seconds_avg"] = self.wait_seconds_total / self.checkouts if self.checkouts else 0.0
+        return result
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool recording checkout latency and the size of the wait queue.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        metrics = self.metrics
+        metrics.waiting += 1
+        metrics.max_waiting = max(metrics.max_waiting, metrics.waiting)
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            metrics.waiting -= 1
+        elapsed = time.perf_counter() - start
+        metrics.checkouts += 1
+        metrics.wait_seconds_total += elapsed
+        metrics.wait_seconds_max = max(metrics.wait_seconds_max, elapsed)
+        return connection
+
+
+def pool_stats(pool) -> dict:
+    """
+    Describe the current state of a connection pool.
+
+    Args:
+        pool: The pool of an engine.
+
+    Returns:
+        dict: The pool status and, for instrumented pools, the checkout metrics.
+    """
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, InstrumentedAsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            **pool.metrics.as_dict(),
+        )
+    return stats
@@ -0,0 +1,67 @@
+import itertools
+import time
+from typing import Optional, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+# Session.info key marking sessions bound to a replica.
+REPLICA_SESSION_KEY = "replica"
+# Session.info key marking sessions that only read, whether from a replica or the primary.
+READ_SESSION_KEY = "read"
+
+
+class ReadRouter:
+    """
+    Picks the read replica serving the next read session.
+
+    Args:
+        engines (Sequence[AsyncEngine]): The replica engines, reads go to the primary when empty.
+        strategy (str): `round_robin` cycles through the replicas, `least_loaded` picks the replica
+            with the fewest checked out connections.
+    """
+
+    def __init__(self, engines: Sequence[AsyncEngine] = (), strategy: str = "round_robin"):
+        self.engines = list(engines)
+        self.strategy = strategy
+        self._turn = itertools.count()
+
+    def pick(self) -> Optional[AsyncEngine]:
+        """
+        Returns the replica engine for the next read session, None when there are no replicas.
+
+        Ties between equally loaded replicas are broken round-robin, so idle replicas share the load.
+        """
+        if not self.engines:
+            return None
+        start = next(self._turn) % len(self.engines)
+        rotated = self.engines[start:] + self.engines[:start]
+        if self.strategy == "least_loaded":
+            return min(rotated, key=_checked_out)
+        return rotated[0]
+
+
+def _checked_out(engine: AsyncEngine) -> int:
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout is not None else 0
+
+
+def mark_write(response: Response, seconds: float):
+    """
+    Pins the reads of the client to the primary for the given number of seconds.
+
+    Args:
+        response (Response): The response to a successful write.
+        seconds (float): The read-your-writes window.
+    """
+    until = time.time() + seconds
+    response.set_cookie(READ_YOUR_WRITES_COOKIE, f"{until:.3f}", max_age=max(1, round(seconds)), httponly=True)
+
+
+def wrote_recently(request: Request) -> bool:
+    """Whether the client made a write whose read-your-writes window is still open."""
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
@@ -0,0 +1,109 @@
+from typing import Any, Literal, Optional
+
+from pydantic import AliasChoices, Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy.engine import make_url
+
+
+class DatabaseSettings(BaseSettings):
+    """
+    Database engine settings, read from `DB_*` environment variables.
+
+    Attributes:
+        url (str): The database URL, also read from DATABASE_URL.
+        read_urls (str): Comma separated URLs of read replicas, also read from DATABASE_READ_URLS.
+        read_strategy (str): How a replica is picked for a read session, `round_robin` or `least_loaded`.
+        read_your_writes_seconds (float): Seconds a client's reads stay on the primary after its own write,
+            covering the replication lag.
+        echo (bool): Log every statement.
+        pool_size (int): The number of connections kept open in the pool.
+        max_overflow (int): The number of connections opened above pool_size under burst load.
+        pool_timeout (float): Seconds to wait for a free connection before failing.
+        pool_recycle (int): Seconds after which a connection is replaced, -1 to never recycle.
+        pool_pre_ping (bool): Test connections on checkout and replace stale ones.
+        statement_cache_size (int): Size of the asyncpg prepared statement cache per connection, 0 disables it.
+        warmup_connections (Optional[int]): Connections opened when the app starts, before it serves requests,
+            defaults to pool_size. 0 disables the warm-up.
+        sqlite_journal_mode (str): SQLite journal mode, WAL lets readers run concurrently with a writer.
+        sqlite_synchronous (str): SQLite synchronous mode.
+        sqlite_busy_timeout (int): Milliseconds SQLite waits on a locked database before failing.
+        sqlite_cache_size (int): SQLite page cache size, negative values are in KiB.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="DB_", populate_by_name=True)
+
+    url: str = Field("sqlite+aiosqlite:///dev.db", validation_alias=AliasChoices("DATABASE_URL", "DB_URL"))
+    # A plain string, pydantic-settings would decode a list from the environment as JSON.
+    read_urls: str = Field("", validation_alias=AliasChoices("DATABASE_READ_URLS", "DB_READ_URLS"))
+    read_strategy: Literal["round_robin", "least_loaded"] = "round_robin"
+    read_your_writes_seconds: float = 5.0
+    echo: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100
+    warmup_connections: Optional[int] = Field(None, ge=0)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout: int = 5000
+    sqlite_cache_size: int = -16000
+
+    @field_validator("read_urls", mode="before")
+    @classmethod
+    def join_read_urls(cls, value):
+        """Accepts the replica URLs as a list too, and drops the blanks around them."""
+        urls = value.split(",") if isinstance(value, str) else value
+        return ",".join(url.strip() for url in urls if url.strip())
+
+    @property
+    def replica_urls(self) -> list[str]:
+        """The URLs of the read replicas."""
+        return self.read_urls.split(",") if self.read_urls else []
+
+    @property
+    def dialect(self) -> str:
+        """The dialect name of the database URL."""
+        return make_url(self.url).get_backend_name()
+
+    @property
+    def is_memory(self) -> bool:
+        """Whether the URL points to an in-memory SQLite database, which cannot use a queue pool."""
+        database: Optional[str] = make_url(self.url).database
+        return self.dialect == "sqlite" and database in (None, "", ":memory:")
+
+    def sqlite_pragmas(self) -> dict[str, Any]:
+        """The pragmas applied to every new SQLite connection."""
+        return {
+            "foreign_keys": "ON",
+            # Matches PostgreSQL semantics and lets prefix LIKE filters use indexes.
+            "case_sensitive_like": "ON",
+            "journal_mode": self.sqlite_journal_mode,
+            "synchronous": self.sqlite_synchronous,
+            "busy_timeout": self.sqlite_busy_timeout,
+            "cache_size": self.sqlite_cache_size,
+        }
+
+    def engine_kwargs(self) -> dict[str, Any]:
+        """
+        The keyword arguments for create_async_engine.
+
+        Returns:
+            dict: Pool sizing applies to every database except in-memory SQLite,
+                the statement cache only to asyncpg.
+        """
+        kwargs: dict[str, Any] = {"echo": self.echo, "pool_pre_ping": self.pool_pre_ping}
+        if not self.is_memory:
+            kwargs.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_recycle=self.pool_recycle,
+            )
+        if make_url(self.url).get_driver_name() == "asyncpg":
+            kwargs["connect_args"] = {"prepared_statement_cache_size": self.statement_cache_size}
+        return kwargs
+
+
+settings = DatabaseSettings()
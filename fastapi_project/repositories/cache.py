@@ -0,0 +1,177 @@
+import os
+import pickle
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Optional, Protocol
+
+__all__ = ["CacheBackend", "CacheStats", "LRUCache", "NullCache", "RedisCache", "cache_from_env", "default_cache"]
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "10000"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing how a cache is being used.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to fall through to the database.
+        invalidations (int): Keys removed because the underlying row changed.
+        evictions (int): Keys dropped because of size or TTL bounds.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class CacheBackend(Protocol):
+    """
+    Interface of the cache used by the repositories.
+
+    A missing key is reported as None, so None values are never cached.
+    """
+
+    stats: CacheStats
+
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+    async def clear(self) -> None: ...
+
+
+class NullCache:
+    """Cache backend that stores nothing, used when caching is disabled."""
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[Any]:
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class LRUCache:
+    """
+    In-process least recently used cache with a time to live.
+
+    Args:
+        maxsize (int): The maximum number of entries kept.
+        ttl (float): The number of seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: float = CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.evictions += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.stats.invalidations += 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisCache:
+    """
+    Cache backend storing pickled values in a Redis compatible server.
+
+    Args:
+        client: An asyncio client exposing `get`, `set(key, value, ex=...)` and `delete`,
+            such as `redis.asyncio.Redis` or an in-memory fake.
+        ttl (float): The number of seconds an entry stays valid.
+        prefix (str): Prefix added to every key, so several apps can share a server.
+    """
+
+    def __init__(self, client, ttl: float = CACHE_TTL, prefix: str = "fastapi_project:") -> None:
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return pickle.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(self.ttl)))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            self.stats.invalidations += await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+def cache_from_env() -> CacheBackend:
+    """
+    Build the cache backend selected by the CACHE_BACKEND environment variable.
+
+    Returns:
+        CacheBackend: `memory` (default), `redis` or `none`.
+    """
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    if CACHE_BACKEND == "redis":
+        from redis.asyncio import Redis
+
+        return RedisCache(Redis.from_url(CACHE_REDIS_URL))
+    return LRUCache()
+
+
+default_cache = cache_from_env()
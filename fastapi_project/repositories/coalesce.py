@@ -0,0 +1,133 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi_project.db.replicas import READ_SESSION_KEY, REPLICA_SESSION_KEY
+
+__all__ = ["SingleFlight", "SingleFlightStats", "coalesced", "default_single_flight"]
+
+logger = logging.getLogger(__name__)
+
+# Seconds a caller waits for a query started by another one before running its own, 0 disables coalescing.
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "5"))
+
+
+@dataclass
+class SingleFlightStats:
+    """
+    Counters describing how reads are coalesced.
+
+    Attributes:
+        queries (int): Reads that ran their query.
+        coalesced (int): Reads answered by a query another caller had in flight.
+        timeouts (int): Reads that gave up waiting for the query in flight and ran their own.
+    """
+
+    queries: int = 0
+    coalesced: int = 0
+    timeouts: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads: while a read is in flight, callers with the same key
+    await its result instead of running the same query again.
+
+    The shared read runs in a task of its own, so a waiter being cancelled never cancels it.
+
+    Args:
+        timeout (float): Seconds a waiter waits for the read in flight before running its own,
+            0 disables coalescing.
+    """
+
+    def __init__(self, timeout: float = SINGLE_FLIGHT_TIMEOUT) -> None:
+        self.timeout = timeout
+        self.stats = SingleFlightStats()
+        self._flights: dict[Any, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        """Returns the number of reads currently in flight."""
+        return len(self._flights)
+
+    async def do(self, key: Any, read: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """
+        Run a read, or await the identical one already in flight.
+
+        Args:
+            key: Identifies the read, callers with equal keys share the result, exceptions included.
+            read (Callable): Starts the read when none is in flight.
+            timeout (Optional[float]): Overrides the waiting timeout for this key.
+
+        Returns:
+            The result of the read.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if timeout <= 0:
+            return await read()
+        flight = self._flights.get(key)
+        if flight is None:
+            return await self._lead(key, read)
+
+        self.stats.coalesced += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight), timeout)
+        except asyncio.TimeoutError:
+            self.stats.coalesced -= 1
+            self.stats.timeouts += 1
+            # The read in flight is stuck, later callers start a new one.
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            return await self._lead(key, read)
+
+    async def _lead(self, key: Any, read: Callable[[], Awaitable[Any]]) -> Any:
+        flight = asyncio.ensure_future(read())
+        self._flights[key] = flight
+        flight.add_done_callback(functools.partial(self._land, key))
+        self.stats.queries += 1
+        try:
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            # The read runs on the session of the caller, which is closed once the caller is gone,
+            # so the caller only leaves when the read it shares with the waiters is done.
+            await asyncio.wait([flight])
+            raise
+
+    def _land(self, key: Any, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled() and flight.exception() is not None:
+            # Retrieved here so a failed read nobody awaited any more is not reported as unhandled.
+            logger.debug("Coalesced read %r failed", key, exc_info=flight.exception())
+
+
+def coalesced(method: Callable) -> Callable:
+    """
+    Coalesces concurrent calls of a repository read method with the same arguments.
+
+    Only sessions marked as read sessions are coalesced, a session that wrote has to read its own
+    uncommitted changes. Reads on replicas and on the primary never share a result.
+    The repository provides the SingleFlight as its `single_flight` attribute.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        db = bound.arguments["db"]
+        if not db.info.get(READ_SESSION_KEY, False):
+            return await method(self, *args, **kwargs)
+        arguments = tuple((name, value) for name, value in bound.arguments.items() if name not in ("self", "db"))
+        key = (method.__qualname__, db.info.get(REPLICA_SESSION_KEY, False), arguments)
+        return await self.single_flight.do(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
+
+
+default_single_flight = SingleFlight()
@@ -0,0 +1,435 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Callable, Optional, Protocol
+
+from pydantic import BaseModel
+
+from fastapi_project.core.pydantic_core import CreateOpinion
+from fastapi_project.repositories.repositories import opinion_repository
+
+__all__ = [
+    "IngestBackend",
+    "IngestStatus",
+    "IngestTicket",
+    "MemoryIngestBackend",
+    "OpinionWriteBehind",
+    "QueueFullError",
+    "RedisIngestBackend",
+    "default_write_behind",
+    "get_write_behind",
+    "ingest_backend_from_env",
+]
+
+logger = logging.getLogger(__name__)
+
+# `sync` commits every POST /opinions/ before answering, `queue` answers 202 and writes in batches.
+OPINION_INGEST = os.getenv("OPINION_INGEST", "sync")
+INGEST_BACKEND = os.getenv("INGEST_BACKEND", "memory")
+INGEST_REDIS_URL = os.getenv("INGEST_REDIS_URL", "redis://localhost:6379/0")
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "0.05"))
+INGEST_STATUS_TTL = float(os.getenv("INGEST_STATUS_TTL", "3600"))
+INGEST_STATUS_MAXSIZE = int(os.getenv("INGEST_STATUS_MAXSIZE", "100000"))
+INGEST_LEASE_TTL = float(os.getenv("INGEST_LEASE_TTL", "30"))
+# Seconds before a batch whose write failed is tried again, doubled on every failure up to the maximum.
+INGEST_RETRY_DELAY = float(os.getenv("INGEST_RETRY_DELAY", "0.5"))
+INGEST_RETRY_MAX_DELAY = float(os.getenv("INGEST_RETRY_MAX_DELAY", "30"))
+
+
+class QueueFullError(Exception):
+    """Exception raised when the write-behind queue cannot take more opinions."""
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class IngestStatus(str, Enum):
+    queued = "queued"
+    created = "created"
+    failed = "failed"
+
+
+class IngestTicket(BaseModel):
+    """
+    Represents the state of a queued opinion.
+
+    Attributes:
+        tracking_id (str): The ID returned when the opinion was accepted.
+        status (IngestStatus): Whether the opinion is still queued, was created or failed.
+        opinion_id (Optional[int]): The ID of the created opinion.
+        detail (Optional[str]): The reason the opinion failed.
+    """
+
+    tracking_id: str
+    status: IngestStatus = IngestStatus.queued
+    opinion_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class IngestBackend(Protocol):
+    """
+    Interface of the store keeping the queued opinions and the tickets.
+
+    A durable backend keeps the opinions accepted but not yet written, so they are written
+    after a restart instead of being lost with the in-process queue. Every worker only writes
+    the opinions it accepted itself or claimed from a worker that stopped.
+    """
+
+    async def add(self, ticket: IngestTicket, opinion: CreateOpinion) -> None: ...
+
+    async def claim(self) -> list[tuple[IngestTicket, CreateOpinion]]: ...
+
+    async def renew(self) -> None: ...
+
+    async def complete(self, tickets: list[IngestTicket]) -> None: ...
+
+    async def get(self, tracking_id: str) -> Optional[IngestTicket]: ...
+
+
+class MemoryIngestBackend:
+    """
+    In-process backend, queued opinions are lost if the process dies.
+
+    Only a single worker can use it: the ticket of an opinion is only known to the worker that accepted it.
+
+    Args:
+        maxsize (int): The maximum number of tickets kept, the oldest are dropped first.
+    """
+
+    def __init__(self, maxsize: int = INGEST_STATUS_MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self._tickets: OrderedDict[str, IngestTicket] = OrderedDict()
+
+    async def add(self, ticket: IngestTicket, opinion: CreateOpinion) -> None:
+        self._store(ticket)
+
+    async def claim(self) -> list[tuple[IngestTicket, CreateOpinion]]:
+        return []
+
+    async def renew(self) -> None:
+        pass
+
+    async def complete(self, tickets: list[IngestTicket]) -> None:
+        for ticket in tickets:
+            self._store(ticket)
+
+    async def get(self, tracking_id: str) -> Optional[IngestTicket]:
+        return self._tickets.get(tracking_id)
+
+    def _store(self, ticket: IngestTicket) -> None:
+        self._tickets[ticket.tracking_id] = ticket
+        self._tickets.move_to_end(ticket.tracking_id)
+        while len(self._tickets) > self.maxsize:
+            self._tickets.popitem(last=False)
+
+
+class RedisIngestBackend:
+    """
+    Backend keeping the queued opinions in Redis hashes and the tickets as expiring keys.
+
+    Every worker queues into a hash of its own and holds a lease, renewed while it runs. A starting
+    worker claims the hashes of the workers whose lease expired, never the opinions of a running one.
+    Claiming takes the lease of the stopped worker first, so only one of several workers starting
+    together gets its opinions. A worker dying while it moves them may leave them in both hashes,
+    the opinions are written at least once.
+
+    Args:
+        client: An asyncio client exposing `get`, `set(key, value, ex=..., nx=...)`, `delete`, `hset`, `hgetall`,
+            `hdel`, `sadd`, `smembers` and `srem`, such as `redis.asyncio.Redis` or an in-memory fake.
+        ttl (float): The number of seconds a ticket stays available.
+        lease_ttl (float): The number of seconds a worker counts as running after renewing its lease.
+        prefix (str): Prefix added to every key, so several apps can share a server.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl: float = INGEST_STATUS_TTL,
+        lease_ttl: float = INGEST_LEASE_TTL,
+        prefix: str = "fastapi_project:ingest:",
+    ) -> None:
+        self.client = client
+        self.ttl = ttl
+        self.lease_ttl = lease_ttl
+        self.prefix = prefix
+        self.worker_id = uuid.uuid4().hex
+
+    async def add(self, ticket: IngestTicket, opinion: CreateOpinion) -> None:
+        await self.client.hset(self._pending_key(self.worker_id), ticket.tracking_id, opinion.model_dump_json())
+        await self._store(ticket)
+
+    async def claim(self) -> list[tuple[IngestTicket, CreateOpinion]]:
+        # A new ID on every start, the workers forked from a preloaded app share this instance.
+        self.worker_id = uuid.uuid4().hex
+        await self.renew()
+        await self.client.sadd(self.prefix + "workers", self.worker_id)
+        entries = {}
+        for worker_id in map(_text, await self.client.smembers(self.prefix + "workers")):
+            if worker_id == self.worker_id or not await self.client.set(
+                self._lease_key(worker_id), self.worker_id, ex=self._lease_seconds, nx=True
+            ):
+                continue
+            stopped = await self.client.hgetall(self._pending_key(worker_id))
+            if stopped:
+                await self.client.hset(self._pending_key(self.worker_id), mapping=stopped)
+            await self.client.delete(self._pending_key(worker_id), self._lease_key(worker_id))
+            await self.client.srem(self.prefix + "workers", worker_id)
+            entries.update(stopped)
+        return [
+            (IngestTicket(tracking_id=_text(tracking_id)), CreateOpinion.model_validate_json(raw))
+            for tracking_id, raw in entries.items()
+        ]
+
+    async def renew(self) -> None:
+        await self.client.set(self._lease_key(self.worker_id), self.worker_id, ex=self._lease_seconds)
+
+    async def complete(self, tickets: list[IngestTicket]) -> None:
+        for ticket in tickets:
+            await self._store(ticket)
+        if tickets:
+            await self.client.hdel(self._pending_key(self.worker_id), *(ticket.tracking_id for ticket in tickets))
+
+    async def get(self, tracking_id: str) -> Optional[IngestTicket]:
+        raw = await self.client.get(self.prefix + tracking_id)
+        return None if raw is None else IngestTicket.model_validate_json(raw)
+
+    async def _store(self, ticket: IngestTicket) -> None:
+        await self.client.set(self.prefix + ticket.tracking_id, ticket.model_dump_json(), ex=max(1, int(self.ttl)))
+
+    @property
+    def _lease_seconds(self) -> int:
+        return max(1, int(self.lease_ttl))
+
+    def _pending_key(self, worker_id: str) -> str:
+        return f"{self.prefix}pending:{worker_id}"
+
+    def _lease_key(self, worker_id: str) -> str:
+        return f"{self.prefix}lease:{worker_id}"
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class OpinionWriteBehind:
+    """
+    Accepts opinions into an in-process queue and writes them in batches.
+
+    A background task takes the queued opinions and writes up to `batch_size` of them in one
+    transaction, as soon as the batch is full or `flush_interval` seconds after its first opinion.
+    Another one renews the lease of the worker on the backend every `renew_interval` seconds.
+
+    Only the opinions rejected on their own, such as those about an unknown place, fail. A batch whose
+    write fails as a whole, as during a database outage, stays pending and is written again after
+    `retry_delay` seconds, doubled on every failure up to `retry_max_delay`. A batch still failing when
+    the writer stops is left to the backend, a durable one hands it to the next worker.
+
+    Args:
+        backend (IngestBackend): The store of the queued opinions and their tickets.
+        maxsize (int): The number of opinions the queue holds before submissions are refused.
+        batch_size (int): The maximum number of opinions written per transaction.
+        flush_interval (float): The number of seconds a batch waits to fill up.
+        enabled (bool): Whether POST /opinions/ queues opinions instead of writing them.
+        renew_interval (float): The number of seconds between two renewals of the lease.
+        retry_delay (float): The number of seconds before a failed batch is written again.
+        retry_max_delay (float): The longest wait between two writes of a failed batch.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[IngestBackend] = None,
+        maxsize: int = INGEST_QUEUE_SIZE,
+        batch_size: int = INGEST_BATCH_SIZE,
+        flush_interval: float = INGEST_FLUSH_INTERVAL,
+        enabled: bool = OPINION_INGEST == "queue",
+        renew_interval: float = INGEST_LEASE_TTL / 3,
+        retry_delay: float = INGEST_RETRY_DELAY,
+        retry_max_delay: float = INGEST_RETRY_MAX_DELAY,
+    ) -> None:
+        self.backend = MemoryIngestBackend() if backend is None else backend
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.renew_interval = renew_interval
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self._stopping = asyncio.Event()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._renew_task: Optional[asyncio.Task] = None
+        self._reserved = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def qsize(self) -> int:
+        """Returns the number of opinions waiting to be written."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def check_workers(self, workers: int):
+        """
+        Check the queue can serve the given number of worker processes.
+
+        Args:
+            workers (int): The number of worker processes of the server.
+
+        Raises:
+            ValueError: If opinions are queued in the memory backend by more than one worker, the status
+                of an opinion would only be found by the worker that accepted it.
+        """
+        if self.enabled and workers > 1 and isinstance(self.backend, MemoryIngestBackend):
+            raise ValueError("OPINION_INGEST=queue with several workers needs INGEST_BACKEND=redis")
+
+    async def start(self, session_factory: Callable):
+        """
+        Start the background writer, first queueing the opinions the backend still holds from stopped workers.
+
+        Args:
+            session_factory (Callable): Opens the database sessions the batches are written with.
+        """
+        if self.running:
+            return
+        # Unbounded, the opinions claimed may outnumber maxsize. submit() enforces the limit.
+        self._queue = asyncio.Queue()
+        self._stopping.clear()
+        for entry in await self.backend.claim():
+            self._queue.put_nowait(entry)
+        self._task = asyncio.create_task(self._run(session_factory))
+        self._renew_task = asyncio.create_task(self._renew())
+
+    async def stop(self):
+        """Write the opinions still queued, then stop the background writer."""
+        if not self.running:
+            return
+        self._stopping.set()
+        await self._queue.join()
+        for task in (self._task, self._renew_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._renew_task = None
+
+    async def submit(self, opinion: CreateOpinion) -> IngestTicket:
+        """
+        Queue an opinion to be written.
+
+        Args:
+            opinion (CreateOpinion): The validated opinion.
+
+        Returns:
+            IngestTicket: The ticket to look the outcome up with.
+
+        Raises:
+            QueueFullError: If the queue is full or the writer is not running.
+        """
+        if not self.running:
+            raise QueueFullError("Opinion queue is not running")
+        # The slot is reserved before the backend is awaited, concurrent submissions cannot take it meanwhile.
+        if self._queue.qsize() + self._reserved >= self.maxsize:
+            raise QueueFullError("Opinion queue is full")
+        ticket = IngestTicket(tracking_id=uuid.uuid4().hex)
+        self._reserved += 1
+        try:
+            await self.backend.add(ticket, opinion)
+            self._queue.put_nowait((ticket, opinion))
+        finally:
+            self._reserved -= 1
+        return ticket
+
+    async def status(self, tracking_id: str) -> Optional[IngestTicket]:
+        """Returns the ticket with the given tracking ID, None if it is unknown or expired."""
+        return await self.backend.get(tracking_id)
+
+    async def _run(self, session_factory: Callable):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size and (timeout := deadline - loop.time()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch, session_factory)
+            except Exception:
+                logger.exception("Recording the outcome of %d queued opinions failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.backend.renew()
+            except Exception:
+                logger.exception("Renewing the lease of the opinion queue failed")
+
+    async def _write(self, batch: list[tuple[IngestTicket, CreateOpinion]], session_factory: Callable):
+        """Writes one batch in a single transaction, until it succeeds or the writer stops, and records the outcome."""
+        delay = self.retry_delay
+        while True:
+            try:
+                async with session_factory() as db:
+                    result = await opinion_repository.create_opinions([opinion for _, opinion in batch], db)
+                break
+            except Exception:
+                if self._stopping.is_set():
+                    logger.exception("Writing a batch of %d queued opinions failed, they stay pending", len(batch))
+                    return
+                logger.exception("Writing a batch of %d queued opinions failed, retrying in %.1fs", len(batch), delay)
+            # Stopping cuts the wait short, the batch is tried once more before it is left pending.
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.retry_max_delay)
+        errors = {error.index: error.detail for error in result.errors}
+        created = iter(result.items)
+        outcome = [
+            (
+                ticket.model_copy(update={"status": IngestStatus.failed, "detail": errors[index]})
+                if index in errors
+                else ticket.model_copy(update={"status": IngestStatus.created, "opinion_id": next(created).id})
+            )
+            for index, (ticket, _) in enumerate(batch)
+        ]
+        await self.backend.complete(outcome)
+
+
+def ingest_backend_from_env() -> IngestBackend:
+    """
+    Build the ingest backend selected by the INGEST_BACKEND environment variable.
+
+    Returns:
+        IngestBackend: `memory` (default) or `redis`.
+    """
+    if INGEST_BACKEND == "redis":
+        from redis.asyncio import Redis
+
+        return RedisIngestBackend(Redis.from_url(INGEST_REDIS_URL))
+    return MemoryIngestBackend()
+
+
+default_write_behind = OpinionWriteBehind(ingest_backend_from_env())
+
+
+def get_write_behind() -> OpinionWriteBehind:
+    """
+    Get the write-behind queue of the process.
+
+    Returns:
+        OpinionWriteBehind: The queue started with the app.
+    """
+    return default_write_behind
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import DateTime, Float, cast, delete, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_project.core.sqlalchemy_core import DBPlace, DBPlaceRanking, DBPlaceRatingStats, utcnow
+
+__all__ = [
+    "LeaderboardRefresher",
+    "default_leaderboard",
+    "mean_vote",
+    "rank_places",
+]
+
+logger = logging.getLogger(__name__)
+
+# Places returned by GET /places/top when no limit is given.
+LEADERBOARD_SIZE = 10
+# Seconds between refreshes of the place rankings, 0 disables the refresher.
+LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "30"))
+# Seconds between full rebuilds, which also recompute the mean of all votes the scores are pulled towards.
+LEADERBOARD_REBUILD_INTERVAL = float(os.getenv("LEADERBOARD_REBUILD_INTERVAL", "3600"))
+# How many opinions the mean of all votes weighs in a score.
+LEADERBOARD_PRIOR_WEIGHT = float(os.getenv("LEADERBOARD_PRIOR_WEIGHT", "10"))
+# Rows written up to this many seconds before the previous refresh are ranked again, which covers
+# transactions still open during it and clocks of other processes running slightly behind.
+LEADERBOARD_REFRESH_OVERLAP = float(os.getenv("LEADERBOARD_REFRESH_OVERLAP", "5"))
+# PostgreSQL advisory lock held by the worker refreshing the rankings.
+LEADERBOARD_LOCK_KEY = 0x6C656164
+
+
+async def rank_places(
+    db: AsyncSession,
+    prior_mean: float,
+    prior_weight: float = LEADERBOARD_PRIOR_WEIGHT,
+    since: Optional[datetime] = None,
+) -> int:
+    """
+    Recompute the rankings of places from their rating statistics.
+
+    The score is the Bayesian average `(prior_weight * prior_mean + total) / (prior_weight + count)`,
+    so a place with a handful of excellent votes does not outrank one with hundreds of good ones.
+    Places without opinions are not ranked. The rankings are upserted and only the places that lost
+    their last opinion are deleted, so the leaderboard is never empty while it is refreshed.
+
+    Args:
+        db (Session): The database session, committed on success.
+        prior_mean (float): The mean of all votes.
+        prior_weight (float): How many opinions the prior mean weighs.
+        since (Optional[datetime]): Only rank again the places whose statistics or location changed since
+            this UTC time, None ranks every place.
+
+    Returns:
+        int: The number of places whose ranking was recomputed.
+    """
+    stats = DBPlaceRatingStats
+    score = (literal(prior_weight * prior_mean, Float) + cast(stats.total, Float)) / (
+        literal(prior_weight, Float) + stats.count
+    )
+    ranked = (
+        select(
+            stats.place_id, DBPlace.country, DBPlace.city, stats.count, stats.rating, score, literal(utcnow(), DateTime)
+        )
+        .join(DBPlace, DBPlace.id == stats.place_id)
+        .where(stats.count > 0)
+    )
+    dropped = delete(DBPlaceRanking).where(
+        DBPlaceRanking.place_id.not_in(select(stats.place_id).where(stats.count > 0))
+    )
+    if since is not None:
+        # Opinion writes update the statistics row of their place, place updates its location.
+        changed = (
+            select(stats.place_id)
+            .where(stats.updated_at >= since)
+            .union(select(DBPlace.id).where(DBPlace.updated_at >= since))
+        )
+        ranked = ranked.where(stats.place_id.in_(changed))
+        dropped = dropped.where(DBPlaceRanking.place_id.in_(changed))
+    await db.execute(dropped)
+    columns = ["place_id", "country", "city", "count", "mean", "score", "ranked_at"]
+    upsert = _insert(db.get_bind().dialect.name)(DBPlaceRanking).from_select(columns, ranked)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[DBPlaceRanking.place_id], set_={name: upsert.excluded[name] for name in columns[1:]}
+    )
+    result = await db.execute(upsert)
+    await db.commit()
+    return result.rowcount
+
+
+def _insert(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+async def mean_vote(db: AsyncSession) -> float:
+    """Returns the mean of all votes, read from the rating statistics, 0 when there are none."""
+    count, total = (
+        await db.execute(select(func.sum(DBPlaceRatingStats.count), func.sum(DBPlaceRatingStats.total)))
+    ).one()
+    return total / count if count else 0.0
+
+
+class LeaderboardRefresher:
+    """
+    Keeps the place rankings up to date in the background.
+
+    Refreshes only rank again the places changed since the previous refresh, so their cost follows
+    the write rate rather than the size of the tables. A full rebuild, which also recomputes the mean
+    of all votes, runs when the rankings are empty or were last rebuilt `rebuild_interval` seconds ago.
+
+    Every process runs its own refresher. The rankings record when they were built, so a process
+    starting next to running ones picks up from their last refresh rather than rebuilding. On
+    PostgreSQL an advisory lock lets a single process refresh at a time, the others skip their turn.
+    """
+
+    def __init__(
+        self,
+        interval: float = LEADERBOARD_REFRESH_INTERVAL,
+        rebuild_interval: float = LEADERBOARD_REBUILD_INTERVAL,
+        prior_weight: float = LEADERBOARD_PRIOR_WEIGHT,
+        overlap: float = LEADERBOARD_REFRESH_OVERLAP,
+    ) -> None:
+        self.interval = interval
+        self.rebuild_interval = rebuild_interval
+        self.prior_weight = prior_weight
+        self.overlap = timedelta(seconds=overlap)
+        self.prior_mean: Optional[float] = None
+        self.refreshed_at: Optional[datetime] = None
+        self.rebuilt_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Refresh the rankings once, rebuilding them all when they were never built or the rebuild is due.
+
+        Args:
+            db (Session): The database session.
+
+        Returns:
+            int: The number of places whose ranking was recomputed, 0 when another process is refreshing them.
+        """
+        started = utcnow()
+        if db.get_bind().dialect.name == "postgresql":
+            locked = (await db.execute(select(func.pg_try_advisory_xact_lock(LEADERBOARD_LOCK_KEY)))).scalar()
+            if not locked:
+                # The next refresh starts from the previous one of this process, which covers this turn too.
+                await db.rollback()
+                return 0
+        rebuild_interval = timedelta(seconds=self.rebuild_interval)
+        if self.rebuilt_at is None or started - self.rebuilt_at >= rebuild_interval:
+            # Another process may have rebuilt the rankings meanwhile.
+            rebuilt_at, refreshed_at = (
+                await db.execute(select(func.min(DBPlaceRanking.ranked_at), func.max(DBPlaceRanking.ranked_at)))
+            ).one()
+            self.rebuilt_at = rebuilt_at
+            self.refreshed_at = self.refreshed_at or refreshed_at
+        rebuild_due = self.rebuilt_at is None or started - self.rebuilt_at >= rebuild_interval
+        if rebuild_due or self.prior_mean is None:
+            self.prior_mean = await mean_vote(db)
+        if rebuild_due:
+            ranked = await rank_places(db, self.prior_mean, self.prior_weight)
+            self.rebuilt_at = started
+        else:
+            since = self.refreshed_at - self.overlap
+            ranked = await rank_places(db, self.prior_mean, self.prior_weight, since=since)
+        self.refreshed_at = started
+        return ranked
+
+    async def start(self, session_factory: Callable):
+        """
+        Start refreshing the rankings every `interval` seconds.
+
+        Args:
+            session_factory (Callable): Opens the database sessions the refreshes run in.
+        """
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        """Stop the background refreshes."""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, session_factory: Callable):
+        while True:
+            try:
+                async with session_factory() as db:
+                    ranked = await self.refresh(db)
+                logger.debug("Ranked %d places", ranked)
+            except Exception:
+                logger.exception("Refreshing the place rankings failed")
+            await asyncio.sleep(self.interval)
+
+
+default_leaderboard = LeaderboardRefresher()
@@ -1,11 +1,74 @@
-from sqlalchemy import select
+import os
+from collections import Counter, defaultdict
+from datetime import date
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    and_,
+    bindparam,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from fastapi_project.core.pydantic_core import CreateOpinion, CreatePlace, Opinion, Place, UpdateOpinion, UpdatePlace
-from fastapi_project.core.sqlalchemy_core import DBOpinion, DBPlace
+from fastapi_project.core.bulk import (
+    BulkItemError,
+    BulkResult,
+    BulkUpdateOpinion,
+    BulkUpdatePlace,
+    LookupResult,
+    deletion_result,
+    order_lookup,
+)
+from fastapi_project.core.conditional import Version
+from fastapi_project.core.export import EXPORT_BATCH_SIZE
+from fastapi_project.core.pagination import DEFAULT_PAGE_SIZE, InvalidCursorError, Page, build_page, decode_cursor
+from fastapi_project.core.pydantic_core import (
+    CreateOpinion,
+    CreatePlace,
+    ExpandedPlace,
+    Opinion,
+    OpinionSort,
+    Place,
+    PlaceExpand,
+    PlaceSort,
+    PlaceStats,
+    RankedPlace,
+    UpdateOpinion,
+    UpdatePlace,
+)
+from fastapi_project.core.search import OPINIONS_INDEX, PLACES_INDEX, FullTextIndex, ranked_matches
+from fastapi_project.core.sqlalchemy_core import DBOpinion, DBPlace, DBPlaceRanking, DBPlaceRatingStats, utcnow
+from fastapi_project.db.replicas import REPLICA_SESSION_KEY
+from fastapi_project.repositories.cache import CacheBackend, default_cache
+from fastapi_project.repositories.coalesce import SingleFlight, coalesced, default_single_flight
+
+__all__ = [
+    "NotFoundError",
+    "OpinionRepository",
+    "PlaceRepository",
+    "TooManyResultsError",
+    "get_opinion_repository",
+    "get_place_repository",
+    "opinion_repository",
+    "place_repository",
+]
 
-__all__ = ["NotFoundError", "OpinionRepository", "PlaceRepository"]
+UNPAGINATED_MAX_ROWS = int(os.getenv("UNPAGINATED_MAX_ROWS", "10000"))
+# Opinions embedded in every place expanded with `expand=opinions`, unless the request asks for another number.
+EXPANDED_OPINIONS = int(os.getenv("EXPANDED_OPINIONS", "3"))
 
 
 class NotFoundError(Exception):
@@ -16,11 +79,299 @@ class NotFoundError(Exception):
         super().__init__(self.message)
 
 
+class TooManyResultsError(Exception):
+    """Exception raised when an unpaginated query exceeds its row limit."""
+
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+# Explicit column lists for Core reads: rows come back as plain tuples, bypassing
+# ORM hydration and the identity map, and are fed straight to the precompiled
+# pydantic-core validators of the response models.
+# The version columns only feed the HTTP validators and are left out.
+OPINION_COLUMNS = tuple(column for column in DBOpinion.__table__.c if column.name in Opinion.model_fields)
+PLACE_COLUMNS = tuple(column for column in DBPlace.__table__.c if column.name in Place.model_fields)
+_validate_opinion = Opinion.__pydantic_validator__.validate_python
+_validate_place = Place.__pydantic_validator__.validate_python
+_validate_ranked_place = RankedPlace.__pydantic_validator__.validate_python
+
+
+# Statements of the hot lookups, built once: IDs are bound parameters, so every call reuses the same
+# construct and its compiled SQL instead of rebuilding the statement and computing its cache key.
+# They select table columns, which skips the ORM compilation layer, and run with `db.execute(stmt, params)`.
+_opinions = DBOpinion.__table__
+_places = DBPlace.__table__
+# The single row lookups also read the version, so a cached row is stored along with the version it has.
+GET_OPINION = select(*OPINION_COLUMNS, _opinions.c.version, _opinions.c.updated_at).where(
+    _opinions.c.id == bindparam("id")
+)
+GET_OPINIONS_BY_IDS = select(*OPINION_COLUMNS).where(_opinions.c.id.in_(bindparam("ids", expanding=True)))
+GET_OPINION_VERSION = select(_opinions.c.version, _opinions.c.updated_at).where(_opinions.c.id == bindparam("id"))
+GET_OPINION_VOTE = select(_opinions.c.place_id, _opinions.c.vote).where(_opinions.c.id == bindparam("id"))
+DELETE_OPINION = (
+    delete(_opinions).where(_opinions.c.id == bindparam("id")).returning(_opinions.c.place_id, _opinions.c.vote)
+)
+OPINIONS_PAGE = (
+    select(*OPINION_COLUMNS)
+    .where(_opinions.c.id > bindparam("after_id"))
+    .order_by(_opinions.c.id)
+    .limit(bindparam("limit"))
+)
+GET_PLACE = select(*PLACE_COLUMNS, _places.c.version, _places.c.updated_at).where(_places.c.id == bindparam("id"))
+GET_PLACES_BY_IDS = select(*PLACE_COLUMNS).where(_places.c.id.in_(bindparam("ids", expanding=True)))
+GET_PLACE_VERSION = select(_places.c.version, _places.c.updated_at).where(_places.c.id == bindparam("id"))
+PLACE_EXISTS = select(_places.c.id).where(_places.c.id == bindparam("id"))
+PLACE_OPINION_IDS = select(_opinions.c.id).where(_opinions.c.place_id == bindparam("place_id"))
+DELETE_PLACE = delete(_places).where(_places.c.id == bindparam("id")).returning(_places.c.id)
+
+
+def opinion_from_row(row) -> Opinion:
+    """Builds an Opinion from a Core row."""
+    return _validate_opinion(row._mapping)
+
+
+def place_from_row(row) -> Place:
+    """Builds a Place from a Core row."""
+    return _validate_place(row._mapping)
+
+
+def version_from_row(row) -> Version:
+    """Builds the Version of a single row from its version columns."""
+    return Version(tag=str(row.version), updated_at=row.updated_at)
+
+
+def _decode_id_cursor(after: Optional[str]) -> Optional[int]:
+    """Decodes an id keyset cursor, returning None for the first page."""
+    if after is None:
+        return None
+    (after_id,) = decode_cursor(after)
+    if not isinstance(after_id, int):
+        raise InvalidCursorError("Invalid cursor")
+    return after_id
+
+
+def _bump_version(model) -> dict:
+    """Returns the values marking a row of the given model as written now."""
+    return {"version": model.version + 1, "updated_at": utcnow()}
+
+
+def from_replica(db: AsyncSession) -> bool:
+    """
+    Whether the session reads from a replica.
+
+    Rows read from a replica may lag behind the primary and are never cached, otherwise a stale
+    row could outlive the invalidation done by the write and be served to the writer itself.
+    """
+    return db.info.get(REPLICA_SESSION_KEY, False)
+
+
+def _vote_column(vote: int):
+    """Returns the histogram column counting the given vote."""
+    return getattr(DBPlaceRatingStats, f"votes_{vote}")
+
+
+async def apply_rating_deltas(db: AsyncSession, deltas: dict[int, Counter]):
+    """
+    Applies vote changes to the denormalized rating statistics in the current transaction.
+
+    Every place has a statistics row: the repository creates it with the place, and places inserted
+    around the repository, such as seed data, get theirs from backfill_rating_stats.
+
+    Args:
+        db (Session): The database session.
+        deltas (dict[int, Counter]): Maps a place ID to a counter of vote value to number of added votes,
+            negative for removed votes.
+    """
+    for place_id, votes in deltas.items():
+        votes = {vote: change for vote, change in votes.items() if change}
+        if not votes:
+            continue
+        values = {
+            "count": DBPlaceRatingStats.count + sum(votes.values()),
+            "total": DBPlaceRatingStats.total + sum(vote * change for vote, change in votes.items()),
+        }
+        for vote, change in votes.items():
+            values[f"votes_{vote}"] = _vote_column(vote) + change
+        values["rating"] = case((values["count"] > 0, cast(values["total"], Float) / values["count"]), else_=0.0)
+        values["updated_at"] = utcnow()
+        await db.execute(update(DBPlaceRatingStats).where(DBPlaceRatingStats.place_id == place_id).values(**values))
+
+
+async def backfill_rating_stats(db: AsyncSession) -> int:
+    """
+    Creates the statistics row of every place that has none, aggregated from its opinions.
+
+    The listings sorted by rating and the leaderboard only see places with a row, this covers places
+    inserted without the repository, such as seed data.
+
+    Args:
+        db (Session): The database session, committed on success.
+
+    Returns:
+        int: The number of rows created.
+    """
+    count, total = func.count(DBOpinion.id), func.coalesce(func.sum(DBOpinion.vote), 0)
+    aggregated = (
+        select(
+            DBPlace.id,
+            count,
+            total,
+            *(func.count(case((DBOpinion.vote == vote, 1))) for vote in range(1, 6)),
+            case((count > 0, cast(total, Float) / count), else_=0.0),
+            literal(utcnow(), DateTime),
+        )
+        .outerjoin(DBOpinion, DBOpinion.place_id == DBPlace.id)
+        .where(DBPlace.id.not_in(select(DBPlaceRatingStats.place_id)))
+        .group_by(DBPlace.id)
+    )
+    columns = ["place_id", "count", "total", *(f"votes_{vote}" for vote in range(1, 6)), "rating", "updated_at"]
+    result = await db.execute(insert(DBPlaceRatingStats).from_select(columns, aggregated))
+    await db.commit()
+    return result.rowcount
+
+
+def rating_deltas() -> dict[int, Counter]:
+    """Returns an empty accumulator for apply_rating_deltas."""
+    return defaultdict(Counter)
+
+
+def stats_from_row(stats: DBPlaceRatingStats) -> PlaceStats:
+    """Builds PlaceStats from a statistics row."""
+    return PlaceStats(
+        place_id=stats.place_id,
+        count=stats.count,
+        mean=stats.total / stats.count if stats.count else None,
+        histogram={vote: getattr(stats, f"votes_{vote}") for vote in range(1, 6)},
+    )
+
+
+# The foreign key column joining the opinions to their place, taken from the DBPlace.opinions relationship.
+((_, _OPINION_PLACE_KEY),) = DBPlace.opinions.property.local_remote_pairs
+
+
+async def _latest_opinions(db: AsyncSession, place_ids: list[int], limit: int) -> dict[int, list[Opinion]]:
+    """
+    Returns the `limit` most recent opinions of every place, read with a single windowed query.
+
+    Each place's opinions are numbered with ROW_NUMBER() in the recent ordering, dates descending and
+    nulls last, which the recent opinions index of the dialect serves without sorting.
+    """
+    rank = (
+        func.row_number()
+        .over(
+            partition_by=_OPINION_PLACE_KEY,
+            order_by=(DBOpinion.date_of_visit.desc().nulls_last(), DBOpinion.id.desc()),
+        )
+        .label("rank")
+    )
+    ranked = select(*OPINION_COLUMNS, rank).where(_OPINION_PLACE_KEY.in_(place_ids)).subquery()
+    stmt = (
+        select(*(ranked.c[column.name] for column in OPINION_COLUMNS))
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c[_OPINION_PLACE_KEY.name], ranked.c.rank)
+    )
+    opinions = {place_id: [] for place_id in place_ids}
+    for row in (await db.execute(stmt)).all():
+        opinions[row.place_id].append(opinion_from_row(row))
+    return opinions
+
+
+async def _rating_stats(db: AsyncSession, place_ids: list[int]) -> dict[int, PlaceStats]:
+    """
+    Returns the rating statistics of many places.
+
+    The denormalized rows are read in one query. Places inserted without a row and not backfilled yet are
+    aggregated from their opinions in a second one, without storing the rows, as this may run on a read replica.
+    """
+    rows = (await db.scalars(select(DBPlaceRatingStats).where(DBPlaceRatingStats.place_id.in_(place_ids)))).all()
+    stats = {row.place_id: stats_from_row(row) for row in rows}
+    missing = [place_id for place_id in place_ids if place_id not in stats]
+    if missing:
+        votes = {place_id: Counter() for place_id in missing}
+        stmt = (
+            select(DBOpinion.place_id, DBOpinion.vote, func.count())
+            .where(DBOpinion.place_id.in_(missing))
+            .group_by(DBOpinion.place_id, DBOpinion.vote)
+        )
+        for place_id, vote, count in (await db.execute(stmt)).all():
+            votes[place_id][vote] = count
+        for place_id, counts in votes.items():
+            row = DBPlaceRatingStats(
+                place_id=place_id,
+                count=sum(counts.values()),
+                total=sum(vote * count for vote, count in counts.items()),
+                **{f"votes_{vote}": counts[vote] for vote in range(1, 6)},
+            )
+            stats[place_id] = stats_from_row(row)
+    return stats
+
+
+def _decode_sort_cursor(after: str, sort: Enum, value_type) -> tuple:
+    """Decodes a (sort, value, id) keyset cursor, checking it belongs to the given ordering."""
+    cursor_sort, value, after_id = decode_cursor(after, size=3)
+    if cursor_sort != sort.value or not isinstance(value, value_type) or not isinstance(after_id, int):
+        raise InvalidCursorError("Invalid cursor")
+    return value, after_id
+
+
+def _after_recent_opinion(after: str):
+    """Returns the condition selecting opinions after a cursor of the recent ordering, dates descending, nulls last."""
+    after_date, after_id = _decode_sort_cursor(after, OpinionSort.recent, (str, type(None)))
+    if after_date is None:
+        return and_(DBOpinion.date_of_visit.is_(None), DBOpinion.id < after_id)
+    try:
+        after_date = date.fromisoformat(after_date)
+    except ValueError as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+    return or_(
+        DBOpinion.date_of_visit < after_date,
+        and_(DBOpinion.date_of_visit == after_date, DBOpinion.id < after_id),
+        DBOpinion.date_of_visit.is_(None),
+    )
+
+
+async def _search_page(
+    db: AsyncSession, index: FullTextIndex, model, columns, q: str, limit: int, after: Optional[str]
+) -> Page:
+    """
+    Get a page of the rows matching a full-text search, most relevant first.
+
+    Pages are fetched by keyset on (score, id), the cursor carries the score of the last row.
+
+    Returns:
+        Page: The page of matching rows, each with a `score` column.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+    """
+    if not q.split():
+        return Page(items=[], limit=limit)
+    ranked = ranked_matches(db.get_bind().dialect.name, index, model, columns, q).subquery()
+    stmt = select(ranked).order_by(ranked.c.score.desc(), ranked.c.id).limit(limit + 1)
+    if after is not None:
+        after_score, after_id = decode_cursor(after, size=2)
+        if not isinstance(after_score, (int, float)) or not isinstance(after_id, int):
+            raise InvalidCursorError("Invalid cursor")
+        stmt = stmt.where(
+            or_(ranked.c.score < after_score, and_(ranked.c.score == after_score, ranked.c.id > after_id))
+        )
+    return build_page((await db.execute(stmt)).all(), limit, key=lambda row: (row.score, row.id))
+
+
 class OpinionRepository:
     """
     Repository class for managing opinions in the database.
+
+    Single opinion lookups are read through the given cache, which is invalidated on every write.
+    Concurrent identical lookups on read sessions share one query through the given single flight.
     """
 
+    def __init__(self, cache: Optional[CacheBackend] = None, single_flight: Optional[SingleFlight] = None):
+        self.cache = default_cache if cache is None else cache
+        self.single_flight = default_single_flight if single_flight is None else single_flight
+
     async def create_opinion(self, opinion: CreateOpinion, db: AsyncSession):
         """
         Create a new opinion in the database.
@@ -31,29 +382,120 @@ class OpinionRepository:
 
         Returns:
             Opinion: The created opinion.
+
+        Raises:
+            NotFoundError: If the place the opinion is about is not found.
         """
-        db_opinion = DBOpinion(**opinion.__dict__)
-        db.add(db_opinion)
+        stmt = insert(DBOpinion).values(**opinion.__dict__).returning(*OPINION_COLUMNS)
+        try:
+            created = opinion_from_row((await db.execute(stmt)).one())
+        except IntegrityError:
+            await db.rollback()
+            raise NotFoundError("Place not found")
+        deltas = rating_deltas()
+        deltas[created.place_id][created.vote] += 1
+        await apply_rating_deltas(db, deltas)
         await db.commit()
-        await db.refresh(db_opinion)
-        return Opinion(**db_opinion.__dict__)
+        return created
 
-    async def get_opinions(self, db: AsyncSession):
+    async def get_opinions(self, db: AsyncSession, max_rows: int = UNPAGINATED_MAX_ROWS):
         """
         Get all opinions from the database.
 
         Args:
             db (Session): The database session.
+            max_rows (int): The maximum number of opinions allowed in an unpaginated result.
 
         Returns:
             dict: A dictionary of opinions, where the key is the opinion ID and the value is the opinion object.
+
+        Raises:
+            TooManyResultsError: If there are more than max_rows opinions.
         """
-        stmt = select(DBOpinion)
-        opinion_results = await db.scalars(stmt)
+        stmt = select(*OPINION_COLUMNS).limit(max_rows + 1)
+        opinion_results = await db.execute(stmt)
         opinions = opinion_results.all()
-        opinions_pydantic = [Opinion(**opinion.__dict__) for opinion in opinions]
+        if len(opinions) > max_rows:
+            raise TooManyResultsError("Too many opinions, use pagination")
+        opinions_pydantic = [opinion_from_row(opinion) for opinion in opinions]
         return {opinion.id: opinion for opinion in opinions_pydantic}
 
+    async def get_opinions_by_ids(self, ids: list[int], db: AsyncSession) -> LookupResult[Opinion]:
+        """
+        Get many opinions by ID with a single query.
+
+        Args:
+            ids (list[int]): The IDs of the opinions, in the order the results are returned.
+            db (Session): The database session.
+
+        Returns:
+            LookupResult[Opinion]: The opinion of every ID in request order, None and a `missing` entry for unknown IDs.
+        """
+        rows = (await db.execute(GET_OPINIONS_BY_IDS, {"ids": list(set(ids))})).all()
+        return order_lookup(ids, {row.id: opinion_from_row(row) for row in rows})
+
+    async def get_opinions_page(self, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+        """
+        Get a page of opinions ordered by ID.
+
+        Args:
+            db (Session): The database session.
+            limit (int): The maximum number of opinions on the page.
+            after (Optional[str]): The cursor returned with the previous page.
+
+        Returns:
+            Page[Opinion]: The page of opinions.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        after_id = _decode_id_cursor(after)
+        # IDs start at 1, the first page is the one after ID 0.
+        params = {"after_id": 0 if after_id is None else after_id, "limit": limit + 1}
+        opinion_results = await db.execute(OPINIONS_PAGE, params)
+        opinions = [opinion_from_row(opinion) for opinion in opinion_results.all()]
+        return build_page(opinions, limit, key=lambda opinion: (opinion.id,))
+
+    async def search_opinions(
+        self, q: str, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ):
+        """
+        Search the text of the opinions.
+
+        Args:
+            q (str): The search text, opinions must contain every term, stemmed.
+            db (Session): The database session.
+            limit (int): The maximum number of opinions on the page.
+            after (Optional[str]): The cursor returned with the previous page.
+
+        Returns:
+            Page[Opinion]: The page of matching opinions, most relevant first.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        page = await _search_page(db, OPINIONS_INDEX, DBOpinion, OPINION_COLUMNS, q, limit, after)
+        page.items = [opinion_from_row(row) for row in page.items]
+        return page
+
+    async def stream_opinions(self, db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE):
+        """
+        Stream all opinions from the database in batches.
+
+        Rows are fetched through a server-side cursor, so only one batch is held in memory at a time.
+
+        Args:
+            db (Session): The database session, kept open until the stream is exhausted.
+            batch_size (int): The number of rows fetched per batch.
+
+        Yields:
+            List[Opinion]: The next batch of opinions, ordered by ID.
+        """
+        stmt = select(*OPINION_COLUMNS).order_by(DBOpinion.id).execution_options(yield_per=batch_size)
+        opinion_results = await db.stream(stmt)
+        async for partition in opinion_results.partitions():
+            yield [opinion_from_row(opinion) for opinion in partition]
+
     async def get_opinion(self, opinion_id: int, db: AsyncSession):
         """
         Get a specific opinion from the database.
@@ -68,12 +510,58 @@ class OpinionRepository:
         Raises:
             NotFoundError: If the opinion with the specified ID is not found.
         """
-        stmt = select(DBOpinion).filter(DBOpinion.id == opinion_id)
-        opinion_result = await db.scalars(stmt)
-        opinion = opinion_result.first()
-        if opinion is None:
+        opinion, _ = await self.get_opinion_with_version(opinion_id, db)
+        return opinion
+
+    @coalesced
+    async def get_opinion_with_version(self, opinion_id: int, db: AsyncSession, current: Optional[Version] = None):
+        """
+        Get a specific opinion along with the version it was read at.
+
+        The cache holds the opinion with its version. A cached opinion older than the `current` version
+        is read again, as it may have been written by another process, which only invalidates its own cache.
+
+        Args:
+            opinion_id (int): The ID of the opinion to retrieve.
+            db (Session): The database session.
+            current (Optional[Version]): The version just read from the database, if known.
+
+        Returns:
+            tuple[Opinion, Version]: The opinion and the version of that very opinion.
+
+        Raises:
+            NotFoundError: If the opinion with the specified ID is not found.
+        """
+        cached = await self.cache.get(f"opinion:{opinion_id}")
+        if cached is not None and (current is None or cached[1].tag == current.tag):
+            return cached
+        row = (await db.execute(GET_OPINION, {"id": opinion_id})).first()
+        if row is None:
+            raise NotFoundError("Opinion not found")
+        result = (opinion_from_row(row), version_from_row(row))
+        if not from_replica(db):
+            await self.cache.set(f"opinion:{opinion_id}", result)
+        return result
+
+    @coalesced
+    async def get_opinion_version(self, opinion_id: int, db: AsyncSession):
+        """
+        Get the version of a specific opinion without loading the row.
+
+        Args:
+            opinion_id (int): The ID of the opinion.
+            db (Session): The database session.
+
+        Returns:
+            Version: The version and the update time of the opinion.
+
+        Raises:
+            NotFoundError: If the opinion with the specified ID is not found.
+        """
+        row = (await db.execute(GET_OPINION_VERSION, {"id": opinion_id})).first()
+        if row is None:
             raise NotFoundError("Opinion not found")
-        return Opinion(**opinion.__dict__)
+        return version_from_row(row)
 
     async def delete_opinion(self, opinion_id: int, db: AsyncSession):
         """
@@ -89,13 +577,14 @@ class OpinionRepository:
         Raises:
             NotFoundError: If the opinion with the specified ID is not found.
         """
-        stmt = select(DBOpinion).filter(DBOpinion.id == opinion_id)
-        opinion_result = await db.scalars(stmt)
-        opinion = opinion_result.first()
-        if opinion is None:
+        deleted = (await db.execute(DELETE_OPINION, {"id": opinion_id})).first()
+        if deleted is None:
             raise NotFoundError("Opinion not found")
-        await db.delete(opinion)
+        deltas = rating_deltas()
+        deltas[deleted.place_id][deleted.vote] -= 1
+        await apply_rating_deltas(db, deltas)
         await db.commit()
+        await self.cache.delete(f"opinion:{opinion_id}")
         return {"status": "ok"}
 
     async def update_opinion(self, opinion_id: int, opinion: UpdateOpinion, db: AsyncSession):
@@ -111,26 +600,153 @@ class OpinionRepository:
             Opinion: The updated opinion.
 
         Raises:
-            NotFoundError: If the opinion with the specified ID is not found.
+            NotFoundError: If the opinion with the specified ID, or the place it is moved to, is not found.
         """
-        stmt = select(DBOpinion).filter(DBOpinion.id == opinion_id)
-        db_opinion_result = await db.scalars(stmt)
-        db_opinion = db_opinion_result.first()
-        if db_opinion is None:
+        values = {key: value for key, value in opinion.__dict__.items() if value is not None}
+        if not values:
+            return await self.get_opinion(opinion_id, db)
+
+        old = None
+        if "vote" in values or "place_id" in values:
+            # The rating stats need the vote being replaced, which RETURNING cannot report.
+            old = (await db.execute(GET_OPINION_VOTE, {"id": opinion_id})).first()
+            if old is None:
+                raise NotFoundError("Opinion not found")
+
+        values.update(_bump_version(DBOpinion))
+        stmt = update(DBOpinion).filter(DBOpinion.id == opinion_id).values(**values).returning(*OPINION_COLUMNS)
+        try:
+            row = (await db.execute(stmt)).first()
+        except IntegrityError:
+            await db.rollback()
+            raise NotFoundError("Place not found")
+        if row is None:
             raise NotFoundError("Opinion not found")
-        for key, value in opinion.__dict__.items():
-            if value is not None:
-                setattr(db_opinion, key, value)
+        updated = opinion_from_row(row)
+        if old is not None:
+            deltas = rating_deltas()
+            deltas[old.place_id][old.vote] -= 1
+            deltas[updated.place_id][updated.vote] += 1
+            await apply_rating_deltas(db, deltas)
         await db.commit()
-        await db.refresh(db_opinion)
-        return Opinion(**db_opinion.__dict__)
+        await self.cache.delete(f"opinion:{opinion_id}")
+        return updated
+
+    async def create_opinions(self, opinions: list[CreateOpinion], db: AsyncSession):
+        """
+        Create many opinions in a single transaction.
+
+        All rows are written with one multi-row INSERT ... RETURNING.
+
+        Args:
+            opinions (list[CreateOpinion]): The opinions to be created.
+            db (Session): The database session.
+
+        Returns:
+            BulkResult[Opinion]: The created opinions, and an error for every opinion about an unknown place.
+        """
+        place_ids = {opinion.place_id for opinion in opinions}
+        existing = set((await db.scalars(select(DBPlace.id).filter(DBPlace.id.in_(place_ids)))).all())
+        result = BulkResult[Opinion]()
+        rows = []
+        for index, opinion in enumerate(opinions):
+            if opinion.place_id in existing:
+                rows.append(opinion.__dict__)
+            else:
+                result.errors.append(BulkItemError(index=index, detail="Place not found"))
+        if not rows:
+            return result
+
+        stmt = insert(DBOpinion).returning(*OPINION_COLUMNS, sort_by_parameter_order=True)
+        result.items = [opinion_from_row(row) for row in (await db.execute(stmt, rows)).all()]
+        deltas = rating_deltas()
+        for opinion in result.items:
+            deltas[opinion.place_id][opinion.vote] += 1
+        await apply_rating_deltas(db, deltas)
+        await db.commit()
+        return result
+
+    async def update_opinions(self, opinions: list[BulkUpdateOpinion], db: AsyncSession):
+        """
+        Update many opinions in a single transaction.
+
+        Args:
+            opinions (list[BulkUpdateOpinion]): The IDs and the updated data of the opinions.
+            db (Session): The database session.
+
+        Returns:
+            BulkResult[Opinion]: The updated opinions, and an error for every unknown opinion or place.
+        """
+        ids = [opinion.id for opinion in opinions]
+        stmt = select(DBOpinion.id, DBOpinion.place_id, DBOpinion.vote).filter(DBOpinion.id.in_(ids))
+        current = {row.id: row for row in (await db.execute(stmt)).all()}
+        place_ids = {opinion.place_id for opinion in opinions if opinion.place_id is not None}
+        existing = set((await db.scalars(select(DBPlace.id).filter(DBPlace.id.in_(place_ids)))).all())
+
+        result = BulkResult[Opinion]()
+        changes, deltas = {}, rating_deltas()
+        for index, opinion in enumerate(opinions):
+            values = {key: value for key, value in opinion.__dict__.items() if value is not None}
+            if opinion.id not in current:
+                result.errors.append(BulkItemError(index=index, id=opinion.id, detail="Opinion not found"))
+            elif opinion.place_id is not None and opinion.place_id not in existing:
+                result.errors.append(BulkItemError(index=index, id=opinion.id, detail="Place not found"))
+            else:
+                changes[opinion.id] = {**changes.get(opinion.id, {}), **values}
+        if not changes:
+            return result
+
+        for opinion_id, values in changes.items():
+            old = current[opinion_id]
+            deltas[old.place_id][old.vote] -= 1
+            deltas[values.get("place_id", old.place_id)][values.get("vote", old.vote)] += 1
+        await db.execute(update(DBOpinion), list(changes.values()))
+        await db.execute(update(DBOpinion).filter(DBOpinion.id.in_(changes)).values(**_bump_version(DBOpinion)))
+        await apply_rating_deltas(db, deltas)
+        updated = await db.execute(select(*OPINION_COLUMNS).filter(DBOpinion.id.in_(changes)))
+        by_id = {row.id: opinion_from_row(row) for row in updated.all()}
+        await db.commit()
+        await self.cache.delete(*(f"opinion:{opinion_id}" for opinion_id in changes))
+        result.items = [by_id[opinion_id] for opinion_id in changes]
+        return result
+
+    async def delete_opinions(self, opinion_ids: list[int], db: AsyncSession):
+        """
+        Delete many opinions with a single DELETE ... RETURNING statement.
+
+        Args:
+            opinion_ids (list[int]): The IDs of the opinions to delete.
+            db (Session): The database session.
+
+        Returns:
+            BulkResult[int]: The IDs of the deleted opinions, and an error for every unknown ID, each ID once.
+        """
+        stmt = delete(DBOpinion).filter(DBOpinion.id.in_(opinion_ids))
+        stmt = stmt.returning(DBOpinion.id, DBOpinion.place_id, DBOpinion.vote)
+        deleted = (await db.execute(stmt)).all()
+        deltas = rating_deltas()
+        for row in deleted:
+            deltas[row.place_id][row.vote] -= 1
+        await apply_rating_deltas(db, deltas)
+        await db.commit()
+
+        deleted_ids = {row.id for row in deleted}
+        await self.cache.delete(*(f"opinion:{opinion_id}" for opinion_id in deleted_ids))
+        return deletion_result(opinion_ids, deleted_ids, "Opinion not found")
 
 
 class PlaceRepository:
     """
     Repository class for managing places in the database.
+
+    Single place lookups are read through the given cache, which is invalidated on every write.
+    Concurrent identical lookups on read sessions share one query through the given single flight.
     """
 
+    def __init__(self, cache: Optional[CacheBackend] = None, single_flight: Optional[SingleFlight] = None):
+        self.cache = default_cache if cache is None else cache
+        self.single_flight = default_single_flight if single_flight is None else single_flight
+
     async def create_place(self, place: CreatePlace, db: AsyncSession):
         """
         Create a new place in the database.
@@ -142,28 +758,160 @@ class PlaceRepository:
         Returns:
             Place: The created place.
         """
-        db_place = DBPlace(**place.__dict__)
-        db.add(db_place)
+        stmt = insert(DBPlace).values(**place.__dict__).returning(*PLACE_COLUMNS)
+        created = place_from_row((await db.execute(stmt)).one())
+        await db.execute(insert(DBPlaceRatingStats).values(place_id=created.id))
         await db.commit()
-        await db.refresh(db_place)
-        return Place(**db_place.__dict__)
+        return created
 
-    async def get_places(self, db: AsyncSession):
+    async def get_places(self, db: AsyncSession, max_rows: int = UNPAGINATED_MAX_ROWS):
         """
         Get all places from the database.
 
         Args:
             db (Session): The database session.
+            max_rows (int): The maximum number of places allowed in an unpaginated result.
 
         Returns:
             dict: A dictionary of places, where the keys are the place IDs and the values are the places.
+
+        Raises:
+            TooManyResultsError: If there are more than max_rows places.
         """
-        stmt = select(DBPlace)
-        place_results = await db.scalars(stmt)
+        stmt = select(*PLACE_COLUMNS).limit(max_rows + 1)
+        place_results = await db.execute(stmt)
         places = place_results.all()
-        places_pydantic = [Place(**place.__dict__) for place in places]
+        if len(places) > max_rows:
+            raise TooManyResultsError("Too many places, use pagination")
+        places_pydantic = [place_from_row(place) for place in places]
         return {place.id: place for place in places_pydantic}
 
+    async def get_places_by_ids(self, ids: list[int], db: AsyncSession) -> LookupResult[Place]:
+        """
+        Get many places by ID with a single query.
+
+        Args:
+            ids (list[int]): The IDs of the places, in the order the results are returned.
+            db (Session): The database session.
+
+        Returns:
+            LookupResult[Place]: The place of every ID in request order, None and a `missing` entry for unknown IDs.
+        """
+        rows = (await db.execute(GET_PLACES_BY_IDS, {"ids": list(set(ids))})).all()
+        return order_lookup(ids, {row.id: place_from_row(row) for row in rows})
+
+    async def get_places_page(
+        self,
+        db: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        country: Optional[str] = None,
+        city: Optional[str] = None,
+        name: Optional[str] = None,
+        sort: PlaceSort = PlaceSort.id,
+    ):
+        """
+        Get a filtered page of places.
+
+        Every filter and ordering is backed by an index, and pages are fetched by keyset,
+        so the cost of a page does not depend on how deep it is. Filtering by city alone uses
+        the (city, name) index, by country and city the (country, city, name) one.
+
+        Args:
+            db (Session): The database session.
+            limit (int): The maximum number of places on the page.
+            after (Optional[str]): The cursor returned with the previous page.
+            country (Optional[str]): Only places in this country.
+            city (Optional[str]): Only places in this city.
+            name (Optional[str]): Only places whose name starts with this prefix.
+            sort (PlaceSort): The ordering of the places.
+
+        Returns:
+            Page[Place]: The page of places.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or belongs to another ordering.
+        """
+        stmt = select(*PLACE_COLUMNS).limit(limit + 1)
+        if country is not None:
+            stmt = stmt.where(DBPlace.country == country)
+        if city is not None:
+            stmt = stmt.where(DBPlace.city == city)
+        if name:
+            stmt = stmt.where(DBPlace.name.startswith(name, autoescape=True))
+
+        if sort is PlaceSort.id:
+            after_id = _decode_id_cursor(after)
+            stmt = stmt.order_by(DBPlace.id)
+            if after_id is not None:
+                stmt = stmt.where(DBPlace.id > after_id)
+        elif sort is PlaceSort.name:
+            stmt = stmt.order_by(DBPlace.name, DBPlace.id)
+            if after is not None:
+                after_name, after_id = _decode_sort_cursor(after, sort, str)
+                stmt = stmt.where(tuple_(DBPlace.name, DBPlace.id) > tuple_(after_name, after_id))
+        else:
+            # Driven from the statistics, which every place has a row of, in the order of their
+            # (rating DESC, place_id) index, so pages are read without sorting the places.
+            rating, stats_place_id = DBPlaceRatingStats.rating, DBPlaceRatingStats.place_id
+            stmt = (
+                stmt.add_columns(rating)
+                .select_from(DBPlaceRatingStats)
+                .join(DBPlace, DBPlace.id == stats_place_id)
+                .order_by(rating.desc(), stats_place_id)
+            )
+            if after is not None:
+                after_rating, after_id = _decode_sort_cursor(after, sort, (int, float))
+                # The first condition bounds the index range, the second skips the ties already returned.
+                stmt = stmt.where(rating <= after_rating, or_(rating < after_rating, stats_place_id > after_id))
+
+        def key(row):
+            return (row.id,) if sort is PlaceSort.id else (sort.value, getattr(row, sort.value), row.id)
+
+        page = build_page((await db.execute(stmt)).all(), limit, key=key)
+        page.items = [place_from_row(row) for row in page.items]
+        return page
+
+    async def search_places(
+        self, q: str, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+    ):
+        """
+        Search the names and descriptions of the places, matches in the name rank higher.
+
+        Args:
+            q (str): The search text, places must contain every term, stemmed.
+            db (Session): The database session.
+            limit (int): The maximum number of places on the page.
+            after (Optional[str]): The cursor returned with the previous page.
+
+        Returns:
+            Page[Place]: The page of matching places, most relevant first.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        page = await _search_page(db, PLACES_INDEX, DBPlace, PLACE_COLUMNS, q, limit, after)
+        page.items = [place_from_row(row) for row in page.items]
+        return page
+
+    async def stream_places(self, db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE):
+        """
+        Stream all places from the database in batches.
+
+        Rows are fetched through a server-side cursor, so only one batch is held in memory at a time.
+
+        Args:
+            db (Session): The database session, kept open until the stream is exhausted.
+            batch_size (int): The number of rows fetched per batch.
+
+        Yields:
+            List[Place]: The next batch of places, ordered by ID.
+        """
+        stmt = select(*PLACE_COLUMNS).order_by(DBPlace.id).execution_options(yield_per=batch_size)
+        place_results = await db.stream(stmt)
+        async for partition in place_results.partitions():
+            yield [place_from_row(place) for place in partition]
+
     async def get_place(self, place_id: int, db: AsyncSession):
         """
         Get a specific place from the database.
@@ -178,12 +926,88 @@ class PlaceRepository:
         Raises:
             NotFoundError: If the place with the given ID is not found.
         """
-        stmt = select(DBPlace).filter(DBPlace.id == place_id)
-        place_result = await db.scalars(stmt)
-        place = place_result.first()
-        if place is None:
+        place, _ = await self.get_place_with_version(place_id, db)
+        return place
+
+    @coalesced
+    async def get_place_with_version(self, place_id: int, db: AsyncSession, current: Optional[Version] = None):
+        """
+        Get a specific place along with the version it was read at.
+
+        The cache holds the place with its version. A cached place older than the `current` version
+        is read again, as it may have been written by another process, which only invalidates its own cache.
+
+        Args:
+            place_id (int): The ID of the place to retrieve.
+            db (Session): The database session.
+            current (Optional[Version]): The version just read from the database, if known.
+
+        Returns:
+            tuple[Place, Version]: The place and the version of that very place.
+
+        Raises:
+            NotFoundError: If the place with the given ID is not found.
+        """
+        cached = await self.cache.get(f"place:{place_id}")
+        if cached is not None and (current is None or cached[1].tag == current.tag):
+            return cached
+        row = (await db.execute(GET_PLACE, {"id": place_id})).first()
+        if row is None:
+            raise NotFoundError("Place not found")
+        result = (place_from_row(row), version_from_row(row))
+        if not from_replica(db):
+            await self.cache.set(f"place:{place_id}", result)
+        return result
+
+    @coalesced
+    async def get_place_version(self, place_id: int, db: AsyncSession):
+        """
+        Get the version of a specific place without loading the row.
+
+        Args:
+            place_id (int): The ID of the place.
+            db (Session): The database session.
+
+        Returns:
+            Version: The version and the update time of the place.
+
+        Raises:
+            NotFoundError: If the place with the given ID is not found.
+        """
+        row = (await db.execute(GET_PLACE_VERSION, {"id": place_id})).first()
+        if row is None:
             raise NotFoundError("Place not found")
-        return Place(**place.__dict__)
+        return version_from_row(row)
+
+    async def expand_places(
+        self,
+        places: list[Place],
+        db: AsyncSession,
+        expand: frozenset[PlaceExpand],
+        opinions_limit: int = EXPANDED_OPINIONS,
+    ) -> list[ExpandedPlace]:
+        """
+        Embed the latest opinions and the rating statistics in places.
+
+        Whatever the number of places, every expansion costs one query (the statistics a second one
+        for places without a statistics row), so expanding a page does not issue a query per place.
+
+        Args:
+            places (list[Place]): The places to expand.
+            db (Session): The database session.
+            expand (frozenset[PlaceExpand]): The related data to embed.
+            opinions_limit (int): The number of opinions embedded in every place, most recent first.
+
+        Returns:
+            list[ExpandedPlace]: The places with the requested data, in the given order.
+        """
+        place_ids = [place.id for place in places]
+        opinions = await _latest_opinions(db, place_ids, opinions_limit) if PlaceExpand.opinions in expand else {}
+        stats = await _rating_stats(db, place_ids) if PlaceExpand.stats in expand else {}
+        return [
+            ExpandedPlace(**place.__dict__, opinions=opinions.get(place.id), stats=stats.get(place.id))
+            for place in places
+        ]
 
     async def delete_place(self, place_id: int, db: AsyncSession):
         """
@@ -199,13 +1023,13 @@ class PlaceRepository:
         Raises:
             NotFoundError: If the place with the given ID is not found.
         """
-        stmt = select(DBPlace).filter(DBPlace.id == place_id)
-        place_result = await db.scalars(stmt)
-        place = place_result.first()
-        if place is None:
+        # Opinions and rating stats are removed by ON DELETE CASCADE, their IDs are
+        # only read to invalidate cached opinions.
+        opinion_ids = (await db.scalars(PLACE_OPINION_IDS, {"place_id": place_id})).all()
+        if (await db.execute(DELETE_PLACE, {"id": place_id})).first() is None:
             raise NotFoundError("Place not found")
-        await db.delete(place)
         await db.commit()
+        await self.cache.delete(f"place:{place_id}", *(f"opinion:{opinion_id}" for opinion_id in opinion_ids))
         return {"status": "ok"}
 
     async def update_place(self, place_id: int, place: UpdatePlace, db: AsyncSession):
@@ -223,35 +1047,266 @@ class PlaceRepository:
         Raises:
             NotFoundError: If the place with the given ID is not found.
         """
-        stmt = select(DBPlace).filter(DBPlace.id == place_id)
-        db_place_result = await db.scalars(stmt)
-        db_place = db_place_result.first()
-        if db_place is None:
+        values = {key: value for key, value in place.__dict__.items() if value is not None}
+        if not values:
+            return await self.get_place(place_id, db)
+        values.update(_bump_version(DBPlace))
+        stmt = update(DBPlace).filter(DBPlace.id == place_id).values(**values).returning(*PLACE_COLUMNS)
+        row = (await db.execute(stmt)).first()
+        if row is None:
             raise NotFoundError("Place not found")
-        for key, value in place.__dict__.items():
-            if value is not None:
-                setattr(db_place, key, value)
         await db.commit()
-        await db.refresh(db_place)
-        return Place(**db_place.__dict__)
+        await self.cache.delete(f"place:{place_id}")
+        return place_from_row(row)
+
+    async def create_places(self, places: list[CreatePlace], db: AsyncSession):
+        """
+        Create many places in a single transaction.
+
+        All rows are written with one multi-row INSERT ... RETURNING.
+
+        Args:
+            places (list[CreatePlace]): The places to be created.
+            db (Session): The database session.
+
+        Returns:
+            BulkResult[Place]: The created places.
+        """
+        if not places:
+            return BulkResult[Place]()
+        stmt = insert(DBPlace).returning(*PLACE_COLUMNS, sort_by_parameter_order=True)
+        created = [place_from_row(row) for row in (await db.execute(stmt, [place.__dict__ for place in places])).all()]
+        await db.execute(insert(DBPlaceRatingStats), [{"place_id": place.id} for place in created])
+        await db.commit()
+        return BulkResult[Place](items=created)
+
+    async def update_places(self, places: list[BulkUpdatePlace], db: AsyncSession):
+        """
+        Update many places in a single transaction.
+
+        Args:
+            places (list[BulkUpdatePlace]): The IDs and the updated data of the places.
+            db (Session): The database session.
+
+        Returns:
+            BulkResult[Place]: The updated places, and an error for every unknown place.
+        """
+        ids = [place.id for place in places]
+        existing = set((await db.scalars(select(DBPlace.id).filter(DBPlace.id.in_(ids)))).all())
+        result = BulkResult[Place]()
+        changes = {}
+        for index, place in enumerate(places):
+            if place.id in existing:
+                values = {key: value for key, value in place.__dict__.items() if value is not None}
+                changes[place.id] = {**changes.get(place.id, {}), **values}
+            else:
+                result.errors.append(BulkItemError(index=index, id=place.id, detail="Place not found"))
+        if not changes:
+            return result
+
+        await db.execute(update(DBPlace), list(changes.values()))
+        await db.execute(update(DBPlace).filter(DBPlace.id.in_(changes)).values(**_bump_version(DBPlace)))
+        updated = await db.execute(select(*PLACE_COLUMNS).filter(DBPlace.id.in_(changes)))
+        by_id = {row.id: place_from_row(row) for row in updated.all()}
+        await db.commit()
+        await self.cache.delete(*(f"place:{place_id}" for place_id in changes))
+        result.items = [by_id[place_id] for place_id in changes]
+        return result
 
-    async def get_opinions_for_place(self, place_id: int, db: AsyncSession):
+    async def delete_places(self, place_ids: list[int], db: AsyncSession):
         """
-        Get the opinions for a specific place from the database.
+        Delete many places with a single DELETE ... RETURNING statement.
+
+        Opinions and rating stats of the places are removed by ON DELETE CASCADE.
+
+        Args:
+            place_ids (list[int]): The IDs of the places to delete.
+            db (Session): The database session.
+
+        Returns:
+            BulkResult[int]: The IDs of the deleted places, and an error for every unknown ID, each ID once.
+        """
+        opinion_ids = (await db.scalars(select(DBOpinion.id).filter(DBOpinion.place_id.in_(place_ids)))).all()
+        deleted_ids = set(
+            (await db.scalars(delete(DBPlace).filter(DBPlace.id.in_(place_ids)).returning(DBPlace.id))).all()
+        )
+        await db.commit()
+
+        await self.cache.delete(
+            *(f"place:{place_id}" for place_id in deleted_ids),
+            *(f"opinion:{opinion_id}" for opinion_id in opinion_ids),
+        )
+        return deletion_result(place_ids, deleted_ids, "Place not found")
+
+    @coalesced
+    async def get_opinions_for_place(
+        self,
+        place_id: int,
+        db: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        min_vote: Optional[int] = None,
+        max_vote: Optional[int] = None,
+        visited_from: Optional[date] = None,
+        visited_to: Optional[date] = None,
+        sort: OpinionSort = OpinionSort.recent,
+    ):
+        """
+        Get a filtered page of the opinions for a specific place.
+
+        The opinions are read straight from the opinions table through the (place_id, vote, id) index, and
+        the (place_id, date_of_visit, id) one on SQLite or (place_id, date_of_visit DESC NULLS LAST, id DESC)
+        one on PostgreSQL. The place itself is only looked up when the page is empty.
 
         Args:
             place_id (int): The ID of the place to retrieve opinions for.
             db (Session): The database session.
+            limit (int): The maximum number of opinions on the page.
+            after (Optional[str]): The cursor returned with the previous page.
+            min_vote (Optional[int]): Only opinions with at least this vote.
+            max_vote (Optional[int]): Only opinions with at most this vote.
+            visited_from (Optional[date]): Only opinions about visits on or after this date.
+            visited_to (Optional[date]): Only opinions about visits on or before this date.
+            sort (OpinionSort): The ordering of the opinions.
+
+        Returns:
+            Page[Opinion]: The page of opinions.
+
+        Raises:
+            NotFoundError: If the place with the given ID is not found.
+            InvalidCursorError: If the cursor is malformed or belongs to another ordering.
+        """
+        stmt = select(*OPINION_COLUMNS).filter(DBOpinion.place_id == place_id).limit(limit + 1)
+        if min_vote is not None:
+            stmt = stmt.where(DBOpinion.vote >= min_vote)
+        if max_vote is not None:
+            stmt = stmt.where(DBOpinion.vote <= max_vote)
+        if visited_from is not None:
+            stmt = stmt.where(DBOpinion.date_of_visit >= visited_from)
+        if visited_to is not None:
+            stmt = stmt.where(DBOpinion.date_of_visit <= visited_to)
+
+        if sort is OpinionSort.recent:
+            stmt = stmt.order_by(DBOpinion.date_of_visit.desc().nulls_last(), DBOpinion.id.desc())
+            if after is not None:
+                stmt = stmt.where(_after_recent_opinion(after))
+        else:
+            stmt = stmt.order_by(DBOpinion.vote.desc(), DBOpinion.id.desc())
+            if after is not None:
+                after_vote, after_id = _decode_sort_cursor(after, sort, int)
+                stmt = stmt.where(
+                    or_(DBOpinion.vote < after_vote, and_(DBOpinion.vote == after_vote, DBOpinion.id < after_id))
+                )
+
+        def key(row):
+            value = row.date_of_visit if sort is OpinionSort.recent else row.vote
+            return (sort.value, value, row.id)
+
+        page = build_page((await db.execute(stmt)).all(), limit, key=key)
+        if not page.items and await db.scalar(PLACE_EXISTS, {"id": place_id}) is None:
+            raise NotFoundError("Place not found")
+        page.items = [opinion_from_row(row) for row in page.items]
+        return page
+
+    async def get_place_stats(self, place_id: int, db: AsyncSession):
+        """
+        Get the rating statistics of a specific place.
+
+        The statistics are read from the denormalized place_rating_stats row. Places inserted
+        without a row and not backfilled yet get it built from the opinions on first read.
+
+        Args:
+            place_id (int): The ID of the place to retrieve statistics for.
+            db (Session): The database session.
 
         Returns:
-            List[Opinion]: The opinions for the place.
+            PlaceStats: The number of opinions, the mean vote and the vote histogram.
 
         Raises:
             NotFoundError: If the place with the given ID is not found.
         """
-        stmt = select(DBPlace).filter(DBPlace.id == place_id).options(selectinload(DBPlace.opinions))
-        place_result = await db.scalars(stmt)
-        place = place_result.first()
-        if place is None:
+        stats = await db.get(DBPlaceRatingStats, place_id)
+        if stats is not None:
+            return stats_from_row(stats)
+
+        if await db.scalar(PLACE_EXISTS, {"id": place_id}) is None:
             raise NotFoundError("Place not found")
-        return place.opinions
+        stmt = select(DBOpinion.vote, func.count()).filter(DBOpinion.place_id == place_id).group_by(DBOpinion.vote)
+        votes = dict((await db.execute(stmt)).all())
+        stats = DBPlaceRatingStats(
+            place_id=place_id,
+            count=sum(votes.values()),
+            total=sum(vote * count for vote, count in votes.items()),
+            **{f"votes_{vote}": votes.get(vote, 0) for vote in range(1, 6)},
+        )
+        stats.rating = stats.total / stats.count if stats.count else 0.0
+        result = stats_from_row(stats)
+        db.add(stats)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request built the row concurrently, read the committed one.
+            await db.rollback()
+            result = stats_from_row(await db.get(DBPlaceRatingStats, place_id))
+        return result
+
+    async def get_top_places(
+        self,
+        db: AsyncSession,
+        country: Optional[str] = None,
+        city: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[RankedPlace]:
+        """
+        Get the best ranked places, optionally in a country and city.
+
+        The ranking is read from the precomputed place_rankings table, so the cost does not depend on the
+        number of opinions. It lags behind the opinions by up to one leaderboard refresh.
+
+        Args:
+            db (Session): The database session.
+            country (Optional[str]): Only rank places in this country.
+            city (Optional[str]): Only rank places in this city.
+            limit (int): The maximum number of places to return.
+
+        Returns:
+            list[RankedPlace]: The places ordered by score, best first.
+        """
+        stmt = (
+            select(*PLACE_COLUMNS, DBPlaceRanking.count, DBPlaceRanking.mean, DBPlaceRanking.score)
+            .join(DBPlaceRanking, DBPlaceRanking.place_id == DBPlace.id)
+            # Both keys descending, so the ranking indexes are scanned backwards without sorting.
+            .order_by(DBPlaceRanking.score.desc(), DBPlaceRanking.place_id.desc())
+            .limit(limit)
+        )
+        if country is not None:
+            stmt = stmt.where(DBPlaceRanking.country == country)
+        if city is not None:
+            stmt = stmt.where(DBPlaceRanking.city == city)
+        return [_validate_ranked_place(row._mapping) for row in (await db.execute(stmt)).all()]
+
+
+# Repositories keep no per-request state, one instance of each serves every request of the process.
+opinion_repository = OpinionRepository()
+place_repository = PlaceRepository()
+
+
+# The dependencies are coroutines, FastAPI would run plain functions in its thread pool.
+async def get_opinion_repository() -> OpinionRepository:
+    """
+    Get the opinion repository of the process.
+
+    Returns:
+        OpinionRepository: The shared repository.
+    """
+    return opinion_repository
+
+
+async def get_place_repository() -> PlaceRepository:
+    """
+    Get the place repository of the process.
+
+    Returns:
+        PlaceRepository: The shared repository.
+    """
+    return place_repository
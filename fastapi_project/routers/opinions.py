@@ -1,9 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Optional, Union
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fastapi_project.core.bulk import (
+    BulkResult,
+    BulkUpdateOpinion,
+    LookupResult,
+    check_bulk_size,
+    check_lookup_size,
+    merge_results,
+    parse_lookup_ids,
+    validate_items,
+)
+from fastapi_project.core.conditional import make_etag, not_modified, set_validators, tag_response
+from fastapi_project.core.export import EXPORT_BATCH_SIZE, MAX_EXPORT_BATCH_SIZE, ExportFormat, serialize_batches
+from fastapi_project.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError, Page
 from fastapi_project.core.pydantic_core import CreateOpinion, Opinion, UpdateOpinion
-from fastapi_project.db.create_db import get_db
-from fastapi_project.repositories import NotFoundError, OpinionRepository
+from fastapi_project.core.serialization import json_response
+from fastapi_project.db.create_db import get_db, get_read_db, get_read_session_factory
+from fastapi_project.repositories import NotFoundError, OpinionRepository, TooManyResultsError, get_opinion_repository
+from fastapi_project.repositories.ingest import IngestTicket, OpinionWriteBehind, QueueFullError, get_write_behind
 
 router = APIRouter(
     prefix="/opinions",
@@ -18,45 +36,239 @@ def health_check():
     return {"status": "ok"}
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def get_opinions(db: AsyncSession = Depends(get_db)):
-    """Get all opinions from the database."""
-    opinions = await OpinionRepository().get_opinions(db)
-    return opinions
+@router.get(
+    "/", status_code=status.HTTP_200_OK, response_model=Union[Page[Opinion], dict[int, Opinion], LookupResult[Opinion]]
+)
+async def get_opinions(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    unpaginated: bool = False,
+    ids: Optional[str] = Query(None, description="Comma separated IDs to look up, in the order of the results"),
+    db: AsyncSession = Depends(get_read_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Get a page of opinions ordered by ID.
+
+    Pass the returned `next_cursor` as `after` to fetch the next page. With `unpaginated=true`
+    all opinions are returned as a dictionary keyed by ID, as long as the table is small enough.
+    With `ids=1,2,3` the opinions with these IDs are returned in that order instead, like `POST /opinions/lookup`.
+    The response carries an ETag hashed from its body, so polling clients can revalidate with If-None-Match.
+    """
+    lookup_ids = None if ids is None else parse_lookup_ids(ids)
+    try:
+        if lookup_ids is not None:
+            response = json_response(await repository.get_opinions_by_ids(lookup_ids, db), LookupResult[Opinion])
+        elif unpaginated:
+            response = json_response(await repository.get_opinions(db), dict[int, Opinion])
+        else:
+            page = await repository.get_opinions_page(db, limit=limit, after=after)
+            response = json_response(page, Page[Opinion])
+    except InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    except TooManyResultsError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Too many opinions, use pagination")
+    return tag_response(request, response)
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=Page[Opinion])
+async def search_opinions(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text, every term must match"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Search the text of the opinions.
+
+    Results are ranked by relevance, most relevant first, and terms match regardless of their
+    inflection. Pass the returned `next_cursor` as `after` to fetch the next page.
+    """
+    try:
+        page = await repository.search_opinions(q, db, limit=limit, after=after)
+    except InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return json_response(page, Page[Opinion])
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_opinions(
+    format: ExportFormat = ExportFormat.ndjson,
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    session_factory=Depends(get_read_session_factory),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Stream every opinion as NDJSON or as a JSON array.
+
+    The body is serialized batch by batch while rows are read from a server-side cursor,
+    so memory use does not depend on the size of the table.
+    """
+
+    async def batches():
+        async with session_factory() as db:
+            async for batch in repository.stream_opinions(db, batch_size=batch_size):
+                yield batch
+
+    return StreamingResponse(serialize_batches(batches(), format), media_type=format.media_type)
+
+
+@router.post("/lookup", status_code=status.HTTP_200_OK, response_model=LookupResult[Opinion])
+async def lookup_opinions(
+    ids: list[int] = Body(..., embed=True),
+    db: AsyncSession = Depends(get_read_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Get many opinions by ID with a single query.
+
+    The opinions are returned in the order of `ids`, unknown IDs get `null` and are listed in `missing`.
+    Unlike `GET /opinions/?ids=`, the IDs are not limited by the length of the URL.
+    """
+    check_lookup_size(ids)
+    return json_response(await repository.get_opinions_by_ids(ids, db), LookupResult[Opinion])
 
 
-@router.get("/{opinion_id}", status_code=status.HTTP_200_OK)
-async def get_opinion(opinion_id: int, db: AsyncSession = Depends(get_db)):
-    """Get an opinion by its ID."""
+@router.post("/bulk", status_code=status.HTTP_201_CREATED, response_model=BulkResult[Opinion])
+async def create_opinions(
+    items: list[Any] = Body(...),
+    db: AsyncSession = Depends(get_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Create many opinions in one transaction.
+
+    Every item is validated on its own, invalid items are reported in `errors` with their position.
+    """
+    check_bulk_size(items)
+    positions, opinions, errors = validate_items(items, CreateOpinion)
+    result = await repository.create_opinions(opinions, db)
+    return json_response(merge_results(positions, result, errors), BulkResult[Opinion], status.HTTP_201_CREATED)
+
+
+@router.patch("/bulk", status_code=status.HTTP_200_OK, response_model=BulkResult[Opinion])
+async def update_opinions(
+    items: list[Any] = Body(...),
+    db: AsyncSession = Depends(get_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Update specified fields of many opinions in one transaction.
+
+    Every item carries the `id` of the opinion to update, unknown IDs are reported in `errors`.
+    """
+    check_bulk_size(items)
+    positions, opinions, errors = validate_items(items, BulkUpdateOpinion)
+    result = await repository.update_opinions(opinions, db)
+    return json_response(merge_results(positions, result, errors), BulkResult[Opinion])
+
+
+@router.delete("/bulk", status_code=status.HTTP_202_ACCEPTED, response_model=BulkResult[int])
+async def delete_opinions(
+    ids: list[int] = Query(...),
+    db: AsyncSession = Depends(get_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """Delete many opinions by their IDs in one transaction."""
+    check_bulk_size(ids)
+    result = await repository.delete_opinions(ids, db)
+    return json_response(result, BulkResult[int], status.HTTP_202_ACCEPTED)
+
+
+@router.get("/{opinion_id}", status_code=status.HTTP_200_OK, response_model=Opinion)
+async def get_opinion(
+    opinion_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Get an opinion by its ID.
+
+    Answers If-None-Match and If-Modified-Since with 304 after reading only the version of the opinion.
+    Otherwise the validators are those of the opinion sent, read along with it.
+    """
     try:
-        opinion = await OpinionRepository().get_opinion(opinion_id, db)
-        return Opinion(**opinion.__dict__)
+        version = await repository.get_opinion_version(opinion_id, db)
+        etag = make_etag("opinion", opinion_id, version.tag)
+        if (cached := not_modified(request, etag, version.updated_at)) is not None:
+            return cached
+        opinion, version = await repository.get_opinion_with_version(opinion_id, db, current=version)
+        set_validators(response, make_etag("opinion", opinion_id, version.tag), version.updated_at)
+        return opinion
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Opinion not found")
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_opinion(opinion: CreateOpinion, db: AsyncSession = Depends(get_db)):
-    """Create a new opinion."""
-    db_opinion = await OpinionRepository().create_opinion(opinion, db)
-    return Opinion(**db_opinion.__dict__)
+@router.get("/ingest/{tracking_id}", status_code=status.HTTP_200_OK, response_model=IngestTicket)
+async def get_ingest_status(tracking_id: str, write_behind: OpinionWriteBehind = Depends(get_write_behind)):
+    """Get the state of an opinion accepted into the write-behind queue."""
+    ticket = await write_behind.status(tracking_id)
+    if ticket is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tracking ID not found")
+    return ticket
 
 
-@router.delete("/{opinion_id}", status_code=status.HTTP_202_ACCEPTED)
-async def delete_opinion(opinion_id: int, db: AsyncSession = Depends(get_db)):
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=Opinion,
+    responses={
+        202: {"model": IngestTicket, "description": "Queued to be written, with OPINION_INGEST=queue"},
+        503: {"description": "The queue is full, retry later"},
+    },
+)
+async def create_opinion(
+    opinion: CreateOpinion,
+    db: AsyncSession = Depends(get_db),
+    write_behind: OpinionWriteBehind = Depends(get_write_behind),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
+    """
+    Create a new opinion.
+
+    With OPINION_INGEST=queue the opinion is queued and written in a batch shortly after, the 202 response
+    carries a tracking ID to look the outcome up at `/opinions/ingest/{tracking_id}`.
+    """
+    if write_behind.enabled:
+        try:
+            ticket = await write_behind.submit(opinion)
+        except QueueFullError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=exc.message, headers={"Retry-After": "1"}
+            )
+        location = {"Location": f"{router.prefix}/ingest/{ticket.tracking_id}"}
+        return json_response(ticket, IngestTicket, status.HTTP_202_ACCEPTED, headers=location)
+    try:
+        return await repository.create_opinion(opinion, db)
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
+
+
+@router.delete("/{opinion_id}", status_code=status.HTTP_202_ACCEPTED, response_model=dict[str, str])
+async def delete_opinion(
+    opinion_id: int, db: AsyncSession = Depends(get_db), repository: OpinionRepository = Depends(get_opinion_repository)
+):
     """Delete an opinion by its ID."""
     try:
-        result = await OpinionRepository().delete_opinion(opinion_id, db)
+        result = await repository.delete_opinion(opinion_id, db)
         return result
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Opinion not found")
 
 
-@router.put("/{opinion_id}", status_code=status.HTTP_200_OK)
-async def update_opinion(opinion_id: int, opinion: UpdateOpinion, db: AsyncSession = Depends(get_db)):
+@router.put("/{opinion_id}", status_code=status.HTTP_200_OK, response_model=Opinion)
+async def update_opinion(
+    opinion_id: int,
+    opinion: UpdateOpinion,
+    db: AsyncSession = Depends(get_db),
+    repository: OpinionRepository = Depends(get_opinion_repository),
+):
     """Update specified fields of an opinion by its ID."""
     try:
-        db_opinion = await OpinionRepository().update_opinion(opinion_id, opinion, db)
-        return Opinion(**db_opinion.__dict__)
-    except NotFoundError:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Opinion not found")
+        return await repository.update_opinion(opinion_id, opinion, db)
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=exc.message)
@@ -1,9 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from typing import Any, Optional, Union
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi_project.core.pydantic_core import CreatePlace, Opinion, Place, UpdatePlace
-from fastapi_project.db.create_db import get_db
-from fastapi_project.repositories import NotFoundError, PlaceRepository
+from fastapi_project.core.bulk import (
+    BulkResult,
+    BulkUpdatePlace,
+    LookupResult,
+    check_bulk_size,
+    check_lookup_size,
+    merge_results,
+    parse_lookup_ids,
+    validate_items,
+)
+from fastapi_project.core.conditional import make_etag, not_modified, set_validators, tag_response
+from fastapi_project.core.export import EXPORT_BATCH_SIZE, MAX_EXPORT_BATCH_SIZE, ExportFormat, serialize_batches
+from fastapi_project.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError, Page
+from fastapi_project.core.pydantic_core import (
+    CreatePlace,
+    ExpandedPlace,
+    Opinion,
+    OpinionSort,
+    Place,
+    PlaceExpand,
+    PlaceSort,
+    PlaceStats,
+    RankedPlace,
+    UpdatePlace,
+)
+from fastapi_project.core.serialization import json_response
+from fastapi_project.db.create_db import get_db, get_read_db, get_read_session_factory
+from fastapi_project.repositories import NotFoundError, PlaceRepository, TooManyResultsError, get_place_repository
+from fastapi_project.repositories.leaderboard import LEADERBOARD_SIZE
+from fastapi_project.repositories.repositories import EXPANDED_OPINIONS
 
 router = APIRouter(
     prefix="/places",
@@ -12,58 +43,321 @@ router = APIRouter(
 )
 
 
+EXPAND_DESCRIPTION = "Comma separated related data to embed: " + ", ".join(item.value for item in PlaceExpand)
+
+
+def _parse_expand(expand: Optional[str]) -> frozenset[PlaceExpand]:
+    try:
+        return frozenset(PlaceExpand(item.strip()) for item in (expand or "").split(",") if item.strip())
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid expand, {EXPAND_DESCRIPTION}")
+
+
 @router.get("/healthcheck", status_code=status.HTTP_200_OK)
 def health_check():
     """Health check for the places router."""
     return {"status": "ok"}
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def get_places(db: AsyncSession = Depends(get_db)):
-    """Get all places from the database."""
-    places = await PlaceRepository().get_places(db)
-    return places
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=Union[Page[Place], Page[ExpandedPlace], dict[int, Place], LookupResult[Place]],
+)
+async def get_places(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    country: Optional[str] = None,
+    city: Optional[str] = None,
+    name: Optional[str] = Query(None, description="Name prefix"),
+    sort: PlaceSort = PlaceSort.id,
+    unpaginated: bool = False,
+    ids: Optional[str] = Query(None, description="Comma separated IDs to look up, in the order of the results"),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    opinions_limit: int = Query(EXPANDED_OPINIONS, ge=1, le=MAX_PAGE_SIZE, description="Opinions embedded per place"),
+    db: AsyncSession = Depends(get_read_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Get a page of places, optionally filtered by country, city and name prefix.
+
+    Pass the returned `next_cursor` as `after` to fetch the next page. With `unpaginated=true`
+    all places are returned as a dictionary keyed by ID, as long as the table is small enough.
+    With `ids=1,2,3` the places with these IDs are returned in that order instead, like `POST /places/lookup`.
+    With `expand=opinions,stats` every place of the page embeds its latest opinions and its rating statistics.
+    The response carries an ETag hashed from its body, so polling clients can revalidate with If-None-Match.
+    """
+    lookup_ids = None if ids is None else parse_lookup_ids(ids)
+    expansions = _parse_expand(expand)
+    if expansions and (lookup_ids is not None or unpaginated):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only pages of places can be expanded")
+    try:
+        if lookup_ids is not None:
+            response = json_response(await repository.get_places_by_ids(lookup_ids, db), LookupResult[Place])
+        elif unpaginated:
+            response = json_response(await repository.get_places(db), dict[int, Place])
+        else:
+            page = await repository.get_places_page(
+                db, limit=limit, after=after, country=country, city=city, name=name, sort=sort
+            )
+            if expansions:
+                items = await repository.expand_places(page.items, db, expansions, opinions_limit)
+                page = Page[ExpandedPlace](items=items, next_cursor=page.next_cursor, limit=page.limit)
+                response = json_response(page, Page[ExpandedPlace])
+            else:
+                response = json_response(page, Page[Place])
+    except InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    except TooManyResultsError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Too many places, use pagination")
+    return tag_response(request, response)
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=Page[Place])
+async def search_places(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text, every term must match"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Search the names and descriptions of the places.
+
+    Results are ranked by relevance, most relevant first, and terms match regardless of their
+    inflection. Pass the returned `next_cursor` as `after` to fetch the next page.
+    """
+    try:
+        page = await repository.search_places(q, db, limit=limit, after=after)
+    except InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return json_response(page, Page[Place])
+
+
+@router.get("/top", status_code=status.HTTP_200_OK, response_model=list[RankedPlace])
+async def get_top_places(
+    country: Optional[str] = None,
+    city: Optional[str] = None,
+    limit: int = Query(LEADERBOARD_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Get the best rated places, optionally in a country and city.
+
+    Places are ordered by the Bayesian average of their votes, which needs more opinions the further
+    a place is from the mean of all votes. The ranking is refreshed in the background and may lag
+    behind the latest opinions.
+    """
+    places = await repository.get_top_places(db, country=country, city=city, limit=limit)
+    return json_response(places, list[RankedPlace])
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_places(
+    format: ExportFormat = ExportFormat.ndjson,
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    session_factory=Depends(get_read_session_factory),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Stream every place as NDJSON or as a JSON array.
+
+    The body is serialized batch by batch while rows are read from a server-side cursor,
+    so memory use does not depend on the size of the table.
+    """
+
+    async def batches():
+        async with session_factory() as db:
+            async for batch in repository.stream_places(db, batch_size=batch_size):
+                yield batch
+
+    return StreamingResponse(serialize_batches(batches(), format), media_type=format.media_type)
 
 
-@router.get("/{place_id}", status_code=status.HTTP_200_OK)
-async def get_place(place_id: int, db: AsyncSession = Depends(get_db)):
-    """Get a place by its ID."""
+@router.post("/lookup", status_code=status.HTTP_200_OK, response_model=LookupResult[Place])
+async def lookup_places(
+    ids: list[int] = Body(..., embed=True),
+    db: AsyncSession = Depends(get_read_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Get many places by ID with a single query.
+
+    The places are returned in the order of `ids`, unknown IDs get `null` and are listed in `missing`.
+    Unlike `GET /places/?ids=`, the IDs are not limited by the length of the URL.
+    """
+    check_lookup_size(ids)
+    return json_response(await repository.get_places_by_ids(ids, db), LookupResult[Place])
+
+
+@router.post("/bulk", status_code=status.HTTP_201_CREATED, response_model=BulkResult[Place])
+async def create_places(
+    items: list[Any] = Body(...),
+    db: AsyncSession = Depends(get_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Create many places in one transaction.
+
+    Every item is validated on its own, invalid items are reported in `errors` with their position.
+    """
+    check_bulk_size(items)
+    positions, places, errors = validate_items(items, CreatePlace)
+    result = await repository.create_places(places, db)
+    return json_response(merge_results(positions, result, errors), BulkResult[Place], status.HTTP_201_CREATED)
+
+
+@router.patch("/bulk", status_code=status.HTTP_200_OK, response_model=BulkResult[Place])
+async def update_places(
+    items: list[Any] = Body(...),
+    db: AsyncSession = Depends(get_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Update specified fields of many places in one transaction.
+
+    Every item carries the `id` of the place to update, unknown IDs are reported in `errors`.
+    """
+    check_bulk_size(items)
+    positions, places, errors = validate_items(items, BulkUpdatePlace)
+    result = await repository.update_places(places, db)
+    return json_response(merge_results(positions, result, errors), BulkResult[Place])
+
+
+@router.delete("/bulk", status_code=status.HTTP_202_ACCEPTED, response_model=BulkResult[int])
+async def delete_places(
+    ids: list[int] = Query(...),
+    db: AsyncSession = Depends(get_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """Delete many places by their IDs in one transaction."""
+    check_bulk_size(ids)
+    result = await repository.delete_places(ids, db)
+    return json_response(result, BulkResult[int], status.HTTP_202_ACCEPTED)
+
+
+@router.get("/{place_id}", status_code=status.HTTP_200_OK, response_model=Union[Place, ExpandedPlace])
+async def get_place(
+    place_id: int,
+    request: Request,
+    response: Response,
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    opinions_limit: int = Query(EXPANDED_OPINIONS, ge=1, le=MAX_PAGE_SIZE, description="Opinions embedded"),
+    db: AsyncSession = Depends(get_read_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Get a place by its ID.
+
+    With `expand=opinions,stats` the place embeds its latest opinions and its rating statistics,
+    sparing a request to `/places/{place_id}/opinions`.
+
+    Answers If-None-Match and If-Modified-Since with 304 after reading only the version of the place,
+    otherwise the validators are those of the place sent, read along with it. An expanded place changes
+    with its opinions, it carries an ETag hashed from its body instead.
+    """
+    expansions = _parse_expand(expand)
     try:
-        place = await PlaceRepository().get_place(place_id, db)
-        return Place(**place.__dict__)
+        if expansions:
+            place = await repository.get_place(place_id, db)
+            (expanded,) = await repository.expand_places([place], db, expansions, opinions_limit)
+            return tag_response(request, json_response(expanded, ExpandedPlace))
+        version = await repository.get_place_version(place_id, db)
+        etag = make_etag("place", place_id, version.tag)
+        if (cached := not_modified(request, etag, version.updated_at)) is not None:
+            return cached
+        place, version = await repository.get_place_with_version(place_id, db, current=version)
+        set_validators(response, make_etag("place", place_id, version.tag), version.updated_at)
+        return place
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_place(place: CreatePlace, db: AsyncSession = Depends(get_db)):
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=Place)
+async def create_place(
+    place: CreatePlace, db: AsyncSession = Depends(get_db), repository: PlaceRepository = Depends(get_place_repository)
+):
     """Create a new place."""
-    db_place = await PlaceRepository().create_place(place, db)
-    return Place(**db_place.__dict__)
+    return await repository.create_place(place, db)
 
 
-@router.delete("/{place_id}", status_code=status.HTTP_202_ACCEPTED)
-async def delete_place(place_id: int, db: AsyncSession = Depends(get_db)):
+@router.delete("/{place_id}", status_code=status.HTTP_202_ACCEPTED, response_model=dict[str, str])
+async def delete_place(
+    place_id: int, db: AsyncSession = Depends(get_db), repository: PlaceRepository = Depends(get_place_repository)
+):
     """Delete a place by its ID."""
     try:
-        result = await PlaceRepository().delete_place(place_id, db)
+        result = await repository.delete_place(place_id, db)
         return result
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
 
 
-@router.put("/{place_id}", status_code=status.HTTP_200_OK)
-async def update_place(place_id: int, place: UpdatePlace, db: AsyncSession = Depends(get_db)):
+@router.put("/{place_id}", status_code=status.HTTP_200_OK, response_model=Place)
+async def update_place(
+    place_id: int,
+    place: UpdatePlace,
+    db: AsyncSession = Depends(get_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
     """Update specified fields of a place by its ID."""
     try:
-        db_place = await PlaceRepository().update_place(place_id, place, db)
-        return Place(**db_place.__dict__)
+        return await repository.update_place(place_id, place, db)
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
 
 
-@router.get("/{place_id}/opinions", status_code=status.HTTP_200_OK)
-async def get_opinions_for_place(place_id: int, db: AsyncSession = Depends(get_db)):
-    """Get all opinions for a place by its ID."""
-    opinions = await PlaceRepository().get_opinions_for_place(place_id, db)
-    return [Opinion(**opinion.__dict__) for opinion in opinions]
+@router.get("/{place_id}/opinions", status_code=status.HTTP_200_OK, response_model=Page[Opinion])
+async def get_opinions_for_place(
+    place_id: int,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    min_vote: Optional[int] = Query(None, ge=1, le=5),
+    max_vote: Optional[int] = Query(None, ge=1, le=5),
+    visited_from: Optional[date] = None,
+    visited_to: Optional[date] = None,
+    sort: OpinionSort = OpinionSort.recent,
+    db: AsyncSession = Depends(get_read_db),
+    repository: PlaceRepository = Depends(get_place_repository),
+):
+    """
+    Get a page of the opinions for a place, optionally filtered by vote and date of visit.
+
+    Pass the returned `next_cursor` as `after` to fetch the next page. The response carries an
+    ETag hashed from its body, so polling clients can revalidate with If-None-Match.
+    """
+    try:
+        page = await repository.get_opinions_for_place(
+            place_id,
+            db,
+            limit=limit,
+            after=after,
+            min_vote=min_vote,
+            max_vote=max_vote,
+            visited_from=visited_from,
+            visited_to=visited_to,
+            sort=sort,
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
+    return tag_response(request, json_response(page, Page[Opinion]))
+
+
+@router.get("/{place_id}/stats", status_code=status.HTTP_200_OK, response_model=PlaceStats)
+async def get_place_stats(
+    place_id: int, db: AsyncSession = Depends(get_db), repository: PlaceRepository = Depends(get_place_repository)
+):
+    """
+    Get the number of opinions, the mean vote and the vote histogram of a place.
+
+    Served from the primary, as the statistics row of older places is built on first read.
+    """
+    try:
+        return await repository.get_place_stats(place_id, db)
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Place not found")
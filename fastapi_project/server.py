@@ -0,0 +1,95 @@
+"""Process model of the API server."""
+
+from typing import Optional
+
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ServerSettings(BaseSettings):
+    """
+    Server settings, read from `SERVER_*` environment variables.
+
+    Attributes:
+        host (str): The interface to bind.
+        port (int): The port to bind.
+        workers (int): The number of worker processes, also read from WEB_CONCURRENCY. 1 runs a single
+            uvicorn process, more run gunicorn with uvicorn workers.
+        preload (bool): Import the app once in the master before forking the workers.
+        max_requests (int): Requests a worker serves before it is gracefully replaced, 0 to never recycle.
+        max_requests_jitter (int): Random extra requests added per worker, so workers are not recycled together.
+        timeout (int): Seconds a silent worker is given before it is killed and replaced.
+        graceful_timeout (int): Seconds a recycled or stopped worker is given to finish its requests.
+        keepalive (int): Seconds an idle keep-alive connection is held open.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="SERVER_", populate_by_name=True)
+
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = Field(1, ge=1, validation_alias=AliasChoices("WEB_CONCURRENCY", "SERVER_WORKERS"))
+    preload: bool = True
+    max_requests: int = 10000
+    max_requests_jitter: int = 1000
+    timeout: int = 60
+    graceful_timeout: int = 30
+    keepalive: int = 5
+
+    def gunicorn_options(self) -> dict:
+        """Returns the gunicorn settings of a multi-process server."""
+        return {
+            "bind": f"{self.host}:{self.port}",
+            "workers": self.workers,
+            "worker_class": "uvicorn.workers.UvicornWorker",
+            "preload_app": self.preload,
+            "max_requests": self.max_requests,
+            "max_requests_jitter": self.max_requests_jitter,
+            "timeout": self.timeout,
+            "graceful_timeout": self.graceful_timeout,
+            "keepalive": self.keepalive,
+            "post_fork": post_fork,
+        }
+
+
+def post_fork(server, worker):
+    """Gunicorn hook giving every worker its own engine instead of the one inherited from the master."""
+    from fastapi_project.db.create_db import init_engine
+
+    init_engine()
+
+
+def run(server_settings: Optional[ServerSettings] = None):
+    """
+    Run the API server.
+
+    Args:
+        server_settings (Optional[ServerSettings]): The server settings, read from the environment by default.
+
+    Raises:
+        ValueError: If the opinion queue cannot serve several workers.
+    """
+    server_settings = server_settings or ServerSettings()
+    from fastapi_project.repositories.ingest import default_write_behind
+
+    default_write_behind.check_workers(server_settings.workers)
+    if server_settings.workers == 1:
+        import uvicorn
+
+        from fastapi_project.app import app
+
+        uvicorn.run(app, host=server_settings.host, port=server_settings.port)
+        return
+
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in server_settings.gunicorn_options().items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from fastapi_project.app import app
+
+            return app
+
+    Application().run()
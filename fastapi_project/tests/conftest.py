@@ -7,7 +7,22 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from fastapi_project.app import app
 from fastapi_project.core.sqlalchemy_core import Base, DBOpinion, DBPlace
-from fastapi_project.db.create_db import get_db
+from fastapi_project.db.create_db import (
+    configure_engine,
+    get_db,
+    get_read_db,
+    get_read_session_factory,
+    get_session_factory,
+)
+from fastapi_project.db.settings import settings
+from fastapi_project.repositories.cache import default_cache
+from fastapi_project.repositories.leaderboard import default_leaderboard
+from fastapi_project.repositories.repositories import backfill_rating_stats
+
+# Every test database is seeded from scratch, warming one up at app startup would only slow the tests down.
+settings.warmup_connections = 0
+# The rankings are refreshed explicitly by the tests that need them.
+default_leaderboard.interval = 0
 
 
 @asynccontextmanager
@@ -23,6 +38,7 @@ async def local_session():
         },
         poolclass=StaticPool,
     )
+    configure_engine(engine)
     TestingSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     async with engine.begin() as conn:
@@ -83,6 +99,7 @@ async def local_session():
         db.add_all(places)
 
         await db.commit()
+        await backfill_rating_stats(db)
         try:
             yield db
         finally:
@@ -103,6 +120,9 @@ async def client():
                 yield database
 
         app.dependency_overrides[get_db] = _override_get_db
+        app.dependency_overrides[get_session_factory] = lambda: local_session
+        app.dependency_overrides[get_read_db] = _override_get_db
+        app.dependency_overrides[get_read_session_factory] = lambda: local_session
         yield client
         app.dependency_overrides = {}
 
@@ -114,3 +134,13 @@ async def db():
     """
     async with local_session() as database:
         yield database
+
+
+@pytest.fixture(autouse=True)
+async def clear_cache():
+    """
+    Every test starts from a freshly seeded database, so cached rows must not leak between tests.
+    """
+    await default_cache.clear()
+    yield
+    await default_cache.clear()
@@ -1,11 +1,34 @@
 """Tests for Opinions API"""
+
+import json
+
 from async_asgi_testclient import TestClient
 
 
 async def test_get_opinions(client: TestClient):
     response = await client.get("/opinions/")
     assert response.status_code == 200
-    assert response.json() != []
+    assert len(response.json()["items"]) == 5
+    assert response.json()["next_cursor"] is None
+
+
+async def test_get_opinions_pages(client: TestClient):
+    response = await client.get("/opinions/", query_string={"limit": 2})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [1, 2]
+    cursor = response.json()["next_cursor"]
+    response = await client.get("/opinions/", query_string={"limit": 2, "after": cursor})
+    assert [item["id"] for item in response.json()["items"]] == [3, 4]
+
+
+async def test_get_opinions_invalid_cursor(client: TestClient):
+    response = await client.get("/opinions/", query_string={"after": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_get_opinions_unpaginated(client: TestClient):
+    response = await client.get("/opinions/", query_string={"unpaginated": "true"})
+    assert response.status_code == 200
     assert len(response.json()) == 5
 
 
@@ -22,6 +45,14 @@ async def test_create_opinion(client: TestClient):
     assert response.json()["username"] == "test_user6"
 
 
+async def test_export_opinions_ndjson(client: TestClient):
+    response = await client.get("/opinions/export", query_string={"batch_size": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+
+
 async def test_get_opinion(client: TestClient):
     response = await client.get("/opinions/1")
     assert response.status_code == 200
@@ -53,7 +84,27 @@ async def test_delete_opinion(client: TestClient):
 async def test_get_places(client: TestClient):
     response = await client.get("/places/")
     assert response.status_code == 200
-    assert response.json() != []
+    assert len(response.json()["items"]) == 5
+    assert response.json()["next_cursor"] is None
+
+
+async def test_get_places_pages(client: TestClient):
+    response = await client.get("/places/", query_string={"limit": 2})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [1, 2]
+    cursor = response.json()["next_cursor"]
+    response = await client.get("/places/", query_string={"limit": 2, "after": cursor})
+    assert [item["id"] for item in response.json()["items"]] == [3, 4]
+
+
+async def test_get_places_invalid_cursor(client: TestClient):
+    response = await client.get("/places/", query_string={"after": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_get_places_unpaginated(client: TestClient):
+    response = await client.get("/places/", query_string={"unpaginated": "true"})
+    assert response.status_code == 200
     assert len(response.json()) == 5
 
 
@@ -71,6 +122,12 @@ async def test_create_place(client: TestClient):
     assert response.json()["name"] == "test_place6"
 
 
+async def test_export_places_json(client: TestClient):
+    response = await client.get("/places/export", query_string={"format": "json", "batch_size": 2})
+    assert response.status_code == 200
+    assert [place["id"] for place in response.json()] == [1, 2, 3, 4, 5]
+
+
 async def test_get_place(client: TestClient):
     response = await client.get("/places/1")
     assert response.status_code == 200
@@ -97,4 +154,228 @@ async def test_delete_place(client: TestClient):
 async def test_get_opinions_for_place(client: TestClient):
     response = await client.get("/places/1/opinions")
     assert response.status_code == 200
-    assert len(response.json()) == 3
+    assert len(response.json()["items"]) == 3
+
+
+async def test_get_opinions_for_place_filtered(client: TestClient):
+    response = await client.get("/places/1/opinions", query_string={"sort": "vote", "max_vote": 3, "limit": 1})
+    assert response.status_code == 200
+    assert [opinion["vote"] for opinion in response.json()["items"]] == [3]
+    assert response.json()["next_cursor"] is not None
+
+
+async def test_get_opinions_for_place_errors(client: TestClient):
+    assert (await client.get("/places/100/opinions")).status_code == 404
+    assert (await client.get("/places/1/opinions", query_string={"after": "bogus"})).status_code == 400
+
+
+async def test_cache_stats(client: TestClient):
+    await client.get("/places/1")
+    await client.get("/places/1")
+    response = await client.get("/cache/stats")
+    assert response.status_code == 200
+    assert response.json()["hits"] >= 1
+
+
+async def test_get_place_stats(client: TestClient):
+    response = await client.get("/places/2/stats")
+    assert response.status_code == 200
+    assert response.json() == {
+        "place_id": 2,
+        "count": 2,
+        "mean": 3.5,
+        "histogram": {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1},
+    }
+    response = await client.get("/places/100/stats")
+    assert response.status_code == 404
+
+
+async def test_bulk_opinions(client: TestClient):
+    items = [
+        {"place_id": 1, "opinion": "bulk", "vote": 5},
+        {"place_id": 1, "opinion": "bulk", "vote": 7},
+        {"place_id": 2},
+        {"place_id": 2, "opinion": "bulk", "vote": 4},
+    ]
+    response = await client.post("/opinions/bulk", json=items)
+    assert response.status_code == 201
+    assert [opinion["vote"] for opinion in response.json()["items"]] == [5, 4]
+    assert [error["index"] for error in response.json()["errors"]] == [1, 2]
+
+    response = await client.patch("/opinions/bulk", json=[{"id": 1, "vote": 3}, {"id": 100}])
+    assert response.status_code == 200
+    assert response.json()["items"][0]["vote"] == 3
+    assert response.json()["errors"][0]["index"] == 1
+
+    response = await client.delete("/opinions/bulk", query_string=[("ids", 1), ("ids", 2), ("ids", 1)])
+    assert response.status_code == 202
+    assert response.json() == {"items": [1, 2], "errors": []}
+
+
+async def test_bulk_places(client: TestClient):
+    items = [
+        {"name": "bulk", "description": "d", "country": "c", "city": "c", "address": "a"},
+        {"name": "bulk"},
+        {"name": "bulk", "description": "d", "country": "c", "city": None, "address": "a"},
+    ]
+    response = await client.post("/places/bulk", json=items)
+    assert response.status_code == 201
+    assert len(response.json()["items"]) == 1
+    assert [error["index"] for error in response.json()["errors"]] == [1, 2]
+
+    response = await client.patch("/places/bulk", json=[{"id": 2, "name": "renamed"}])
+    assert response.json()["items"][0]["name"] == "renamed"
+
+    response = await client.delete("/places/bulk", query_string=[("ids", 2), ("ids", 200), ("ids", 2), ("ids", 200)])
+    assert response.json()["items"] == [2]
+    assert response.json()["errors"] == [{"index": 1, "id": 200, "detail": "Place not found"}]
+
+
+async def test_create_opinion_unknown_place(client: TestClient):
+    response = await client.post("/opinions/", json={"place_id": 100, "opinion": "o", "vote": 1})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Place not found"
+
+
+async def test_pool_stats(client: TestClient):
+    response = await client.get("/pool/stats")
+    assert response.status_code == 200
+    assert "status" in response.json()
+
+
+async def test_filter_places(client: TestClient):
+    response = await client.get("/places/", query_string={"country": "test_country2", "sort": "name"})
+    assert response.status_code == 200
+    assert [place["id"] for place in response.json()["items"]] == [2]
+    response = await client.get("/places/", query_string={"sort": "popularity"})
+    assert response.status_code == 422
+
+
+async def test_get_place_conditional(client: TestClient):
+    response = await client.get("/places/1")
+    etag = response.headers["etag"]
+    assert "last-modified" in response.headers
+
+    response = await client.get("/places/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = await client.get("/places/2", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    response = await client.get("/places/100", headers={"If-None-Match": etag})
+    assert response.status_code == 404
+
+
+async def test_get_opinion_if_modified_since(client: TestClient):
+    response = await client.get("/opinions/1")
+    last_modified = response.headers["last-modified"]
+    response = await client.get("/opinions/1", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    response = await client.get("/opinions/1", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert response.status_code == 200
+
+
+async def test_collection_etags(client: TestClient):
+    for path in ("/places/", "/opinions/", "/places/1/opinions"):
+        response = await client.get(path)
+        assert response.headers["etag"].startswith('"')
+        assert "last-modified" not in response.headers
+
+    response = await client.get("/places/", query_string={"ids": "1,2"})
+    etag = response.headers["etag"]
+    response = await client.get("/places/", query_string={"ids": "1,2"}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    response = await client.get("/places/", query_string={"ids": "2,1"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    etag = (await client.get("/places/1/opinions")).headers["etag"]
+    assert (await client.get("/places/1/opinions", headers={"If-None-Match": etag})).status_code == 304
+    assert (await client.get("/places/100/opinions", headers={"If-None-Match": etag})).status_code == 404
+
+
+async def test_date_of_visit_serialization(client: TestClient):
+    data = {"place_id": 1, "opinion": "o", "vote": 1, "date_of_visit": "2024-01-02"}
+    response = await client.post("/opinions/", json=data)
+    assert response.status_code == 201
+    assert response.json()["date_of_visit"] == "2024-01-02"
+
+    response = await client.post("/opinions/bulk", json=[data])
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["items"][0]["date_of_visit"] == "2024-01-02"
+
+
+async def test_response_models_in_openapi(client: TestClient):
+    paths = (await client.get("/openapi.json")).json()["paths"]
+    schema = paths["/places/{place_id}/opinions"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema["$ref"].endswith("Page_Opinion_")
+    schema = paths["/places/{place_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert [ref["$ref"].rsplit("/", 1)[1] for ref in schema["anyOf"]] == ["Place", "ExpandedPlace"]
+
+
+async def test_search(client: TestClient):
+    response = await client.get("/places/search", query_string={"q": "name3"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [3]
+    response = await client.get("/opinions/search", query_string={"q": "opinion2"})
+    assert [item["id"] for item in response.json()["items"]] == [2]
+
+
+async def test_search_errors(client: TestClient):
+    assert (await client.get("/places/search")).status_code == 422
+    response = await client.get("/opinions/search", query_string={"q": "test", "after": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_top_places(client: TestClient):
+    # Every request gets a freshly seeded database, whose rankings were never refreshed.
+    response = await client.get("/places/top", query_string={"country": "test_country", "limit": 3})
+    assert response.status_code == 200
+    assert response.json() == []
+    response = await client.get("/places/top", query_string={"limit": 0})
+    assert response.status_code == 422
+
+
+async def test_places_sorted_by_rating(client: TestClient):
+    # Places without opinions are rated 0 and come last.
+    response = await client.get("/places/", query_string={"sort": "rating"})
+    assert response.status_code == 200
+    assert [place["id"] for place in response.json()["items"]] == [2, 1, 3, 4, 5]
+
+
+async def test_lookup(client: TestClient, monkeypatch):
+    response = await client.get("/places/", query_string={"ids": "2,7,1"})
+    assert response.status_code == 200
+    assert [place and place["id"] for place in response.json()["items"]] == [2, None, 1]
+    assert response.json()["missing"] == [7]
+    response = await client.post("/opinions/lookup", json={"ids": [4, 1]})
+    assert response.status_code == 200
+    assert [opinion["opinion"] for opinion in response.json()["items"]] == ["test_opinion4", "test_opinion"]
+
+    response = await client.get("/opinions/", query_string={"ids": "1,x"})
+    assert response.status_code == 400
+    monkeypatch.setattr("fastapi_project.core.bulk.LOOKUP_MAX_IDS", 2)
+    response = await client.post("/places/lookup", json={"ids": [1, 2, 3]})
+    assert response.status_code == 413
+
+
+async def test_expand_place(client: TestClient):
+    response = await client.get("/places/1", query_string={"expand": "opinions,stats", "opinions_limit": 2})
+    assert response.status_code == 200
+    assert [opinion["id"] for opinion in response.json()["opinions"]] == [4, 3]
+    assert response.json()["stats"]["count"] == 3
+    etag = response.headers["etag"]
+    response = await client.get(
+        "/places/1", query_string={"expand": "opinions,stats", "opinions_limit": 2}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    response = await client.get("/places/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "opinions" not in response.json()
+
+    response = await client.get("/places/", query_string={"expand": "stats", "limit": 2})
+    assert [place["stats"]["count"] for place in response.json()["items"]] == [3, 2]
+    assert response.json()["items"][0]["opinions"] is None
+    response = await client.get("/places/", query_string={"expand": "stats", "unpaginated": "true"})
+    assert response.status_code == 400
+    response = await client.get("/places/2", query_string={"expand": "reviews"})
+    assert response.status_code == 400
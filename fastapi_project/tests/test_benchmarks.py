@@ -0,0 +1,31 @@
+"""Smoke test keeping the benchmark suite runnable"""
+
+import json
+from argparse import Namespace
+
+from benchmarks.__main__ import run
+from benchmarks.harness import compare, percentile, save_results
+
+
+def test_percentile():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+
+
+async def test_benchmark_suite(tmp_path):
+    args = Namespace(
+        places=5, opinions=20, requests=3, concurrency=1, iterations=3, rows=100, database="memory", startup_runs=1
+    )
+    results = await run(args)
+    assert set(results["api"]) >= {"GET /places/{id}", "POST /opinions/bulk"}
+    assert results["repositories"]["get_place"]["calls"] == 3
+    assert "type_adapter_dump_json_100" in results["serialization"]
+    assert results["compression"]["gzip_6_100"]["ratio"] > 1
+    assert results["statements"]["get_place_cached_core"]["calls"] == 3
+    assert set(results["row_mapping"]) == {"orm_hydration_100", "core_mapping_100"}
+    assert results["startup"]["import fastapi_project.app"]["calls"] == 1
+
+    document = save_results(results, tmp_path / "results.json")
+    loaded = json.loads(document.read_text())
+    assert {name for name, *_ in compare(loaded, loaded)} >= {"api.GET /places/", "models.create_opinion_validate"}
@@ -0,0 +1,92 @@
+"""Tests for the repository read-through cache"""
+
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_project.core.pydantic_core import UpdateOpinion, UpdatePlace
+from fastapi_project.repositories import OpinionRepository, PlaceRepository
+from fastapi_project.repositories.cache import LRUCache, NullCache, RedisCache
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for redis.asyncio.Redis."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = (value, time.monotonic() + ex if ex else None)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def scan_iter(self, match="*"):
+        for key in list(self.data):
+            if key.startswith(match.rstrip("*")):
+                yield key
+
+
+async def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1
+    await cache.set("c", 3)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert cache.stats.evictions == 1
+
+
+async def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=0)
+    await cache.set("a", 1)
+    assert await cache.get("a") is None
+    assert cache.stats.misses == 1
+
+
+async def test_place_read_through_and_invalidation(db: AsyncSession):
+    repository = PlaceRepository(cache=LRUCache())
+    await repository.get_place(1, db)
+    await repository.get_place(1, db)
+    assert repository.cache.stats.as_dict() == {"hits": 1, "misses": 1, "invalidations": 0, "evictions": 0}
+
+    await repository.update_place(1, UpdatePlace(name="new_name"), db)
+    assert (await repository.get_place(1, db)).name == "new_name"
+    assert repository.cache.stats.invalidations == 1
+
+
+async def test_cached_place_older_than_the_row_is_read_again(db: AsyncSession):
+    repository = PlaceRepository(cache=LRUCache())
+    await repository.get_place(1, db)
+    # Written by another process, whose invalidation does not reach this cache.
+    await PlaceRepository(cache=NullCache()).update_place(1, UpdatePlace(name="new_name"), db)
+    current = await repository.get_place_version(1, db)
+    place, version = await repository.get_place_with_version(1, db, current=current)
+    assert (place.name, version) == ("new_name", current)
+    assert (await repository.get_place(1, db)).name == "new_name"
+
+
+async def test_delete_place_invalidates_its_opinions(db: AsyncSession):
+    cache = LRUCache()
+    await OpinionRepository(cache=cache).get_opinion(1, db)
+    await OpinionRepository(cache=cache).get_opinion(2, db)
+    await PlaceRepository(cache=cache).delete_place(1, db)
+    assert await cache.get("opinion:1") is None
+    assert await cache.get("opinion:2") is not None
+
+
+async def test_redis_backend(db: AsyncSession):
+    repository = OpinionRepository(cache=RedisCache(FakeRedis()))
+    await repository.get_opinion(1, db)
+    assert (await repository.get_opinion(1, db)).username == "test_user"
+    await repository.update_opinion(1, UpdateOpinion(username="renamed"), db)
+    assert (await repository.get_opinion(1, db)).username == "renamed"
+    assert repository.cache.stats.as_dict() == {"hits": 1, "misses": 2, "invalidations": 1, "evictions": 0}
@@ -0,0 +1,110 @@
+"""Tests for the coalescing of concurrent identical reads"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_project.db.replicas import READ_SESSION_KEY
+from fastapi_project.repositories import NotFoundError, PlaceRepository
+from fastapi_project.repositories.cache import NullCache
+from fastapi_project.repositories.coalesce import SingleFlight
+
+
+class SlowRead:
+    """A read counting its calls, which only completes once released."""
+
+    def __init__(self, result="row"):
+        self.result = result
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_reads_share_one_query():
+    flights, read = SingleFlight(), SlowRead()
+    waiters = [asyncio.create_task(flights.do("key", read)) for _ in range(10)]
+    await asyncio.sleep(0)
+    read.release.set()
+    assert await asyncio.gather(*waiters) == ["row"] * 10
+    assert read.calls == 1
+    assert flights.stats.as_dict() == {"queries": 1, "coalesced": 9, "timeouts": 0}
+    assert flights.in_flight() == 0
+
+    assert await flights.do("key", read) == "row"
+    assert read.calls == 2
+
+
+async def test_errors_are_shared():
+    flights, read = SingleFlight(), SlowRead(NotFoundError("Place not found"))
+    waiters = [asyncio.create_task(flights.do("key", read)) for _ in range(3)]
+    await asyncio.sleep(0)
+    read.release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, NotFoundError) for result in results)
+    assert read.calls == 1
+
+
+async def test_cancelled_waiters_do_not_cancel_the_query():
+    flights, read = SingleFlight(), SlowRead()
+    leader = asyncio.create_task(flights.do("key", read))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flights.do("key", read))
+    other = asyncio.create_task(flights.do("key", read))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    leader.cancel()
+    await asyncio.sleep(0)
+    # The leader's session serves the read, so the leader stays until the read is done.
+    assert not leader.done()
+    read.release.set()
+    assert await other == "row"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert waiter.cancelled()
+
+
+async def test_waiters_time_out_and_read_themselves():
+    flights, stuck = SingleFlight(timeout=0.01), SlowRead()
+    leader = asyncio.create_task(flights.do("key", stuck))
+    await asyncio.sleep(0)
+    fresh = SlowRead("fresh")
+    fresh.release.set()
+    assert await flights.do("key", fresh) == "fresh"
+    assert flights.stats.timeouts == 1
+    stuck.release.set()
+    assert await leader == "row"
+
+
+async def test_disabled():
+    flights, read = SingleFlight(timeout=0), SlowRead()
+    read.release.set()
+    await asyncio.gather(flights.do("key", read), flights.do("key", read))
+    assert read.calls == 2
+
+
+async def test_repository_reads_coalesced_on_read_sessions(db: AsyncSession):
+    repository = PlaceRepository(cache=NullCache(), single_flight=SingleFlight())
+    statements = []
+    engine = (await db.connection()).sync_engine
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        await asyncio.gather(*(repository.get_place(1, db) for _ in range(5)))
+        assert len(statements) == 5
+
+        statements.clear()
+        db.info[READ_SESSION_KEY] = True
+        places = await asyncio.gather(*(repository.get_place(1, db) for _ in range(5)), repository.get_place(2, db))
+        assert [place.id for place in places] == [1, 1, 1, 1, 1, 2]
+        assert len(statements) == 2
+        assert repository.single_flight.stats.coalesced == 4
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
@@ -0,0 +1,122 @@
+"""Tests for the negotiated response compression"""
+
+import gzip
+import json
+
+import pytest
+from async_asgi_testclient import TestClient
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from fastapi_project.core.compression import CompressionMiddleware, available_encoders, negotiate_encoding
+
+ENCODINGS = ("zstd", "br", "gzip")
+ROWS = [{"id": i, "opinion": f"A review of place {i % 7}, worth a visit."} for i in range(200)]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip, br;q=0", "gzip"),
+        ("*", "zstd"),
+        ("*;q=0, gzip", "gzip"),
+        ("gzip;q=0", None),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding, ENCODINGS) == expected
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_interleaved_streams(encoding):
+    pytest.importorskip({"zstd": "zstandard", "br": "brotli"}.get(encoding, "zlib"))
+    encoder = available_encoders(ENCODINGS)[encoding]
+    first, second = encoder.stream(), encoder.stream()
+    chunks = {id(first): [], id(second): []}
+    for row in ROWS[:50]:
+        for stream in (first, second):
+            chunks[id(stream)].append(stream.compress(json.dumps(row).encode() + b"\n"))
+    for stream in (first, second):
+        body = b"".join(chunks[id(stream)]) + stream.finish()
+        assert [json.loads(line) for line in decompress(encoding, body).splitlines()] == ROWS[:50]
+    assert decompress(encoding, encoder.compress(b"x" * 2000)) == b"x" * 2000
+
+
+def test_available_encoders():
+    assert "gzip" in available_encoders(ENCODINGS)
+    with pytest.raises(ValueError):
+        available_encoders(("deflate",))
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+
+    @app.get("/rows")
+    def rows():
+        return Response(json.dumps(ROWS), media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    def stream():
+        lines = (json.dumps(row) + "\n" for row in ROWS)
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    app.add_middleware(CompressionMiddleware, min_size=100, encodings=("gzip",))
+    async with TestClient(app) as client:
+        yield client
+
+
+async def test_compressed_body(client: TestClient):
+    response = await client.get("/rows", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert json.loads(gzip.decompress(response.content)) == ROWS
+
+
+async def test_streamed_body(client: TestClient):
+    response = await client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+async def test_uncompressed_bodies(client: TestClient):
+    response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == {"status": "ok"}
+
+    response = await client.get("/rows")
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+    assert response.json() == ROWS
+
+    response = await client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
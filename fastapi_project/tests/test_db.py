@@ -3,10 +3,23 @@
 from datetime import date
 
 import pytest
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi_project.core.pydantic_core import CreateOpinion, CreatePlace, UpdateOpinion, UpdatePlace
-from fastapi_project.repositories import OpinionRepository, PlaceRepository
+from fastapi_project.core.bulk import BulkUpdateOpinion, BulkUpdatePlace
+from fastapi_project.core.pagination import InvalidCursorError
+from fastapi_project.core.pydantic_core import (
+    CreateOpinion,
+    CreatePlace,
+    OpinionSort,
+    PlaceExpand,
+    PlaceSort,
+    UpdateOpinion,
+    UpdatePlace,
+)
+from fastapi_project.repositories import NotFoundError, OpinionRepository, PlaceRepository, TooManyResultsError
+from fastapi_project.repositories.cache import NullCache
+from fastapi_project.repositories.leaderboard import LeaderboardRefresher
 
 """Test the OpinionRepository"""
 
@@ -36,6 +49,24 @@ async def test_get_opinions(db: AsyncSession):
     assert len(opinions) == 5
 
 
+async def test_get_opinions_page(db: AsyncSession):
+    page = await OpinionRepository().get_opinions_page(db, limit=3)
+    assert [opinion.id for opinion in page.items] == [1, 2, 3]
+    page = await OpinionRepository().get_opinions_page(db, limit=3, after=page.next_cursor)
+    assert [opinion.id for opinion in page.items] == [4, 5]
+    assert page.next_cursor is None
+
+
+async def test_get_opinions_too_many(db: AsyncSession):
+    with pytest.raises(TooManyResultsError):
+        await OpinionRepository().get_opinions(db, max_rows=4)
+
+
+async def test_stream_opinions(db: AsyncSession):
+    batches = [batch async for batch in OpinionRepository().stream_opinions(db, batch_size=2)]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
 async def test_get_opinion_exists(db: AsyncSession):
     opinion = await OpinionRepository().get_opinion(1, db)
     assert opinion.username == "test_user"
@@ -116,6 +147,14 @@ async def test_get_places(db: AsyncSession):
     assert len(places) == 5
 
 
+async def test_get_places_page(db: AsyncSession):
+    page = await PlaceRepository().get_places_page(db, limit=4)
+    assert [place.id for place in page.items] == [1, 2, 3, 4]
+    page = await PlaceRepository().get_places_page(db, limit=4, after=page.next_cursor)
+    assert [place.id for place in page.items] == [5]
+    assert page.next_cursor is None
+
+
 async def test_get_place_exists(db: AsyncSession):
     place = await PlaceRepository().get_place(1, db)
     assert place.name == "test_name"
@@ -160,5 +199,294 @@ async def test_invalid_id_delete_place(db: AsyncSession):
 
 
 async def test_get_opinions_for_place(db: AsyncSession):
-    opinions = await PlaceRepository().get_opinions_for_place(1, db)
-    assert len(opinions) == 3
+    page = await PlaceRepository().get_opinions_for_place(1, db)
+    assert [opinion.id for opinion in page.items] == [4, 3, 1]
+    assert page.next_cursor is None
+
+
+async def test_get_opinions_for_place_by_vote(db: AsyncSession):
+    page = await PlaceRepository().get_opinions_for_place(1, db, min_vote=2, sort=OpinionSort.vote)
+    assert [opinion.vote for opinion in page.items] == [4, 3]
+
+
+async def test_get_opinions_for_place_recent_cursor(db: AsyncSession):
+    repository = PlaceRepository()
+    await OpinionRepository().update_opinion(1, UpdateOpinion(date_of_visit=date(2024, 1, 2)), db)
+    await OpinionRepository().update_opinion(3, UpdateOpinion(date_of_visit=date(2024, 1, 1)), db)
+
+    seen, after = [], None
+    while True:
+        page = await repository.get_opinions_for_place(1, db, limit=1, after=after)
+        seen += [opinion.id for opinion in page.items]
+        after = page.next_cursor
+        if after is None:
+            break
+    assert seen == [1, 3, 4]
+
+    page = await repository.get_opinions_for_place(1, db, visited_from=date(2024, 1, 2))
+    assert [opinion.id for opinion in page.items] == [1]
+
+
+async def test_get_opinions_for_place_invalid_cursor(db: AsyncSession):
+    page = await PlaceRepository().get_opinions_for_place(1, db, limit=1, sort=OpinionSort.vote)
+    with pytest.raises(InvalidCursorError):
+        await PlaceRepository().get_opinions_for_place(1, db, after=page.next_cursor)
+
+
+async def test_invalid_id_get_opinions_for_place(db: AsyncSession):
+    with pytest.raises(NotFoundError):
+        await PlaceRepository().get_opinions_for_place(100, db)
+
+
+async def test_place_version(db: AsyncSession):
+    repository = PlaceRepository()
+    version = await repository.get_place_version(1, db)
+    assert version.tag == "1"
+    await repository.update_place(1, UpdatePlace(name="renamed"), db)
+    updated = await repository.get_place_version(1, db)
+    assert updated.tag == "2"
+    assert updated.updated_at >= version.updated_at
+    with pytest.raises(NotFoundError):
+        await repository.get_place_version(100, db)
+
+
+async def test_get_place_stats(db: AsyncSession):
+    stats = await PlaceRepository().get_place_stats(1, db)
+    assert stats.count == 3
+    assert stats.mean == pytest.approx(8 / 3)
+    assert stats.histogram == {1: 1, 2: 0, 3: 1, 4: 1, 5: 0}
+
+
+async def test_place_stats_follow_opinion_writes(db: AsyncSession, valid_opinion: CreateOpinion):
+    await PlaceRepository().get_place_stats(1, db)
+    await OpinionRepository().create_opinion(valid_opinion, db)
+    await OpinionRepository().update_opinion(3, UpdateOpinion(vote=5), db)
+    await OpinionRepository().update_opinion(4, UpdateOpinion(place_id=2), db)
+    await OpinionRepository().delete_opinion(1, db)
+    stats = await PlaceRepository().get_place_stats(1, db)
+    assert stats.histogram == {1: 1, 2: 0, 3: 0, 4: 0, 5: 1}
+    assert stats.mean == 3
+    assert (await PlaceRepository().get_place_stats(2, db)).count == 3
+
+
+async def test_new_place_has_empty_stats(db: AsyncSession):
+    place = await PlaceRepository().create_place(
+        CreatePlace(name="n", description="d", country="c", city="c", address="a"), db
+    )
+    stats = await PlaceRepository().get_place_stats(place.id, db)
+    assert stats.count == 0
+    assert stats.mean is None
+
+
+async def test_invalid_place_stats(db: AsyncSession):
+    with pytest.raises(NotFoundError):
+        await PlaceRepository().get_place_stats(100, db)
+
+
+async def test_create_opinions(db: AsyncSession, valid_opinion: CreateOpinion):
+    orphan = valid_opinion.model_copy(update={"place_id": 100})
+    result = await OpinionRepository().create_opinions([valid_opinion, orphan, valid_opinion], db)
+    assert [opinion.id for opinion in result.items] == [6, 7]
+    assert [(error.index, error.detail) for error in result.errors] == [(1, "Place not found")]
+    assert (await PlaceRepository().get_place_stats(1, db)).histogram[1] == 3
+
+
+async def test_update_opinions(db: AsyncSession):
+    updates = [BulkUpdateOpinion(id=1, vote=5), BulkUpdateOpinion(id=100, vote=5), BulkUpdateOpinion(id=2, place_id=1)]
+    result = await OpinionRepository().update_opinions(updates, db)
+    assert [(opinion.id, opinion.vote, opinion.place_id) for opinion in result.items] == [(1, 5, 1), (2, 2, 1)]
+    assert [error.id for error in result.errors] == [100]
+    assert (await PlaceRepository().get_place_stats(1, db)).histogram == {1: 0, 2: 1, 3: 1, 4: 1, 5: 1}
+
+
+async def test_delete_opinions(db: AsyncSession):
+    result = await OpinionRepository().delete_opinions([1, 100, 3], db)
+    assert result.items == [1, 3]
+    assert [(error.index, error.id) for error in result.errors] == [(1, 100)]
+    assert len(await OpinionRepository().get_opinions(db)) == 3
+
+
+async def test_bulk_places(db: AsyncSession):
+    place = CreatePlace(name="n", description="d", country="c", city="c", address="a")
+    created = await PlaceRepository().create_places([place, place], db)
+    assert [place.id for place in created.items] == [6, 7]
+    updated = await PlaceRepository().update_places([BulkUpdatePlace(id=6, name="m"), BulkUpdatePlace(id=99)], db)
+    assert [place.name for place in updated.items] == ["m"]
+    assert [error.id for error in updated.errors] == [99]
+    deleted = await PlaceRepository().delete_places([1, 6], db)
+    assert deleted.items == [1, 6]
+    assert len(await OpinionRepository().get_opinions(db)) == 2
+
+
+async def test_delete_place_cascades(db: AsyncSession):
+    await PlaceRepository().delete_place(1, db)
+    assert sorted(await OpinionRepository().get_opinions(db)) == [2, 5]
+    with pytest.raises(NotFoundError):
+        await PlaceRepository().get_place_stats(1, db)
+
+
+async def test_create_opinion_unknown_place(db: AsyncSession, valid_opinion: CreateOpinion):
+    with pytest.raises(NotFoundError):
+        await OpinionRepository().create_opinion(valid_opinion.model_copy(update={"place_id": 100}), db)
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"country": "test_country2"}, [2]),
+        ({"country": "test_country3", "city": "test_city3"}, [3]),
+        ({"country": "test_country3", "city": "test_city"}, []),
+        ({"name": "test_name"}, [1, 2, 3, 4, 5]),
+        ({"name": "test_name4"}, [4]),
+        ({"name": "test_%"}, []),
+    ],
+)
+async def test_filter_places(filters, expected, db: AsyncSession):
+    page = await PlaceRepository().get_places_page(db, **filters)
+    assert [place.id for place in page.items] == expected
+
+
+async def test_sort_places_by_name(db: AsyncSession):
+    await PlaceRepository().update_place(3, UpdatePlace(name="a_place"), db)
+    page = await PlaceRepository().get_places_page(db, limit=2, sort=PlaceSort.name)
+    assert [place.id for place in page.items] == [3, 1]
+    page = await PlaceRepository().get_places_page(db, limit=2, sort=PlaceSort.name, after=page.next_cursor)
+    assert [place.id for place in page.items] == [2, 4]
+
+
+async def test_sort_places_by_rating(db: AsyncSession):
+    await OpinionRepository().update_opinion(1, UpdateOpinion(vote=5), db)
+    page = await PlaceRepository().get_places_page(db, limit=1, sort=PlaceSort.rating)
+    assert [place.id for place in page.items] == [1]
+    page = await PlaceRepository().get_places_page(db, limit=5, sort=PlaceSort.rating, after=page.next_cursor)
+    assert [place.id for place in page.items] == [2, 3, 4, 5]
+
+
+async def test_sort_cursor_mismatch(db: AsyncSession):
+    page = await PlaceRepository().get_places_page(db, limit=1, sort=PlaceSort.name)
+    with pytest.raises(InvalidCursorError):
+        await PlaceRepository().get_places_page(db, sort=PlaceSort.rating, after=page.next_cursor)
+
+
+async def test_search_places_ranks_name_matches_first(db: AsyncSession):
+    await PlaceRepository().update_place(2, UpdatePlace(description="Best coffee in town"), db)
+    await PlaceRepository().update_place(4, UpdatePlace(name="Coffee House"), db)
+    page = await PlaceRepository().search_places("coffees", db)
+    assert [place.id for place in page.items] == [4, 2]
+
+
+async def test_search_places_pages(db: AsyncSession):
+    page = await PlaceRepository().search_places("test", db, limit=3)
+    assert len(page.items) == 3
+    next_page = await PlaceRepository().search_places("test", db, limit=3, after=page.next_cursor)
+    assert sorted(place.id for place in page.items + next_page.items) == [1, 2, 3, 4, 5]
+    assert next_page.next_cursor is None
+    with pytest.raises(InvalidCursorError):
+        await PlaceRepository().search_places("test", db, after="not-a-cursor")
+
+
+async def test_search_index_follows_writes(db: AsyncSession, valid_opinion: CreateOpinion):
+    await PlaceRepository().update_place(1, UpdatePlace(name="Old Mill"), db)
+    await OpinionRepository().create_opinion(valid_opinion.model_copy(update={"opinion": "Loved the mill"}), db)
+    assert [place.id for place in (await PlaceRepository().search_places("mill", db)).items] == [1]
+    assert [opinion.id for opinion in (await OpinionRepository().search_opinions("mill", db)).items] == [6]
+
+    await PlaceRepository().update_place(1, UpdatePlace(name="New Bakery"), db)
+    assert (await PlaceRepository().search_places("mill", db)).items == []
+    await PlaceRepository().delete_place(1, db)
+    assert (await PlaceRepository().search_places("bakery", db)).items == []
+    assert (await OpinionRepository().search_opinions("mill", db)).items == []
+
+
+@pytest.mark.parametrize("q, expected", [("opinion3", [3]), ("test opinion4", [4]), ('"opinion5 OR', []), ("  ", [])])
+async def test_search_opinions(q, expected, db: AsyncSession):
+    page = await OpinionRepository().search_opinions(q, db)
+    assert [opinion.id for opinion in page.items] == expected
+
+
+async def test_hot_statements_compile_once(db: AsyncSession):
+    repository = PlaceRepository(cache=NullCache())
+    await repository.get_place(1, db)
+    compiled_cache = (await db.connection()).sync_engine._compiled_cache
+    size = len(compiled_cache)
+    for place_id in range(2, 6):
+        await repository.get_place(place_id, db)
+    assert len(compiled_cache) == size
+
+
+async def test_top_places(db: AsyncSession):
+    assert await LeaderboardRefresher().refresh(db) == 2
+
+    top = await PlaceRepository().get_top_places(db)
+    # Place 1 has the more opinions but place 2 the better mean, both are pulled towards the mean vote of 3.
+    assert [place.id for place in top] == [2, 1]
+    assert top[0].score == pytest.approx((10 * 3 + 7) / 12)
+    assert top[1].count == 3 and top[1].mean == pytest.approx(8 / 3)
+    assert [place.id for place in await PlaceRepository().get_top_places(db, country="test_country")] == [1]
+    assert await PlaceRepository().get_top_places(db, country="test_country", city="unknown") == []
+
+
+async def test_top_places_incremental_refresh(valid_opinion: CreateOpinion, db: AsyncSession):
+    refresher = LeaderboardRefresher(overlap=0)
+    await refresher.refresh(db)
+    assert await refresher.refresh(db) == 0
+
+    for _ in range(5):
+        await OpinionRepository().create_opinion(valid_opinion.model_copy(update={"vote": 5}), db)
+    await PlaceRepository().update_place(2, UpdatePlace(country="elsewhere"), db)
+    assert await refresher.refresh(db) == 2
+    top = await PlaceRepository().get_top_places(db)
+    assert [place.id for place in top] == [1, 2]
+    assert top[0].count == 8
+    assert [place.id for place in await PlaceRepository().get_top_places(db, country="elsewhere")] == [2]
+
+
+async def test_top_places_shared_between_processes(db: AsyncSession):
+    assert await LeaderboardRefresher().refresh(db) == 2
+    # A process starting next to a running one picks up from its last refresh instead of rebuilding.
+    assert await LeaderboardRefresher(overlap=0).refresh(db) == 0
+    assert await LeaderboardRefresher(rebuild_interval=0).refresh(db) == 2
+
+    refresher = LeaderboardRefresher(overlap=0)
+    await refresher.refresh(db)
+    opinions = await OpinionRepository().get_opinions(db)
+    await OpinionRepository().delete_opinions(
+        [opinion.id for opinion in opinions.values() if opinion.place_id == 2], db
+    )
+    assert await refresher.refresh(db) == 0
+    assert [place.id for place in await PlaceRepository().get_top_places(db)] == [1]
+
+
+async def test_get_by_ids(db: AsyncSession):
+    places = await PlaceRepository().get_places_by_ids([3, 99, 1, 3], db)
+    assert [place and place.id for place in places.items] == [3, None, 1, 3]
+    assert places.missing == [99]
+    opinions = await OpinionRepository().get_opinions_by_ids([5, 2], db)
+    assert [opinion.id for opinion in opinions.items] == [5, 2]
+    assert opinions.missing == []
+    assert (await OpinionRepository().get_opinions_by_ids([], db)).items == []
+
+
+async def test_expand_places(db: AsyncSession):
+    places = [await PlaceRepository().get_place(place_id, db) for place_id in (1, 2, 3)]
+    statements = []
+    engine = (await db.connection()).sync_engine
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        expanded = await PlaceRepository().expand_places(
+            places, db, frozenset({PlaceExpand.opinions, PlaceExpand.stats}), opinions_limit=2
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # One windowed query for the opinions, one for the statistics rows.
+    assert len(statements) == 2
+    assert [[opinion.id for opinion in place.opinions] for place in expanded] == [[4, 3], [5, 2], []]
+    assert [(place.stats.count, place.stats.mean) for place in expanded] == [
+        (3, pytest.approx(8 / 3)),
+        (2, 3.5),
+        (0, None),
+    ]
+
+    (place,) = await PlaceRepository().expand_places(places[:1], db, frozenset({PlaceExpand.stats}))
+    assert place.opinions is None and place.stats.histogram == {1: 1, 2: 0, 3: 1, 4: 1, 5: 0}
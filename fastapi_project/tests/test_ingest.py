@@ -0,0 +1,228 @@
+"""Tests for the write-behind queue of opinion submissions"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_project.app import app
+from fastapi_project.core.pydantic_core import CreateOpinion
+from fastapi_project.repositories import OpinionRepository
+from fastapi_project.repositories.ingest import (
+    IngestStatus,
+    IngestTicket,
+    MemoryIngestBackend,
+    OpinionWriteBehind,
+    QueueFullError,
+    RedisIngestBackend,
+    get_write_behind,
+)
+from fastapi_project.tests.conftest import local_session
+from fastapi_project.tests.test_cache import FakeRedis
+
+
+class FakeRedisHash(FakeRedis):
+    """Adds the hash and set commands used by the ingest backend."""
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and await self.get(key) is not None:
+            return None
+        await super().set(key, value, ex)
+        return True
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        self.data.setdefault(key, ({}, None))[0].update(mapping or {field: value})
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, ({}, None))[0])
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, ({}, None))[0].pop(field, None)
+
+    async def sadd(self, key, *members):
+        self.data.setdefault(key, (set(), None))[0].update(members)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, (set(), None))[0])
+
+    async def srem(self, key, *members):
+        self.data.get(key, (set(), None))[0].difference_update(members)
+
+
+def session_factory(db: AsyncSession):
+    @asynccontextmanager
+    async def session():
+        yield db
+
+    return session
+
+
+def opinion(place_id: int = 1) -> CreateOpinion:
+    return CreateOpinion(place_id=place_id, opinion="queued", vote=4)
+
+
+async def test_batches_are_written(db: AsyncSession):
+    write_behind = OpinionWriteBehind(batch_size=3, flush_interval=0.01, enabled=True)
+    await write_behind.start(session_factory(db))
+    tickets = [await write_behind.submit(opinion(place_id)) for place_id in (1, 2, 100, 1)]
+    assert (await write_behind.status(tickets[0].tracking_id)).status is IngestStatus.queued
+    await write_behind.stop()
+
+    statuses = [await write_behind.status(ticket.tracking_id) for ticket in tickets]
+    assert [ticket.opinion_id for ticket in statuses] == [6, 7, None, 8]
+    assert statuses[2].status is IngestStatus.failed
+    assert statuses[2].detail == "Place not found"
+    assert len(await OpinionRepository().get_opinions(db)) == 8
+
+
+async def test_backpressure(db: AsyncSession):
+    write_behind = OpinionWriteBehind(maxsize=1, enabled=True)
+    with pytest.raises(QueueFullError):
+        await write_behind.submit(opinion())
+    await write_behind.start(session_factory(db))
+    await write_behind.submit(opinion())
+    with pytest.raises(QueueFullError):
+        await write_behind.submit(opinion())
+    await write_behind.stop()
+
+
+class SlowIngestBackend(MemoryIngestBackend):
+    async def add(self, ticket: IngestTicket, opinion: CreateOpinion) -> None:
+        await asyncio.sleep(0)
+        await super().add(ticket, opinion)
+
+
+async def test_backpressure_with_concurrent_submissions(db: AsyncSession):
+    write_behind = OpinionWriteBehind(SlowIngestBackend(), maxsize=1, enabled=True)
+    await write_behind.start(session_factory(db))
+    results = await asyncio.gather(
+        write_behind.submit(opinion()), write_behind.submit(opinion()), return_exceptions=True
+    )
+    assert isinstance(results[0], IngestTicket)
+    assert isinstance(results[1], QueueFullError)
+    await write_behind.stop()
+
+
+async def test_claimed_opinions_may_exceed_maxsize(db: AsyncSession):
+    redis = FakeRedisHash()
+    stopped = RedisIngestBackend(redis)
+    await stopped.claim()
+    for index in range(3):
+        await stopped.add(IngestTicket(tracking_id=f"lost-{index}"), opinion())
+    await redis.delete(f"{stopped.prefix}lease:{stopped.worker_id}")
+
+    write_behind = OpinionWriteBehind(RedisIngestBackend(redis), maxsize=1, flush_interval=0.01, enabled=True)
+    await write_behind.start(session_factory(db))
+    assert write_behind.qsize() == 3
+    with pytest.raises(QueueFullError):
+        await write_behind.submit(opinion())
+    await write_behind.stop()
+    assert len(await OpinionRepository().get_opinions(db)) == 8
+
+
+async def test_durable_backend_recovers_pending(db: AsyncSession):
+    redis = FakeRedisHash()
+    stopped = RedisIngestBackend(redis)
+    await stopped.claim()
+    await stopped.add(IngestTicket(tracking_id="lost"), opinion())
+    # The lease of the worker expires once it stops renewing it.
+    await redis.delete(f"{stopped.prefix}lease:{stopped.worker_id}")
+
+    backend = RedisIngestBackend(redis)
+    write_behind = OpinionWriteBehind(backend, flush_interval=0.01, enabled=True)
+    await write_behind.start(session_factory(db))
+    await write_behind.stop()
+    assert (await write_behind.status("lost")).opinion_id == 6
+    assert await RedisIngestBackend(redis).claim() == []
+
+
+async def test_running_workers_keep_their_opinions(db: AsyncSession):
+    redis = FakeRedisHash()
+    first = OpinionWriteBehind(RedisIngestBackend(redis), flush_interval=0.01, enabled=True)
+    second = OpinionWriteBehind(RedisIngestBackend(redis), flush_interval=0.01, enabled=True)
+    await first.start(session_factory(db))
+    ticket = await first.submit(opinion())
+    await second.start(session_factory(db))
+    assert second.qsize() == 0
+    await first.stop()
+    await second.stop()
+    assert (await first.status(ticket.tracking_id)).opinion_id == 6
+    assert len(await OpinionRepository().get_opinions(db)) == 6
+
+
+def failing_session_factory(db: AsyncSession, failures: int):
+    """Fails the first writes as a database outage would."""
+    attempts = []
+
+    @asynccontextmanager
+    async def session():
+        attempts.append(None)
+        if len(attempts) <= failures:
+            raise ConnectionError("database unavailable")
+        yield db
+
+    return session
+
+
+async def test_failed_batches_are_retried(db: AsyncSession):
+    write_behind = OpinionWriteBehind(flush_interval=0.01, enabled=True, retry_delay=0.01)
+    await write_behind.start(failing_session_factory(db, failures=2))
+    ticket = await write_behind.submit(opinion())
+    await asyncio.sleep(0.1)
+    await write_behind.stop()
+    assert (await write_behind.status(ticket.tracking_id)).opinion_id == 6
+
+
+async def test_failed_batches_stay_pending(db: AsyncSession):
+    redis = FakeRedisHash()
+    backend = RedisIngestBackend(redis)
+    write_behind = OpinionWriteBehind(backend, flush_interval=0.01, enabled=True, retry_delay=60)
+    await write_behind.start(failing_session_factory(db, failures=10))
+    ticket = await write_behind.submit(opinion())
+    await asyncio.sleep(0.05)
+    await asyncio.wait_for(write_behind.stop(), 1)
+    assert (await write_behind.status(ticket.tracking_id)).status is IngestStatus.queued
+    await redis.delete(f"{backend.prefix}lease:{backend.worker_id}")
+
+    recovered = OpinionWriteBehind(RedisIngestBackend(redis), flush_interval=0.01, enabled=True)
+    await recovered.start(session_factory(db))
+    await recovered.stop()
+    assert (await recovered.status(ticket.tracking_id)).opinion_id == 6
+
+
+def test_memory_backend_is_single_worker():
+    OpinionWriteBehind(enabled=True).check_workers(1)
+    OpinionWriteBehind(enabled=False).check_workers(4)
+    OpinionWriteBehind(RedisIngestBackend(FakeRedisHash()), enabled=True).check_workers(4)
+    with pytest.raises(ValueError):
+        OpinionWriteBehind(enabled=True).check_workers(4)
+
+
+@pytest.fixture
+async def queued_client(client: TestClient):
+    write_behind = OpinionWriteBehind(maxsize=1, flush_interval=0.01, enabled=True)
+    app.dependency_overrides[get_write_behind] = lambda: write_behind
+    yield client, write_behind
+    await write_behind.stop()
+
+
+async def test_create_opinion_queued(queued_client):
+    client, write_behind = queued_client
+    data = {"place_id": 1, "opinion": "o", "vote": 1}
+    response = await client.post("/opinions/", json=data)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    await write_behind.start(local_session)
+    response = await client.post("/opinions/", json=data)
+    assert response.status_code == 202
+    tracking_id = response.json()["tracking_id"]
+    assert response.headers["location"] == f"/opinions/ingest/{tracking_id}"
+
+    await write_behind.stop()
+    response = await client.get(f"/opinions/ingest/{tracking_id}")
+    assert response.json()["status"] == "created"
+    assert (await client.get("/opinions/ingest/unknown")).status_code == 404
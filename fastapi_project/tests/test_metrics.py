@@ -0,0 +1,59 @@
+"""Tests for the request timing middleware and the /metrics endpoint"""
+
+import re
+
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_project.core.metrics import Histogram, RequestTiming, current_timing, request_queries
+from fastapi_project.repositories import PlaceRepository
+
+
+def test_histogram_render():
+    histogram = Histogram("latency", "Request latency.", ("route",), (0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    assert histogram.count("/a") == 3
+    assert histogram.render() == [
+        "# HELP latency Request latency.",
+        "# TYPE latency histogram",
+        'latency_bucket{route="/a",le="0.1"} 1',
+        'latency_bucket{route="/a",le="1.0"} 2',
+        'latency_bucket{route="/a",le="+Inf"} 3',
+        'latency_sum{route="/a"} 5.55',
+        'latency_count{route="/a"} 3',
+    ]
+
+
+async def test_server_timing(client: TestClient):
+    response = await client.get("/places/1/opinions")
+    match = re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries"', response.headers["server-timing"])
+    assert match is not None
+    assert int(match.group(1)) > 0
+
+
+async def test_queries_counted_per_request(db: AsyncSession):
+    timing = RequestTiming()
+    token = current_timing.set(timing)
+    try:
+        await PlaceRepository().get_opinions_for_place(1, db)
+    finally:
+        current_timing.reset(token)
+    assert timing.queries == 1
+    assert timing.db_seconds > 0
+
+
+async def test_metrics_endpoint(client: TestClient):
+    before = request_queries.count("GET", "/places/{place_id}")
+    await client.get("/places/1")
+    await client.get("/places/2")
+    assert request_queries.count("GET", "/places/{place_id}") == before + 2
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/places/{place_id}",status="200"}' in response.text
+    assert "cache_hits " in response.text
+    assert "db_pool_checkouts " in response.text
+    assert "single_flight_coalesced " in response.text
@@ -0,0 +1,69 @@
+"""Tests for the routing of reads to replicas, with two SQLite files standing in for a primary and a replica"""
+
+import os
+import time
+
+import pytest
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from fastapi_project.app import app
+from fastapi_project.core.sqlalchemy_core import Base, DBPlace
+from fastapi_project.db import create_db
+from fastapi_project.db.create_db import create_engine
+from fastapi_project.db.replicas import READ_YOUR_WRITES_COOKIE, ReadRouter
+from fastapi_project.db.settings import DatabaseSettings, settings
+
+
+async def _seeded_engine(path, name):
+    engine = create_engine(DatabaseSettings(url=f"sqlite+aiosqlite:///{path}"))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(bind=engine)() as db:
+        db.add(DBPlace(id=1, name=name, description="d", country="c", city="c", address="a"))
+        await db.commit()
+    return engine
+
+
+@pytest.fixture
+async def replicated(tmp_path, monkeypatch):
+    primary = await _seeded_engine(tmp_path / "primary.db", "primary")
+    replica = await _seeded_engine(tmp_path / "replica.db", "replica")
+    monkeypatch.setattr(create_db, "engine", primary)
+    monkeypatch.setattr(create_db, "_engine_pid", os.getpid())
+    monkeypatch.setattr(create_db, "session_local", async_sessionmaker(autoflush=False, bind=primary))
+    monkeypatch.setattr(create_db, "read_router", ReadRouter([replica]))
+    monkeypatch.setattr(settings, "read_urls", "sqlite+aiosqlite:///replica.db")
+    async with TestClient(app) as client:
+        yield client
+
+
+def test_round_robin():
+    router = ReadRouter(["a", "b", "c"])
+    assert [router.pick() for _ in range(4)] == ["a", "b", "c", "a"]
+    assert ReadRouter().pick() is None
+
+
+async def test_least_loaded(tmp_path):
+    engines = [create_engine(DatabaseSettings(url=f"sqlite+aiosqlite:///{tmp_path}/{i}.db")) for i in range(2)]
+    router = ReadRouter(engines, strategy="least_loaded")
+    async with engines[0].connect():
+        assert {router.pick() for _ in range(3)} == {engines[1]}
+    for engine in engines:
+        await engine.dispose()
+
+
+async def test_reads_go_to_replica(replicated: TestClient):
+    response = await replicated.get("/places/1")
+    assert response.json()["name"] == "replica"
+
+
+async def test_read_your_writes(replicated: TestClient):
+    response = await replicated.put("/places/1", json={"description": "changed"})
+    assert response.status_code == 200
+    assert float(response.cookies[READ_YOUR_WRITES_COOKIE]) > time.time()
+
+    response = await replicated.get("/places/1", cookies={READ_YOUR_WRITES_COOKIE: str(time.time() - 1)})
+    assert response.json()["name"] == "replica"
+    response = await replicated.get("/places/1", cookies={READ_YOUR_WRITES_COOKIE: str(time.time() + 5)})
+    assert response.json()["description"] == "changed"
@@ -0,0 +1,57 @@
+"""Tests keeping the cold start of the app fast: a lean import graph, a lifespan created engine and the warm-up"""
+
+import os
+
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.startup import APP_MODULE, import_profile
+from fastapi_project.app import app
+from fastapi_project.core.sqlalchemy_core import Base
+from fastapi_project.db import create_db
+from fastapi_project.db.create_db import create_engine
+from fastapi_project.db.settings import DatabaseSettings
+from fastapi_project.warmup import warm_up
+
+# The app imports in about 0.9 s, most of it FastAPI and SQLAlchemy.
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "1.5"))
+# Drivers and optional backends are only imported once they are used.
+DEFERRED_PACKAGES = {"aiosqlite", "asyncpg", "redis", "gunicorn", "uvicorn", "brotli", "zstandard"}
+# The routes are registered when the app is imported, so the routers and what they use stay eager.
+# Each costs a few milliseconds of its own, the ORM they build on is imported by the engine anyway.
+EAGER_MODULES = {
+    "fastapi_project.routers.places",
+    "fastapi_project.routers.opinions",
+    "fastapi_project.repositories.repositories",
+    "fastapi_project.core.search",
+}
+
+
+def test_import_time_budget():
+    profile = import_profile(APP_MODULE)
+    assert profile[APP_MODULE] / 1e6 < IMPORT_TIME_BUDGET
+    assert DEFERRED_PACKAGES.isdisjoint(name.split(".")[0] for name in profile)
+    assert EAGER_MODULES <= profile.keys()
+
+
+async def test_lifespan_creates_engine():
+    async with TestClient(app):
+        assert create_db.engine is not None
+        assert create_db.session_local.kw["bind"] is create_db.engine
+    assert create_db.engine is None
+
+
+async def test_warm_up(tmp_path):
+    engine = create_engine(DatabaseSettings(url=f"sqlite+aiosqlite:///{tmp_path}/test.db"))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    assert await warm_up(async_sessionmaker(bind=engine), 2)
+    assert engine.pool.checkedin() == 2
+    await engine.dispose()
+
+
+async def test_failed_warm_up_starts_cold(tmp_path):
+    engine = create_engine(DatabaseSettings(url=f"sqlite+aiosqlite:///{tmp_path}/missing/test.db"))
+    assert not await warm_up(async_sessionmaker(bind=engine), 1)
+    assert not await warm_up(async_sessionmaker(bind=engine), 0)
+    await engine.dispose()
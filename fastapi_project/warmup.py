@@ -0,0 +1,65 @@
+"""Startup warm-up, so the first requests of a new process do not pay for opening connections and compiling SQL."""
+
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from typing import Callable
+
+from fastapi_project.repositories import NotFoundError, OpinionRepository, PlaceRepository
+from fastapi_project.repositories.cache import NullCache
+
+logger = logging.getLogger(__name__)
+
+# IDs never assigned by the database, the lookups run their statements and find nothing.
+MISSING_ID = 0
+
+
+def hot_reads() -> list[Callable]:
+    """
+    The repository reads behind the most requested endpoints.
+
+    They bypass the cache, so the warm-up neither fills it nor counts towards its statistics.
+    """
+    places = PlaceRepository(cache=NullCache())
+    opinions = OpinionRepository(cache=NullCache())
+    return [
+        lambda db: places.get_place_version(MISSING_ID, db),
+        lambda db: places.get_place(MISSING_ID, db),
+        lambda db: places.get_places_page(db, limit=1),
+        lambda db: places.get_opinions_for_place(MISSING_ID, db, limit=1),
+        lambda db: opinions.get_opinion_version(MISSING_ID, db),
+        lambda db: opinions.get_opinion(MISSING_ID, db),
+        lambda db: opinions.get_opinions_page(db, limit=1),
+    ]
+
+
+async def warm_up(session_factory: Callable, connections: int) -> bool:
+    """
+    Open pool connections and compile the hot statements before the first request.
+
+    The connections are opened concurrently and returned to the pool, which keeps them open.
+    Running the hot reads once puts their compiled SQL in the engine's statement cache.
+    A failure is logged rather than raised, the app then starts cold.
+
+    Args:
+        session_factory (Callable): Opens database sessions.
+        connections (int): The number of connections to open, 0 skips the warm-up.
+
+    Returns:
+        bool: Whether the warm-up ran successfully.
+    """
+    if connections <= 0:
+        return False
+    try:
+        async with AsyncExitStack() as stack:
+            sessions = [await stack.enter_async_context(session_factory()) for _ in range(connections)]
+            await asyncio.gather(*(db.connection() for db in sessions))
+            for read in hot_reads():
+                try:
+                    await read(sessions[0])
+                except NotFoundError:
+                    pass
+    except Exception:
+        logger.warning("Database warm-up failed, starting cold", exc_info=True)
+        return False
+    return True
@@ -0,0 +1,59 @@
+"""place rankings
+
+Revision ID: 2a9f5c7e1b36
+Revises: 6c1e8f4a2b93
+Create Date: 2026-10-17 20:14:52.104837
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2a9f5c7e1b36"
+down_revision: Union[str, None] = "6c1e8f4a2b93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite only adds NOT NULL columns with a constant default, existing rows are stamped afterwards.
+    op.add_column(
+        "place_rating_stats",
+        sa.Column("updated_at", sa.DateTime(), server_default="1970-01-01 00:00:00", nullable=False),
+    )
+    op.execute("UPDATE place_rating_stats SET updated_at = CURRENT_TIMESTAMP")
+    if op.get_bind().dialect.name != "sqlite":
+        op.alter_column("place_rating_stats", "updated_at", server_default=None)
+    op.create_index("ix_place_rating_stats_updated_at", "place_rating_stats", ["updated_at"], unique=False)
+    op.create_index("ix_places_updated_at", "places", ["updated_at"], unique=False)
+    # Filled by the leaderboard refresher with a full rebuild when the app starts.
+    op.create_table(
+        "place_rankings",
+        sa.Column("place_id", sa.Integer(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("mean", sa.Float(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["place_id"], ["places.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("place_id"),
+    )
+    op.create_index("ix_place_rankings_score", "place_rankings", ["score", "place_id"], unique=False)
+    op.create_index("ix_place_rankings_country_score", "place_rankings", ["country", "score", "place_id"], unique=False)
+    op.create_index(
+        "ix_place_rankings_country_city_score", "place_rankings", ["country", "city", "score", "place_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_place_rankings_country_city_score", table_name="place_rankings")
+    op.drop_index("ix_place_rankings_country_score", table_name="place_rankings")
+    op.drop_index("ix_place_rankings_score", table_name="place_rankings")
+    op.drop_table("place_rankings")
+    op.drop_index("ix_places_updated_at", table_name="places")
+    op.drop_index("ix_place_rating_stats_updated_at", table_name="place_rating_stats")
+    with op.batch_alter_table("place_rating_stats") as batch_op:
+        batch_op.drop_column("updated_at")
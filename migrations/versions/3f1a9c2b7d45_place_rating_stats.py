@@ -0,0 +1,54 @@
+"""place rating stats
+
+Revision ID: 3f1a9c2b7d45
+Revises: d8c8af3c32fe
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1a9c2b7d45"
+down_revision: Union[str, None] = "d8c8af3c32fe"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "place_rating_stats",
+        sa.Column("place_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("votes_1", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("votes_2", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("votes_3", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("votes_4", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("votes_5", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["place_id"], ["places.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("place_id"),
+    )
+    # Backfill the statistics of existing places in a single aggregation pass.
+    op.execute("""
+        INSERT INTO place_rating_stats (place_id, count, total, votes_1, votes_2, votes_3, votes_4, votes_5)
+        SELECT
+            places.id,
+            COUNT(opinions.id),
+            COALESCE(SUM(opinions.vote), 0),
+            SUM(CASE WHEN opinions.vote = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 2 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 3 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 4 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 5 THEN 1 ELSE 0 END)
+        FROM places
+        LEFT JOIN opinions ON opinions.place_id = places.id
+        GROUP BY places.id
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table("place_rating_stats")
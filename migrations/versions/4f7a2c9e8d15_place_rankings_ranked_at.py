@@ -0,0 +1,35 @@
+"""place rankings ranked at
+
+Revision ID: 4f7a2c9e8d15
+Revises: b83e5a0d2c71
+Create Date: 2026-10-18 14:02:37.514290
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4f7a2c9e8d15"
+down_revision: Union[str, None] = "b83e5a0d2c71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rankings count as built long ago, the refresher rebuilds them once when the app starts.
+    op.add_column(
+        "place_rankings",
+        sa.Column("ranked_at", sa.DateTime(), server_default="1970-01-01 00:00:00", nullable=False),
+    )
+    if op.get_bind().dialect.name != "sqlite":
+        op.alter_column("place_rankings", "ranked_at", server_default=None)
+    op.create_index("ix_place_rankings_ranked_at", "place_rankings", ["ranked_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_place_rankings_ranked_at", table_name="place_rankings")
+    with op.batch_alter_table("place_rankings") as batch_op:
+        batch_op.drop_column("ranked_at")
@@ -0,0 +1,31 @@
+"""opinions place keyset indexes
+
+Revision ID: 5e7a2c9d0f14
+Revises: c47d1e9a5b28
+Create Date: 2026-10-17 16:21:08.113942
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e7a2c9d0f14"
+down_revision: Union[str, None] = "c47d1e9a5b28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_opinions_place_id_date_of_visit_id", "opinions", ["place_id", "date_of_visit", "id"], unique=False
+    )
+    op.create_index("ix_opinions_place_id_vote_id", "opinions", ["place_id", "vote", "id"], unique=False)
+    op.drop_index(op.f("ix_opinions_place_id"), table_name="opinions")
+
+
+def downgrade() -> None:
+    op.create_index(op.f("ix_opinions_place_id"), "opinions", ["place_id"], unique=False)
+    op.drop_index("ix_opinions_place_id_vote_id", table_name="opinions")
+    op.drop_index("ix_opinions_place_id_date_of_visit_id", table_name="opinions")
@@ -0,0 +1,69 @@
+"""full text search
+
+Revision ID: 6c1e8f4a2b93
+Revises: 9d3b6f8e2a71
+Create Date: 2026-10-17 18:41:09.318502
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6c1e8f4a2b93"
+down_revision: Union[str, None] = "9d3b6f8e2a71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexed table and its text columns, in decreasing order of importance.
+INDEXES = {"places": ("name", "description"), "opinions": ("opinion",)}
+SQLITE_TOKENIZER = "porter unicode61 remove_diacritics 2"
+SEARCH_CONFIG = "english"
+
+
+def _sqlite_upgrade(table: str, columns: tuple[str, ...]) -> None:
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{name}" for name in columns)
+    old = ", ".join(f"old.{name}" for name in columns)
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', "
+        f"content_rowid='id', tokenize='{SQLITE_TOKENIZER}')"
+    )
+    op.execute(f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert_new} END")
+    op.execute(f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN {delete_old} END")
+    op.execute(f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN {delete_old} {insert_new} END")
+    # Index the existing rows.
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _postgresql_upgrade(table: str, columns: tuple[str, ...]) -> None:
+    document = " || ".join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({name}, '')), '{weight}')"
+        for name, weight in zip(columns, "ABCD")
+    )
+    op.execute(f"ALTER TABLE {table} ADD COLUMN search tsvector GENERATED ALWAYS AS ({document}) STORED")
+    op.execute(f"CREATE INDEX ix_{table}_search ON {table} USING gin (search)")
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table, columns in INDEXES.items():
+        if dialect == "sqlite":
+            _sqlite_upgrade(table, columns)
+        elif dialect == "postgresql":
+            _postgresql_upgrade(table, columns)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table in reversed(INDEXES):
+        if dialect == "sqlite":
+            for action in ("insert", "delete", "update"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{action}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        elif dialect == "postgresql":
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search")
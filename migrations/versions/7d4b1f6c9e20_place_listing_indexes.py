@@ -0,0 +1,35 @@
+"""place listing indexes
+
+Revision ID: 7d4b1f6c9e20
+Revises: 2a9f5c7e1b36
+Create Date: 2026-10-18 09:41:27.530816
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d4b1f6c9e20"
+down_revision: Union[str, None] = "2a9f5c7e1b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_place_rating_stats_rating_place_id",
+        "place_rating_stats",
+        [sa.text("rating DESC"), "place_id"],
+        unique=False,
+    )
+    op.drop_index("ix_place_rating_stats_rating", table_name="place_rating_stats")
+    op.create_index("ix_places_city_name", "places", ["city", "name"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_places_city_name", table_name="places")
+    op.create_index("ix_place_rating_stats_rating", "place_rating_stats", ["rating"], unique=False)
+    op.drop_index("ix_place_rating_stats_rating_place_id", table_name="place_rating_stats")
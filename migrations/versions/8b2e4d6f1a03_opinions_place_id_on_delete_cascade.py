@@ -0,0 +1,53 @@
+"""opinions place_id on delete cascade
+
+Revision ID: 8b2e4d6f1a03
+Revises: 3f1a9c2b7d45
+Create Date: 2026-10-17 11:40:05.927311
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2e4d6f1a03"
+down_revision: Union[str, None] = "3f1a9c2b7d45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _opinions_table(ondelete: Union[str, None]) -> sa.Table:
+    # The original foreign key is unnamed, so on SQLite the table is rebuilt from
+    # this definition instead of altering the reflected constraint.
+    return sa.Table(
+        "opinions",
+        sa.MetaData(),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("opinion", sa.String(), nullable=True),
+        sa.Column("vote", sa.Integer(), nullable=False),
+        sa.Column("date_of_visit", sa.Date(), nullable=True),
+        sa.Column("place_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["place_id"], ["places.id"], name="opinions_place_id_fkey", ondelete=ondelete),
+        sa.PrimaryKeyConstraint("id"),
+        sa.Index("ix_opinions_id", "id"),
+    )
+
+
+def _set_ondelete(ondelete: Union[str, None]) -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("opinions", copy_from=_opinions_table(ondelete), recreate="always"):
+            pass
+        return
+    op.drop_constraint("opinions_place_id_fkey", "opinions", type_="foreignkey")
+    op.create_foreign_key("opinions_place_id_fkey", "opinions", "places", ["place_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _set_ondelete("CASCADE")
+
+
+def downgrade() -> None:
+    _set_ondelete(None)
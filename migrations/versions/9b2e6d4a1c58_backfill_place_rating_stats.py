@@ -0,0 +1,46 @@
+"""backfill place rating stats
+
+Revision ID: 9b2e6d4a1c58
+Revises: 4f7a2c9e8d15
+Create Date: 2026-10-19 09:41:12.306584
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b2e6d4a1c58"
+down_revision: Union[str, None] = "4f7a2c9e8d15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Places inserted without the repository since the table was created, such as seed data, have no row
+    # and are left out of the rating listing and the leaderboard.
+    op.execute("""
+        INSERT INTO place_rating_stats
+            (place_id, count, total, votes_1, votes_2, votes_3, votes_4, votes_5, rating, updated_at)
+        SELECT
+            places.id,
+            COUNT(opinions.id),
+            COALESCE(SUM(opinions.vote), 0),
+            SUM(CASE WHEN opinions.vote = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 2 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 3 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 4 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN opinions.vote = 5 THEN 1 ELSE 0 END),
+            CASE WHEN COUNT(opinions.id) > 0 THEN CAST(SUM(opinions.vote) AS FLOAT) / COUNT(opinions.id) ELSE 0 END,
+            CURRENT_TIMESTAMP
+        FROM places
+        LEFT JOIN opinions ON opinions.place_id = places.id
+        WHERE places.id NOT IN (SELECT place_id FROM place_rating_stats)
+        GROUP BY places.id
+        """)
+
+
+def downgrade() -> None:
+    # The rows are valid statistics, they are kept.
+    pass
@@ -0,0 +1,39 @@
+"""row versions
+
+Revision ID: 9d3b6f8e2a71
+Revises: 5e7a2c9d0f14
+Create Date: 2026-10-17 17:02:45.540211
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3b6f8e2a71"
+down_revision: Union[str, None] = "5e7a2c9d0f14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("places", "opinions")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+        # SQLite only adds NOT NULL columns with a constant default, existing rows are stamped afterwards.
+        op.add_column(
+            table, sa.Column("updated_at", sa.DateTime(), server_default="1970-01-01 00:00:00", nullable=False)
+        )
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        if op.get_bind().dialect.name != "sqlite":
+            op.alter_column(table, "updated_at", server_default=None)
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("updated_at")
+            batch_op.drop_column("version")
@@ -0,0 +1,40 @@
+"""opinions recent index on postgresql
+
+Revision ID: b83e5a0d2c71
+Revises: 7d4b1f6c9e20
+Create Date: 2026-10-18 10:26:03.918452
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b83e5a0d2c71"
+down_revision: Union[str, None] = "7d4b1f6c9e20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite keeps the ascending index, which it reads backwards in the same order.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        "ix_opinions_place_id_recent",
+        "opinions",
+        ["place_id", sa.text("date_of_visit DESC NULLS LAST"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.drop_index("ix_opinions_place_id_date_of_visit_id", table_name="opinions")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        "ix_opinions_place_id_date_of_visit_id", "opinions", ["place_id", "date_of_visit", "id"], unique=False
+    )
+    op.drop_index("ix_opinions_place_id_recent", table_name="opinions")
@@ -0,0 +1,37 @@
+"""place filter indexes
+
+Revision ID: c47d1e9a5b28
+Revises: 8b2e4d6f1a03
+Create Date: 2026-10-17 14:03:52.604718
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c47d1e9a5b28"
+down_revision: Union[str, None] = "8b2e4d6f1a03"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_places_country_city_name", "places", ["country", "city", "name"], unique=False)
+    op.create_index("ix_places_name", "places", ["name"], unique=False, postgresql_ops={"name": "text_pattern_ops"})
+    op.create_index(op.f("ix_opinions_place_id"), "opinions", ["place_id"], unique=False)
+    with op.batch_alter_table("place_rating_stats") as batch_op:
+        batch_op.add_column(sa.Column("rating", sa.Float(), server_default="0", nullable=False))
+    op.execute("UPDATE place_rating_stats SET rating = CAST(total AS FLOAT) / count WHERE count > 0")
+    op.create_index("ix_place_rating_stats_rating", "place_rating_stats", ["rating"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_place_rating_stats_rating", table_name="place_rating_stats")
+    with op.batch_alter_table("place_rating_stats") as batch_op:
+        batch_op.drop_column("rating")
+    op.drop_index(op.f("ix_opinions_place_id"), table_name="opinions")
+    op.drop_index("ix_places_name", table_name="places")
+    op.drop_index("ix_places_country_city_name", table_name="places")